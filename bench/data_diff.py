@@ -0,0 +1,113 @@
+"""
+Benchmark the data file tree diff on synthetic nested documents.
+
+Usage:
+    python -m bench.data_diff [--sizes 10000 100000 1000000] [--legacy-max 10000]
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from medcmp.checks.DataFileCheck import (
+    ComparisonItem,
+    check_item,
+    diff_data,
+    get_value,
+    scan_data_paths,
+)
+
+
+def synthetic_document(leaves: int, seed: int = 42) -> dict:
+    """
+    Generate a nested prediction-like document with approximately `leaves` values.
+    """
+
+    rng = random.Random(seed)
+    doc: dict = {"meta": {"model": "synthetic", "version": 1}, "cases": {}}
+
+    n = 2
+    case = 0
+    while n < leaves:
+        lesions = []
+        for i in range(rng.randint(1, 8)):
+            lesions.append(
+                {
+                    "label": i + 1,
+                    "volume": rng.uniform(1.0, 1000.0),
+                    "center": [rng.uniform(1.0, 512.0) for _ in range(3)],
+                    "name": f"lesion-{i}",
+                }
+            )
+            n += 6
+        doc["cases"][f"case{case:07d}"] = {"lesions": lesions, "score": rng.random()}
+        n += 1
+        case += 1
+
+    return doc
+
+
+def perturb(doc: dict, seed: int = 7) -> dict:
+    """
+    Copy a document and change, remove and add a few values.
+    """
+
+    rng = random.Random(seed)
+    doc = copy.deepcopy(doc)
+    cases = list(doc["cases"])
+
+    for key in rng.sample(cases, max(1, len(cases) // 100)):
+        doc["cases"][key]["score"] *= 1.0001
+    for key in rng.sample(cases, max(1, len(cases) // 1000)):
+        del doc["cases"][key]["lesions"][0]["name"]
+        doc["cases"][key]["extra"] = True
+
+    return doc
+
+
+def legacy_diff(src_data, ref_data):
+    src_paths = scan_data_paths(src_data)
+    ref_paths = scan_data_paths(ref_data)
+    items = []
+    for p in src_paths:
+        item = ComparisonItem()
+        item.path = p
+        items.append(item)
+        if p not in ref_paths:
+            continue
+        ref_paths.remove(p)
+        item.src_value = get_value(src_data, p)
+        item.ref_value = get_value(ref_data, p)
+        check_item(item)
+    return items
+
+
+def measure(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'leaves':>10} {'diff_data':>12} {'legacy':>12}")
+    for size in args.sizes:
+        ref = synthetic_document(size)
+        src = perturb(ref)
+
+        t_new = measure(diff_data, src, ref)
+        t_old = measure(legacy_diff, src, ref) if size <= args.legacy_max else None
+
+        legacy = f"{t_old:11.3f}s" if t_old is not None else f"{'-':>12}"
+        print(f"{size:>10} {t_new:11.3f}s {legacy}")
+
+
+if __name__ == "__main__":
+    main()
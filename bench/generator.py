@@ -0,0 +1,352 @@
+"""
+Generate synthetic src / ref output trees of a medical imaging model.
+
+Each tree has one directory per kind of output, with the same files in src and
+ref. Source files are copies of the reference files with controlled
+perturbations in some of the cases, the other cases stay identical:
+
+    images/case000/labels.{nii.gz,nrrd,mha}   label maps, a block relabeled
+    images/case000/values.{nii.gz,nrrd,mha}   float maps, noise added
+    seg/case000/seg.seg.dcm                   DICOM SEG, a segment shifted
+    data/case000/results.{json,yml}           nested documents, values changed
+    data/case000/metrics.csv                  wide tables, cells changed
+    files/d00/d00/file0000.txt                small files, some resized
+
+Usage:
+    python -m bench.generator OUT [--cases 4] [--image-size 64] [--files 2000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import yaml
+
+from bench.data_diff import perturb, synthetic_document
+
+# tree parts, the directory of each kind of output
+KINDS = ["images", "seg", "data", "files"]
+
+IMAGE_FORMATS = [".nii.gz", ".nrrd", ".mha"]
+
+
+class TreeConfig:
+    """
+    Scale of a generated tree. Every perturb_every-th case of each kind differs
+    between src and ref.
+    """
+
+    def __init__(
+        self,
+        cases: int = 4,
+        image_size: int = 64,
+        labels: int = 4,
+        segments: int = 3,
+        leaves: int = 10_000,
+        csv_rows: int = 1_000,
+        csv_columns: int = 50,
+        files: int = 2_000,
+        perturb_every: int = 2,
+        seed: int = 42,
+    ):
+        self.cases = cases
+        self.image_size = image_size
+        self.labels = labels
+        self.segments = segments
+        self.leaves = leaves
+        self.csv_rows = csv_rows
+        self.csv_columns = csv_columns
+        self.files = files
+        self.perturb_every = perturb_every
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def perturbed(self, case: int) -> bool:
+        return case % self.perturb_every == 0
+
+
+def label_map(rng: np.random.Generator, shape: Tuple[int, ...], labels: int):
+    """
+    A label map with one box per label, at random positions.
+    """
+
+    array = np.zeros(shape, np.uint8)
+    for label in range(1, labels + 1):
+        size = [max(2, s // 4) for s in shape]
+        start = [int(rng.integers(0, s - k + 1)) for s, k in zip(shape, size)]
+        array[tuple(slice(a, a + k) for a, k in zip(start, size))] = label
+    return array
+
+
+def relabel_block(rng: np.random.Generator, array: np.ndarray, labels: int):
+    """
+    Copy a label map with a block set to another label.
+    """
+
+    array = array.copy()
+    size = [max(1, s // 8) for s in array.shape]
+    start = [int(rng.integers(0, s - k + 1)) for s, k in zip(array.shape, size)]
+    array[tuple(slice(a, a + k) for a, k in zip(start, size))] = rng.integers(
+        0, labels + 1
+    )
+    return array
+
+
+def write_image(path: str, array: np.ndarray):
+    import SimpleITK as sitk
+
+    img = sitk.GetImageFromArray(array)
+    img.SetSpacing([0.8, 0.8, 1.5])
+    img.SetOrigin([-100.0, -80.0, 20.0])
+    sitk.WriteImage(img, path, useCompression=path.endswith(".nii.gz"))
+
+
+def write_images(src: str, ref: str, config: TreeConfig, rng: np.random.Generator):
+    size = config.image_size
+    shape = (max(1, size // 2), size, size)
+
+    for case in range(config.cases):
+        case_dir = f"case{case:03d}"
+        for tree in [src, ref]:
+            os.makedirs(os.path.join(tree, case_dir), exist_ok=True)
+
+        ref_labels = label_map(rng, shape, config.labels)
+        ref_values = rng.random(shape, dtype=np.float32) * 100.0
+
+        src_labels, src_values = ref_labels, ref_values
+        if config.perturbed(case):
+            src_labels = relabel_block(rng, ref_labels, config.labels)
+            noise = rng.normal(0.0, 0.01, shape).astype(np.float32)
+            src_values = ref_values + noise
+
+        for ext in IMAGE_FORMATS:
+            for name, src_array, ref_array in [
+                ("labels", src_labels, ref_labels),
+                ("values", src_values, ref_values),
+            ]:
+                write_image(os.path.join(ref, case_dir, name + ext), ref_array)
+                write_image(os.path.join(src, case_dir, name + ext), src_array)
+
+
+def ct_series(shape: Tuple[int, int, int]) -> list:
+    """
+    Create the datasets of an empty CT series the segmentations refer to.
+    """
+
+    from pydicom.dataset import FileDataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    study_uid, series_uid, for_uid = generate_uid(), generate_uid(), generate_uid()
+
+    datasets = []
+    for k in range(shape[0]):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = FileDataset(None, {}, file_meta=meta, preamble=b"\0" * 128)
+        ds.SOPClassUID = meta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.FrameOfReferenceUID = for_uid
+        ds.Modality = "CT"
+        ds.PatientID = "P"
+        ds.PatientName = "Synthetic"
+        ds.StudyID = "1"
+        ds.SeriesNumber = 1
+        ds.InstanceNumber = k + 1
+        ds.ImagePositionPatient = [0.0, 0.0, float(k)]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = [1.0, 1.0]
+        ds.SliceThickness = 1.0
+        ds.Rows, ds.Columns = shape[1], shape[2]
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.BitsAllocated = ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 1
+        ds.PixelData = np.zeros(shape[1:], np.int16).tobytes()
+        datasets.append(ds)
+
+    return datasets
+
+
+def write_seg(path: str, labelmap: np.ndarray, segments: int, source: list):
+    import SimpleITK as sitk
+    import pydicom_seg
+
+    code = {"CodeValue": "1", "CodingSchemeDesignator": "99T", "CodeMeaning": "x"}
+    attributes = [
+        {
+            "labelID": number,
+            "SegmentLabel": f"segment{number}",
+            "SegmentDescription": f"segment{number}",
+            "SegmentAlgorithmType": "AUTOMATIC",
+            "SegmentAlgorithmName": "synthetic",
+            "SegmentedPropertyCategoryCodeSequence": code,
+            "SegmentedPropertyTypeCodeSequence": code,
+        }
+        for number in range(1, segments + 1)
+    ]
+    template = pydicom_seg.template.from_dcmqi_metainfo(
+        {"SeriesDescription": "seg", "segmentAttributes": [attributes]}
+    )
+
+    writer = pydicom_seg.MultiClassWriter(
+        template=template, inplane_cropping=False, skip_empty_slices=True
+    )
+    img = sitk.GetImageFromArray(labelmap.astype(np.uint16))
+    writer.write(img, source).save_as(path)
+
+
+def write_segs(src: str, ref: str, config: TreeConfig, rng: np.random.Generator):
+    size = config.image_size
+    shape = (max(2, size // 4), size, size)
+    source = ct_series(shape)
+
+    for case in range(config.cases):
+        case_dir = f"case{case:03d}"
+        for tree in [src, ref]:
+            os.makedirs(os.path.join(tree, case_dir), exist_ok=True)
+
+        ref_labels = label_map(rng, shape, config.segments)
+        src_labels = ref_labels
+        if config.perturbed(case):
+            # shift the last segment by one voxel
+            src_labels = ref_labels.copy()
+            mask = ref_labels == config.segments
+            src_labels[mask] = 0
+            src_labels[np.roll(mask, 1, axis=2) & (src_labels == 0)] = config.segments
+
+        for tree, labels in [(ref, ref_labels), (src, src_labels)]:
+            path = os.path.join(tree, case_dir, "seg.seg.dcm")
+            write_seg(path, labels, config.segments, source)
+
+
+def write_table(path: str, rows: List[List[Any]]):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def metrics_table(rng: random.Random, config: TreeConfig) -> List[List[Any]]:
+    """
+    A wide table with an id column, numeric columns and a text column.
+    """
+
+    header = ["id"] + [f"metric{j:03d}" for j in range(config.csv_columns - 2)]
+    rows: List[List[Any]] = [header + ["label"]]
+    for i in range(config.csv_rows):
+        values = [rng.uniform(0.0, 1000.0) for _ in range(config.csv_columns - 2)]
+        rows.append([f"case{i:06d}", *values, f"label{i % 7}"])
+    return rows
+
+
+def perturb_table(rng: random.Random, rows: List[List[Any]]) -> List[List[Any]]:
+    """
+    Copy a table with about one percent of the numeric cells changed.
+    """
+
+    rows = [list(row) for row in rows]
+    cells = (len(rows) - 1) * (len(rows[0]) - 2)
+    for _ in range(max(1, cells // 100)):
+        i = rng.randrange(1, len(rows))
+        j = rng.randrange(1, len(rows[0]) - 1)
+        rows[i][j] *= 1.0 + rng.choice([1e-9, 1e-6, 1e-3, 1e-1])
+    return rows
+
+
+def write_data(src: str, ref: str, config: TreeConfig, rng: random.Random):
+    for case in range(config.cases):
+        case_dir = f"case{case:03d}"
+        for tree in [src, ref]:
+            os.makedirs(os.path.join(tree, case_dir), exist_ok=True)
+
+        ref_doc = synthetic_document(config.leaves, seed=config.seed + case)
+        src_doc = perturb(ref_doc, seed=case) if config.perturbed(case) else ref_doc
+
+        ref_rows = metrics_table(rng, config)
+        src_rows = perturb_table(rng, ref_rows) if config.perturbed(case) else ref_rows
+
+        for tree, doc, rows in [(ref, ref_doc, ref_rows), (src, src_doc, src_rows)]:
+            with open(os.path.join(tree, case_dir, "results.json"), "w") as f:
+                json.dump(doc, f, indent=2)
+            with open(os.path.join(tree, case_dir, "results.yml"), "w") as f:
+                yaml.dump(doc, f, Dumper=getattr(yaml, "CDumper", yaml.Dumper))
+            write_table(os.path.join(tree, case_dir, "metrics.csv"), rows)
+
+
+def write_files(src: str, ref: str, config: TreeConfig, rng: random.Random):
+    """
+    Many small files in a nested directory layout, for the scanner.
+    """
+
+    for i in range(config.files):
+        rel = os.path.join(f"d{i // 1000:02d}", f"d{i // 100 % 10:02d}")
+        name = f"file{i:04d}.txt"
+        content = "x" * rng.randint(1, 200)
+
+        for tree in [src, ref]:
+            os.makedirs(os.path.join(tree, rel), exist_ok=True)
+            with open(os.path.join(tree, rel, name), "w") as f:
+                # every 50th file grew in src
+                f.write(content + ("y" if tree == src and i % 50 == 0 else ""))
+
+
+def generate_tree(out: str, config: TreeConfig, kinds: List[str] = KINDS):
+    """
+    Write the src and ref trees of the given kinds of outputs to out/src and
+    out/ref (existing parts are replaced).
+    """
+
+    np_rng = np.random.default_rng(config.seed)
+    rng = random.Random(config.seed)
+
+    writers = {
+        "images": lambda src, ref: write_images(src, ref, config, np_rng),
+        "seg": lambda src, ref: write_segs(src, ref, config, np_rng),
+        "data": lambda src, ref: write_data(src, ref, config, rng),
+        "files": lambda src, ref: write_files(src, ref, config, rng),
+    }
+
+    for kind in kinds:
+        src = os.path.join(out, "src", kind)
+        ref = os.path.join(out, "ref", kind)
+        for tree in [src, ref]:
+            shutil.rmtree(tree, ignore_errors=True)
+            os.makedirs(tree)
+        writers[kind](src, ref)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    defaults = TreeConfig()
+    for key, value in defaults.to_dict().items():
+        parser.add_argument(
+            "--" + key.replace("_", "-"), type=type(value), default=value
+        )
+
+
+def parse_config(args: argparse.Namespace) -> TreeConfig:
+    return TreeConfig(**{key: getattr(args, key) for key in TreeConfig().to_dict()})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    generate_tree(args.out, parse_config(args), args.kinds)
+
+
+if __name__ == "__main__":
+    main()
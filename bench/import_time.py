@@ -0,0 +1,90 @@
+"""
+Benchmark the import time of the medcmp entry point with `python -X importtime`.
+Heavy backends (numpy, pandas, SimpleITK, pydicom) should only be imported once a
+file needs them, not at startup.
+
+Usage:
+    python -m bench.import_time [--module medcmp.main] [--repeat 5] [--top 10]
+                                [--json out.json] [--max-ms 300]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ["numpy", "pandas", "SimpleITK", "pydicom", "pydicom_seg"]
+
+
+def import_times(module: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Import a module in a fresh interpreter. Returns the cumulative import time
+    (us) of each imported module and the heavy modules that were imported.
+    """
+
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return times, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="medcmp.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument(
+        "--max-ms", type=float, default=None, help="fail above this import time"
+    )
+    args = parser.parse_args()
+
+    # best of several runs, the first one may also pay for writing bytecode
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    times, heavy = min(runs, key=lambda run: run[0][args.module])
+    total_ms = times[args.module] / 1000
+
+    print(f"{args.module}: {total_ms:.1f}ms (best of {args.repeat})")
+    print(f"heavy modules imported: {', '.join(heavy) or '-'}")
+    print()
+    print(f"{'module':<40} {'cumulative':>12}")
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)
+    for name, us in slowest[: args.top]:
+        print(f"{name:<40} {us / 1000:10.1f}ms")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "module": args.module,
+                    "import_ms": total_ms,
+                    "heavy_modules": heavy,
+                    "modules_ms": {name: us / 1000 for name, us in slowest},
+                },
+                f,
+                indent=2,
+            )
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        sys.exit(f"import time {total_ms:.1f}ms exceeds {args.max_ms}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark the memory held by the comparison items of a large data file diff and
+by the scan items of a large file tree, against the previous dict-backed classes.
+
+Usage:
+    python -m bench.memory [--leaves 1000000] [--files 1000000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from medcmp.checks.DataFileCheck import ComparisonItem, ComparisonOutcome, diff_data
+from medcmp.scan import Item
+
+from bench.data_diff import perturb, synthetic_document
+
+
+class DictComparisonItem:
+    path: str
+    type = None
+    src_value = None
+    ref_value = None
+    outcome = ComparisonOutcome.UNDEFINED
+    info = None
+
+
+class DictItem:
+    base = None
+    path = None
+    name = None
+    size = None
+    mtime = None
+    type = None
+    _relpath = None
+
+
+def copy_items(cls, items):
+    # values and paths are shared, only the item objects are allocated
+    copies = []
+    for item in items:
+        copy = cls()
+        copy.path = item.path
+        copy.src_value = item.src_value
+        copy.ref_value = item.ref_value
+        copy.outcome = item.outcome
+        copies.append(copy)
+    return copies
+
+
+def scan_items(cls, files: int):
+    items = []
+    for i in range(files):
+        item = cls()
+        item.base = "ref"
+        item.path = f"ref/case_{i // 100:05d}/file_{i % 100:03d}.nii.gz"
+        item.name = f"file_{i % 100:03d}.nii.gz"
+        item.size = 1000 + i
+        item.mtime = 1_700_000_000_000_000_000 + i
+        item._relpath = item.path[4:]
+        items.append(item)
+    return items
+
+
+def measure(fn, *args):
+    """
+    Return the result of fn and the memory it still holds (bytes).
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn(*args)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leaves", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    ref = synthetic_document(args.leaves)
+    src = perturb(ref)
+
+    items = diff_data(src, ref)
+    # paths are converted to strings once up front, both classes share them
+    for item in items:
+        item.path = item.path
+    _, slotted = measure(copy_items, ComparisonItem, items)
+    _, legacy = measure(copy_items, DictComparisonItem, items)
+    rows = [("comparison items", len(items), slotted, legacy)]
+    del items
+
+    _, slotted = measure(scan_items, Item, args.files)
+    _, legacy = measure(scan_items, DictItem, args.files)
+    rows.append(("scan items", args.files, slotted, legacy))
+
+    print(f"{'':<18} {'count':>10} {'slots':>12} {'dict':>12} {'ratio':>7}")
+    for name, count, new, old in rows:
+        print(
+            f"{name:<18} {count:>10} {new / 2**20:10.1f}MB {old / 2**20:10.1f}MB"
+            f" {old / new:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark scalar and vectorized numeric comparison.
+
+Usage:
+    python -m bench.number_compare [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import random
+import time
+
+from medcmp.checks.DataFileCheck import compare_numbers, compare_numbers_batch
+
+
+def synthetic_pairs(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    v1 = [rng.uniform(0.001, 10000.0) for _ in range(n)]
+    v2 = [v * (1.0 + rng.choice([0.0, 1e-9, 1e-6, 1e-3])) for v in v1]
+    return v1, v2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'pairs':>10} {'scalar':>12} {'batch':>12} {'speedup':>8}")
+    for size in args.sizes:
+        v1, v2 = synthetic_pairs(size)
+
+        start = time.perf_counter()
+        for a, b in zip(v1, v2):
+            compare_numbers(a, b)
+        t_scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compare_numbers_batch(v1, v2)
+        t_batch = time.perf_counter() - start
+
+        print(
+            f"{size:>10} {t_scalar:11.3f}s {t_batch:11.3f}s {t_scalar / t_batch:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmark medcmp end to end on a synthetic output tree (see bench.generator): each
+check on its kind of files, the scanner, a full comparison and the report export
+in each format. Results can be saved as a baseline and later runs compared
+against it, failing on regressions.
+
+Per-check scenarios run with the identity precheck disabled, so the check itself
+is measured on all files; the full comparison runs with the defaults.
+
+Usage:
+    python -m bench.suite [--tree DIR] [--scenarios data-json scan ...]
+                          [--repeat 3] [--jobs 1] [--save baseline.json]
+                          [--baseline baseline.json] [--tolerance 0.25]
+                          [generator options, e.g. --cases 8 --image-size 128]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from medcmp.Report import Report, report_export
+from medcmp.checks.CheckExecutor import create_executor
+from medcmp.checks.CheckRegistry import CHECKS
+from medcmp.checks.FileCompare import FileCompare, FilePair
+from medcmp.main import compare
+from medcmp.scan import match_tree_structures
+
+from bench.generator import (
+    KINDS,
+    TreeConfig,
+    add_config_arguments,
+    generate_tree,
+    parse_config,
+)
+
+# the benchmarks do not print per-file progress
+OPTIONS: Dict[str, Dict[str, Any]] = {"DicomsegContentCheck": {"verbose": False}}
+
+# a scenario prepares its inputs (not timed) and returns the timed run, which
+# returns the number of files it processed
+Setup = Callable[[str, str, argparse.Namespace], Callable[[], int]]
+
+
+def check_scenario(check: str, kind: str, include: List[str]) -> Setup:
+    """
+    Run a single check on the files of one kind matching the include patterns.
+    """
+
+    def setup(src: str, ref: str, args: argparse.Namespace):
+        src, ref = os.path.join(src, kind), os.path.join(ref, kind)
+        pairs = [
+            FilePair(s.path, r.path, s.size, r.size, s.mtime, r.mtime)
+            for s, r in match_tree_structures(src, ref, Report(), include)
+        ]
+        spec = next(spec for spec in CHECKS if spec.name == check)
+
+        def run():
+            with create_executor(args.executor, args.jobs) as executor:
+                file_checker = FileCompare(Report(), executor, precheck=False)
+                file_checker.register(spec, **OPTIONS.get(check, {}))
+                file_checker.compare_all(pairs)
+            return len(pairs)
+
+        return run
+
+    return setup
+
+
+def scan_scenario(src: str, ref: str, args: argparse.Namespace):
+    def run():
+        return len(match_tree_structures(src, ref, Report()))
+
+    return run
+
+
+def compare_scenario(src: str, ref: str, args: argparse.Namespace):
+    def run():
+        report = compare(
+            src,
+            ref,
+            Report(),
+            jobs=args.jobs,
+            executor=args.executor,
+            options=OPTIONS,
+        )
+        return len({check.path for check in report.checks})
+
+    return run
+
+
+def export_scenario(ext: str) -> Setup:
+    """
+    Export the report of a full comparison.
+    """
+
+    def setup(src: str, ref: str, args: argparse.Namespace):
+        report = compare(
+            src,
+            ref,
+            Report(),
+            jobs=args.jobs,
+            executor=args.executor,
+            options=OPTIONS,
+        )
+        path = os.path.join(os.path.dirname(src), "report" + ext)
+
+        def run():
+            report_export(report, path).export(path)
+            return len({check.path for check in report.checks})
+
+        return run
+
+    return setup
+
+
+SCENARIOS: Dict[str, Setup] = {
+    "data-json": check_scenario("DataFileCheck", "data", ["*.json"]),
+    "data-yaml": check_scenario("DataFileCheck", "data", ["*.yml"]),
+    "data-csv": check_scenario("DataFileCheck", "data", ["*.csv"]),
+    "image-labels": check_scenario("ImageFileCheck", "images", ["labels.*"]),
+    "image-values": check_scenario("ImageFileCheck", "images", ["values.*"]),
+    "dicomseg": check_scenario("DicomsegContentCheck", "seg", ["*.seg.dcm"]),
+    "size": check_scenario("SizeCheck", "files", ["*.txt"]),
+    "scan": scan_scenario,
+    "compare": compare_scenario,
+    "export-yaml": export_scenario(".yml"),
+    "export-json": export_scenario(".json"),
+    "export-msgpack": export_scenario(".msgpack"),
+}
+
+
+def prepare_tree(path: str, config: TreeConfig) -> Tuple[str, str]:
+    """
+    Generate the tree unless the directory already holds one of the same config.
+    """
+
+    config_path = os.path.join(path, "config.json")
+    if os.path.isfile(config_path):
+        with open(config_path, "r") as f:
+            if json.load(f) == config.to_dict():
+                return os.path.join(path, "src"), os.path.join(path, "ref")
+
+    print(f"generating tree in {path} ...", file=sys.stderr)
+    generate_tree(path, config, KINDS)
+    with open(config_path, "w") as f:
+        json.dump(config.to_dict(), f, indent=2)
+
+    return os.path.join(path, "src"), os.path.join(path, "ref")
+
+
+def measure(run: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = run()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "files": files,
+        "seconds": min(times),
+        "median": statistics.median(times),
+        "files_per_second": files / min(times) if min(times) > 0 else None,
+    }
+
+
+def regressions(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[Tuple[str, float]]:
+    """
+    Scenarios that are slower than their baseline by more than the tolerance
+    (a fraction), with their ratio to the baseline.
+    """
+
+    slower = []
+    for name, result in results.items():
+        base = baseline["scenarios"].get(name)
+        if base is None or base["seconds"] <= 0:
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        if ratio > 1.0 + tolerance:
+            slower.append((name, ratio))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--tree", default=None, help="directory of the generated tree (reused)"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--executor", default=None)
+    parser.add_argument("--save", default=None, help="write the results as baseline")
+    parser.add_argument("--baseline", default=None, help="compare against a baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="fail if a scenario is slower than the baseline by more than this",
+    )
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = parse_config(args)
+    tree = args.tree or tempfile.mkdtemp(prefix="medcmp-bench-")
+
+    baseline: Optional[Dict[str, Any]] = None
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline["config"] != config.to_dict():
+            sys.exit("baseline was measured on a tree of another config")
+
+    try:
+        src, ref = prepare_tree(tree, config)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        print(f"{'scenario':<16} {'files':>7} {'best':>10} {'median':>10} {'ratio':>7}")
+        for name in args.scenarios:
+            results[name] = result = measure(
+                SCENARIOS[name](src, ref, args), args.repeat
+            )
+
+            ratio = ""
+            if baseline is not None and name in baseline["scenarios"]:
+                ratio = f"{result['seconds'] / baseline['scenarios'][name]['seconds']:6.2f}x"
+            print(
+                f"{name:<16} {result['files']:>7} {result['seconds']:9.3f}s"
+                f" {result['median']:9.3f}s {ratio:>7}"
+            )
+    finally:
+        if args.tree is None:
+            shutil.rmtree(tree)
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "config": config.to_dict(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "jobs": args.jobs,
+                    "executor": args.executor,
+                    "repeat": args.repeat,
+                    "scenarios": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if baseline is not None:
+        slower = regressions(results, baseline, args.tolerance)
+        if len(slower) > 0:
+            sys.exit(
+                "regressions: "
+                + ", ".join(f"{name} ({ratio:.2f}x)" for name, ratio in slower)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark loading large yml files: the yaml loaders (pure python and libyaml) on
+a synthetic document, and the data file check on a perturbed pair of them, once
+loading both files and once streaming them. Each measurement runs in a fresh
+process, so its peak memory is reported as well.
+
+Loaders that construct a document of other values or types than the generated
+one are marked.
+
+Usage:
+    python -m bench.yaml_load [--size 50] [--loaders FullLoader CSafeLoader ...]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+from medcmp.checks.DataFileCheck import DataFileCheck
+from medcmp.profile import peak_rss
+
+from bench.data_diff import perturb, synthetic_document
+
+LOADERS = ["FullLoader", "SafeLoader", "CFullLoader", "CSafeLoader"]
+
+# approximate size of a leaf value of the synthetic document in yml (bytes)
+LEAF_SIZE = 27
+
+
+def fingerprint(data: Any) -> str:
+    # json tells ints, floats and strings apart
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def generate(paths: Dict[str, str], size: float) -> str:
+    """
+    Write a synthetic document of about size MB and a perturbed copy of it, and
+    return the fingerprint of the document.
+    """
+
+    ref = synthetic_document(int(size * 2**20 / LEAF_SIZE))
+    for name, doc in [("src", perturb(ref)), ("ref", ref)]:
+        with open(paths[name], "w") as f:
+            # in insertion order, so that streaming does not fall back on the keys
+            # added to the source
+            yaml.dump(
+                doc, f, Dumper=getattr(yaml, "CDumper", yaml.Dumper), sort_keys=False
+            )
+    return fingerprint(ref)
+
+
+def load(path: str, loader: str) -> Tuple[float, Optional[int], str]:
+    start = time.perf_counter()
+    with open(path, "r") as f:
+        data = yaml.load(f, Loader=getattr(yaml, loader))
+    seconds = time.perf_counter() - start
+    return seconds, peak_rss(), fingerprint(data)
+
+
+def check(src: str, ref: str, streamed: bool) -> Tuple[float, Optional[int], str]:
+    threshold = 1 if streamed else 0
+    start = time.perf_counter()
+    entry = DataFileCheck(
+        src, ref, stream_threshold=threshold, yaml_stream_threshold=threshold
+    ).run()
+    seconds = time.perf_counter() - start
+    assert entry is not None
+    labels = [note.label for note in entry.notes]
+    return seconds, peak_rss(), f"{len(entry.findings)} findings, notes {labels}"
+
+
+def isolated(fn, *args):
+    # a fresh process per measurement, its peak memory is its own
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=float, default=50, help="file size (MB)")
+    parser.add_argument(
+        "--loaders",
+        nargs="+",
+        choices=LOADERS,
+        default=[loader for loader in LOADERS if hasattr(yaml, loader)],
+    )
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="medcmp-yaml-")
+    try:
+        # generated in a process of its own, which would raise the peak memory
+        # of the measurements forked from this one
+        paths = {
+            "src": os.path.join(tmp, "src.yml"),
+            "ref": os.path.join(tmp, "ref.yml"),
+        }
+        expected = isolated(generate, paths, args.size)
+
+        size = os.path.getsize(paths["ref"]) / 2**20
+        print(f"yml file of {size:.1f}MB")
+        print(f"{'':<22} {'time':>9} {'peak rss':>12}")
+
+        def row(name: str, seconds: float, rss: Optional[int], info: str = ""):
+            rss_info = f"{rss / 2**20:10.1f}MB" if rss is not None else f"{'-':>12}"
+            print(f"{name:<22} {seconds:8.2f}s {rss_info} {info}")
+
+        for loader in args.loaders:
+            seconds, rss, digest = isolated(load, paths["ref"], loader)
+            row(loader, seconds, rss, "" if digest == expected else "(differs)")
+
+        for streamed in [False, True]:
+            name = "check streamed" if streamed else "check loaded"
+            row(name, *isolated(check, paths["src"], paths["ref"], streamed))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
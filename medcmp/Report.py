@@ -1,9 +1,25 @@
 import os
+import copy
+import json
 import yaml
 import uuid
 import datetime
+from enum import Enum
 
-from typing import Union, Optional, List, Dict, TypedDict, Any
+from typing import Union, Optional, List, Dict, TypedDict, Any, Protocol, Type
+
+from medcmp.profile import PROFILE_KEYS
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # type: ignore
+
+# use libyaml if available
+YamlDumper = getattr(yaml, "CDumper", yaml.Dumper)
+YamlLoader = getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
 class CheckerDataDict(TypedDict):
@@ -11,64 +27,175 @@ class CheckerDataDict(TypedDict):
     findings: Dict[str, int]
 
 
+class ReportSink(Protocol):
+    """
+    Receives report content as soon as it is added to a report (e.g., to write it
+    to disk while the comparison is still running).
+    """
+
+    def add_missing(self, path: str): ...
+
+    def add_extra(self, path: str): ...
+
+    def add(self, entry: "ReportCheck"): ...
+
+
 class Report:
     files_missing: List[str] = []  # files missing in src
     files_extra: List[str] = []  # files missing in ref
     checks: List["ReportCheck"] = []  # list of checks
 
-    def __init__(self, name: Optional[str] = None):
+    def __init__(
+        self, name: Optional[str] = None, retain: bool = True, profile: bool = False
+    ):
+        """
+        Without retain, checks are only passed on to the sinks and folded into the
+        summary, but not kept in memory. Retained checks are folded when the report
+        is summarized, so checks added to the list directly are counted as well.
+        With profile, the resource usage of each check is exported with it and
+        summarized per checker.
+        """
+
         self.files_missing = []
         self.files_extra = []
         self.checks = []
+        self.sinks: List[ReportSink] = []
+        self.retain = retain
+        self.profile = profile
 
         self.id = str(uuid.uuid4())
         self.name = name
         self.datetime = datetime.datetime.now()
 
+        # summary and conclusion, updated with each folded check
+        self.checker_data: Dict[str, CheckerDataDict] = {}
+        self.profile_data: Dict[str, Dict[str, Any]] = {}
+        self.passed = True
+
+        # number of retained checks folded into the summary
+        self.folded = 0
+
+    def add_missing(self, path: str):
+        self.files_missing.append(path)
+        for sink in self.sinks:
+            sink.add_missing(path)
+
+    def add_extra(self, path: str):
+        self.files_extra.append(path)
+        for sink in self.sinks:
+            sink.add_extra(path)
+
     def add(self, entry: "ReportCheck"):
-        self.checks.append(entry)
+        for sink in self.sinks:
+            sink.add(entry)
+        if self.retain:
+            self.checks.append(entry)
+        else:
+            self.fold(entry)
+
+    def fold_checks(self):
+        """
+        Fold the retained checks that are not yet in the summary. If checks were
+        removed from the list, the summary is counted again from all checks.
+        """
+
+        if len(self.checks) < self.folded:
+            self.checker_data = {}
+            self.profile_data = {}
+            self.passed = True
+            self.folded = 0
+
+        for entry in self.checks[self.folded :]:
+            self.fold(entry)
+        self.folded = len(self.checks)
+
+    def fold(self, entry: "ReportCheck"):
+        """
+        Add a check to the summary and conclusion.
+        """
+
+        if entry.checker not in self.checker_data:
+            self.checker_data[entry.checker] = {
+                # "files": [],
+                "files": 0,
+                "findings": {},
+            }
+        # checker_data[check.checker]["files"].append(check.path)
+        checker = self.checker_data[entry.checker]
+        checker["files"] += 1
+        for finding in entry.findings:
+            if finding.label not in checker["findings"]:
+                checker["findings"][finding.label] = 0
+            checker["findings"][finding.label] += 1
+
+        if len(entry.findings) > 0:
+            self.passed = False
+
+        if "wall_time" in entry.meta:
+            self.fold_profile(entry)
+
+    def fold_profile(self, entry: "ReportCheck"):
+        """
+        Add the resource usage of a check to the profile of its checker: totals
+        and maxima over all files.
+        """
+
+        if entry.checker not in self.profile_data:
+            self.profile_data[entry.checker] = {
+                "files": 0,
+                "wall_time": 0.0,
+                "wall_time_max": 0.0,
+                "cpu_time": 0.0,
+                "rss_peak_delta_max": 0,
+                "bytes_read": 0,
+            }
+        profile = self.profile_data[entry.checker]
+        profile["files"] += 1
+        profile["wall_time"] += entry.meta["wall_time"]
+        profile["wall_time_max"] = max(
+            profile["wall_time_max"], entry.meta["wall_time"]
+        )
+        profile["cpu_time"] += entry.meta["cpu_time"]
+        if entry.meta.get("rss_peak_delta") is not None:
+            profile["rss_peak_delta_max"] = max(
+                profile["rss_peak_delta_max"], entry.meta["rss_peak_delta"]
+            )
+        if entry.meta.get("bytes_read") is not None:
+            profile["bytes_read"] += entry.meta["bytes_read"]
 
     def summarize(self) -> dict:
-        checker_data: Dict[str, CheckerDataDict] = {}
-
-        for check in self.checks:
-            if check.checker not in checker_data:
-                checker_data[check.checker] = {
-                    # "files": [],
-                    "files": 0,
-                    "findings": {},
-                }
-            # checker_data[check.checker]["files"].append(check.path)
-            checker_data[check.checker]["files"] += 1
-            for finding in check.findings:
-                if finding.label not in checker_data[check.checker]["findings"]:
-                    checker_data[check.checker]["findings"][finding.label] = 0
-                checker_data[check.checker]["findings"][finding.label] += 1
+        self.fold_checks()
 
         # reduce checker array to unique files
         data = {
             "files_missing": len(self.files_missing),
             "files_extra": len(self.files_extra),
-            "checks": checker_data,
+            "checks": copy.deepcopy(self.checker_data),
         }
 
+        # resource usage per checker
+        if self.profile:
+            data["profile"] = copy.deepcopy(self.profile_data)
+
         return data
 
     def conclude(self) -> bool:
+        self.fold_checks()
         return (
-            len(self.files_missing) == 0
-            and len(self.files_extra) == 0
-            and all([len(check.findings) == 0 for check in self.checks])
+            len(self.files_missing) == 0 and len(self.files_extra) == 0 and self.passed
         )
 
 
 class ReportCheck:
-    def __init__(self, path: str, checker: str, meta: dict = {}):
+    # reports can hold millions of checks and facts, slots keep them small
+    __slots__ = ("checker", "findings", "meta", "notes", "path")
+
+    def __init__(self, path: str, checker: str, meta: Optional[dict] = None):
         self.path = path
         self.checker = checker
         self.findings: List[ReportCheckFinding] = []
         self.notes: List[ReportCheckNote] = []
-        self.meta = meta
+        self.meta = meta if meta is not None else {}
 
     def add(self, fact: Union["ReportCheckFinding", "ReportCheckNote"]):
         if isinstance(fact, ReportCheckNote):
@@ -80,6 +207,8 @@ class ReportCheck:
 
 
 class ReportCheckFinding:
+    __slots__ = ("description", "info", "label", "subpath")
+
     subpath: str
     label: str
     description: str
@@ -93,6 +222,8 @@ class ReportCheckFinding:
 
 
 class ReportCheckNote:
+    __slots__ = ("description", "info", "label", "subpath")
+
     subpath: str
     label: str
     description: str
@@ -139,11 +270,11 @@ class ReportYamlExport:
     def __init__(self, report: Report):
         self.report = report
 
-    def generate(self):
+    def header(self) -> dict:
         data = {
             "id": self.report.id,
             "name": self.report.name,
-            "date": self.report.datetime.strftime("%Y-%m-%d %H:%M:%S"),
+            "date": self.report.datetime.strftime(DATE_FORMAT),
         }
 
         # if not specified do not include name field
@@ -158,77 +289,93 @@ class ReportYamlExport:
         if len(self.report.files_extra) > 0:
             data["extra_files"] = self.report.files_extra
 
-        # grouping by paths
-        file_checks = {}
-        if len(self.report.checks):
-            for check in self.report.checks:
-                if check.path not in file_checks:
-                    file_checks[check.path] = []
-                file_checks[check.path].append(check)
+        return data
 
-        # add all findings
-        if len(self.report.checks) > 0:
-            data["checked_files"] = []
-
-            for path, checks in file_checks.items():
-                checked_file = {
-                    "file": os.path.basename(path),
-                    "path": path,
-                    "checks": [],
-                }
-
-                for check in checks:
-                    item = {}
-                    item["checker"] = check.checker
-                    # item["meta"] = finding.meta
-
-                    # add notes
-                    item["notes"] = []
-                    for note in check.notes:
-                        note_item = {}
-                        note_item["label"] = note.label
-                        note_item["description"] = note.description
-                        if note.subpath:
-                            note_item["subpath"] = note.subpath
-                        if note.info:
-                            note_item["info"] = note.info
-                        item["notes"].append(note_item)
-
-                    # add findings
-                    item["findings"] = []
-                    for finding in check.findings:
-                        fact_item = {}
-                        fact_item["label"] = finding.label
-                        fact_item["description"] = finding.description
-                        if finding.subpath:
-                            fact_item["subpath"] = finding.subpath
-                        if finding.info:
-                            fact_item["info"] = finding.info
-                        item["findings"].append(fact_item)
-
-                    # remove empty findings and empty notes from item
-                    if len(item["notes"]) == 0:
-                        del item["notes"]
-
-                    if len(item["findings"]) == 0:
-                        del item["findings"]
-
-                    # add item to file cheks
-                    checked_file["checks"].append(item)
-
-                # add file checks to data
-                data["checked_files"].append(checked_file)
+    @staticmethod
+    def check_item(check: ReportCheck, profile: bool = False) -> dict:
+        item = {}
+        item["checker"] = check.checker
+        # item["meta"] = finding.meta
+
+        # add resource usage
+        if profile and "wall_time" in check.meta:
+            item["profile"] = {key: check.meta[key] for key in PROFILE_KEYS}
+
+        # add notes
+        item["notes"] = []
+        for note in check.notes:
+            note_item = {}
+            note_item["label"] = note.label
+            note_item["description"] = note.description
+            if note.subpath:
+                note_item["subpath"] = note.subpath
+            if note.info:
+                note_item["info"] = note.info
+            item["notes"].append(note_item)
+
+        # add findings
+        item["findings"] = []
+        for finding in check.findings:
+            fact_item = {}
+            fact_item["label"] = finding.label
+            fact_item["description"] = finding.description
+            if finding.subpath:
+                fact_item["subpath"] = finding.subpath
+            if finding.info:
+                fact_item["info"] = finding.info
+            item["findings"].append(fact_item)
+
+        # remove empty findings and empty notes from item
+        if len(item["notes"]) == 0:
+            del item["notes"]
+
+        if len(item["findings"]) == 0:
+            del item["findings"]
+
+        return item
+
+    @staticmethod
+    def checked_file(path: str, items: List[dict]) -> dict:
+        return {
+            "file": os.path.basename(path),
+            "path": path,
+            "checks": items,
+        }
 
+    def footer(self) -> dict:
         # add summary (remove all empty finding objects to reduce size)
         # NOTE: report summary only contains findings (not notes)
         report_summary = self.report.summarize()
         for checker in report_summary["checks"]:
             if not bool(report_summary["checks"][checker]["findings"]):
                 del report_summary["checks"][checker]["findings"]
-        data["summary"] = report_summary
 
         # add conclusion
-        data["conclusion"] = self.report.conclude()
+        return {"summary": report_summary, "conclusion": self.report.conclude()}
+
+    def generate(self):
+        data = self.header()
+
+        # grouping by paths
+        file_checks: Dict[str, List[ReportCheck]] = {}
+        if len(self.report.checks):
+            for check in self.report.checks:
+                if check.path not in file_checks:
+                    file_checks[check.path] = []
+                file_checks[check.path].append(check)
+
+        # add all findings
+        if len(self.report.checks) > 0:
+            data["checked_files"] = [
+                self.checked_file(
+                    path,
+                    [self.check_item(check, self.report.profile) for check in checks],
+                )
+                for path, checks in file_checks.items()
+            ]
+
+        # add summary and conclusion
+        data.update(self.footer())
 
         # return generated data
         return data
@@ -239,4 +386,114 @@ class ReportYamlExport:
 
         # write yaml file
         with open(path, "w") as f:
-            yaml.dump(data, f, sort_keys=False, indent=2)
+            yaml.dump(data, f, Dumper=YamlDumper, sort_keys=False, indent=2)
+
+
+class ReportJsonExport(ReportYamlExport):
+    def export(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.generate(), f, indent=2, default=plain_value)
+
+
+class ReportMsgpackExport(ReportYamlExport):
+    def export(self, path: str):
+        if msgpack is None:
+            raise RuntimeError("MessagePack reports require the msgpack package.")
+
+        with open(path, "wb") as f:
+            f.write(msgpack.packb(self.generate(), default=plain_value))
+
+
+# report formats by file extension
+REPORT_EXPORTS: Dict[str, Type[ReportYamlExport]] = {
+    ".yml": ReportYamlExport,
+    ".yaml": ReportYamlExport,
+    ".json": ReportJsonExport,
+    ".msgpack": ReportMsgpackExport,
+}
+
+
+def report_export(report: Report, path: str) -> ReportYamlExport:
+    """
+    Return the exporter for the format of a report path (yaml by default).
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    return REPORT_EXPORTS.get(ext, ReportYamlExport)(report)
+
+
+def plain_value(value: Any) -> Any:
+    """
+    Convert values json / msgpack do not know (numpy scalars and arrays, enums,
+    sets, ...).
+    """
+
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def read_check(path: str, item: Dict[str, Any]) -> ReportCheck:
+    """
+    Create a report check from a check item of an exported report.
+    """
+
+    entry = ReportCheck(path, item["checker"], dict(item.get("profile", {})))
+    for note in item.get("notes", []):
+        entry.add(
+            ReportCheckNote(
+                note["label"],
+                note["description"],
+                note.get("info"),
+                note.get("subpath", ""),
+            )
+        )
+    for finding in item.get("findings", []):
+        entry.add(
+            ReportCheckFinding(
+                finding["label"],
+                finding["description"],
+                finding.get("info"),
+                finding.get("subpath", ""),
+            )
+        )
+    return entry
+
+
+def load_report(path: str) -> Report:
+    """
+    Load an exported report (yaml, json or msgpack, by file extension).
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".json":
+        with open(path, "r") as f:
+            data = json.load(f)
+    elif ext == ".msgpack":
+        if msgpack is None:
+            raise RuntimeError("MessagePack reports require the msgpack package.")
+        # infos keep their int keys (e.g. labels) in msgpack
+        with open(path, "rb") as f:
+            data = msgpack.unpackb(f.read(), strict_map_key=False)
+    else:
+        with open(path, "r") as f:
+            data = yaml.load(f, Loader=YamlLoader)
+
+    report = Report(data.get("name"), profile="profile" in data.get("summary", {}))
+    report.id = data["id"]
+    report.datetime = datetime.datetime.strptime(data["date"], DATE_FORMAT)
+
+    for missing_path in data.get("missing_files", []):
+        report.add_missing(missing_path)
+    for extra_path in data.get("extra_files", []):
+        report.add_extra(extra_path)
+    for checked_file in data.get("checked_files", []):
+        for item in checked_file["checks"]:
+            report.add(read_check(checked_file["path"], item))
+
+    return report
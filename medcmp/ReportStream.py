@@ -0,0 +1,222 @@
+import json
+import yaml
+import datetime
+
+from typing import IO, Any, Dict, List, Optional
+
+from medcmp.Report import (
+    DATE_FORMAT,
+    Report,
+    ReportCheck,
+    ReportYamlExport,
+    YamlDumper,
+    plain_value,
+    read_check,
+    report_export,
+)
+
+
+class ReportStream:
+    """
+    Writes a report to a JSON Lines file while the comparison is running, one line
+    per missing / extra file and per check. Every summary_interval checks (and on
+    close) a line with the current summary and conclusion is added, so an
+    interrupted run still leaves a usable report behind.
+
+    Line types:
+      report     id, name, date and profiling of the report (first line)
+      missing    path of a file missing in src
+      extra      path of a file missing in ref
+      check      path and check item as in the yaml report (tuples and dicts with
+                 keys other than strings are tagged, see tag_value)
+      summary    summary and conclusion so far
+    """
+
+    def __init__(self, report: Report, path: str, summary_interval: int = 100):
+        self.report = report
+        self.path = path
+        self.summary_interval = summary_interval
+        self.count = 0
+
+        self.file: Optional[IO[str]] = open(path, "w")
+        self.write(
+            {
+                "type": "report",
+                "id": report.id,
+                "name": report.name,
+                "date": report.datetime.strftime(DATE_FORMAT),
+                "profile": report.profile,
+            }
+        )
+
+        # receive all content added to the report from now on
+        report.sinks.append(self)
+
+    def write(self, line: Dict[str, Any]):
+        assert self.file is not None
+        self.file.write(json.dumps(line, default=plain_value) + "\n")
+        self.file.flush()
+
+    def write_summary(self):
+        self.write(
+            {
+                "type": "summary",
+                "summary": self.report.summarize(),
+                "conclusion": self.report.conclude(),
+            }
+        )
+
+    def add_missing(self, path: str):
+        self.write({"type": "missing", "path": path})
+
+    def add_extra(self, path: str):
+        self.write({"type": "extra", "path": path})
+
+    def add(self, entry: ReportCheck):
+        item = ReportYamlExport.check_item(entry, self.report.profile)
+        self.write({"type": "check", "path": entry.path, **tag_value(item)})
+
+        self.count += 1
+        if self.count % self.summary_interval == 0:
+            self.write_summary()
+
+    def close(self):
+        if self.file is None:
+            return
+
+        self.write_summary()
+        self.file.close()
+        self.file = None
+        self.report.sinks.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def tag_value(value: Any) -> Any:
+    """
+    Tag the values json would change: tuples (which it writes as lists) and dicts
+    with keys other than strings (which it turns into strings). untag_value
+    restores them when the line is read.
+    """
+
+    if isinstance(value, tuple):
+        return {"__tuple__": [tag_value(v) for v in value]}
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: tag_value(v) for k, v in value.items()}
+        return {"__items__": [[tag_value(k), tag_value(v)] for k, v in value.items()]}
+    if isinstance(value, list):
+        return [tag_value(v) for v in value]
+    return value
+
+
+def untag_value(obj: Dict[str, Any]) -> Any:
+    # json object hook, the inverse of tag_value
+    if len(obj) == 1 and "__tuple__" in obj:
+        return tuple(obj["__tuple__"])
+    if len(obj) == 1 and "__items__" in obj:
+        return {k: v for k, v in obj["__items__"]}
+    return obj
+
+
+def yaml_item(item: Dict[str, Any]) -> str:
+    """
+    Dump a check item as it appears in the checks of a checked file of a yaml
+    report (at the same indentation, so long values are wrapped alike).
+    """
+
+    text = yaml.dump([{"checks": [item]}], Dumper=YamlDumper, sort_keys=False, indent=2)
+    return text[text.index("\n") + 1 :]
+
+
+def read_lines(f: IO[bytes]):
+    """
+    Iterate over (offset, line) of a report stream. A trailing partial line (e.g.,
+    of an interrupted run) is skipped.
+    """
+
+    while True:
+        offset = f.tell()
+        raw = f.readline()
+        if not raw:
+            break
+
+        try:
+            yield offset, json.loads(raw, object_hook=untag_value)
+        except ValueError:
+            break
+
+
+def finalize_stream(stream_path: str, report_path: str) -> Report:
+    """
+    Write the report of a report stream, in the format chosen by the extension of
+    the report path. Yaml reports are written in the same layout as
+    ReportYamlExport with the checks copied from the stream one file at a time,
+    so the full report is never held in memory. Other formats are exported from a
+    report loaded from the stream.
+
+    Returns the report with summary and conclusion (checks only for formats other
+    than yaml).
+    """
+
+    export = report_export(Report(), report_path)
+    streamable = type(export) is ReportYamlExport
+
+    report = Report(retain=not streamable)
+    file_offsets: Dict[str, List[int]] = {}
+
+    with open(stream_path, "rb") as f:
+        # collect header, missing / extra files and the checks of each file, and
+        # fold all checks into the summary
+        for offset, line in read_lines(f):
+            if line["type"] == "report":
+                report.id = line["id"]
+                report.name = line["name"]
+                report.datetime = datetime.datetime.strptime(line["date"], DATE_FORMAT)
+                report.profile = line.get("profile", False)
+            elif line["type"] == "missing":
+                report.add_missing(line["path"])
+            elif line["type"] == "extra":
+                report.add_extra(line["path"])
+            elif line["type"] == "check":
+                report.add(read_check(line["path"], line))
+                file_offsets.setdefault(line["path"], []).append(offset)
+
+        if not streamable:
+            report_export(report, report_path).export(report_path)
+            return report
+
+        export = ReportYamlExport(report)
+
+        with open(report_path, "w") as out:
+            yaml.dump(
+                export.header(), out, Dumper=YamlDumper, sort_keys=False, indent=2
+            )
+
+            # add checked files one by one
+            if len(file_offsets) > 0:
+                out.write("checked_files:\n")
+
+            for path, offsets in file_offsets.items():
+                checked_file = export.checked_file(path, [])
+                del checked_file["checks"]
+                yaml.dump(
+                    [checked_file], out, Dumper=YamlDumper, sort_keys=False, indent=2
+                )
+                out.write("  checks:\n")
+
+                for offset in offsets:
+                    f.seek(offset)
+                    line = json.loads(f.readline(), object_hook=untag_value)
+                    del line["type"], line["path"]
+                    out.write(yaml_item(line))
+
+            yaml.dump(
+                export.footer(), out, Dumper=YamlDumper, sort_keys=False, indent=2
+            )
+
+    return report
@@ -0,0 +1,203 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+
+from medcmp import __version__
+from medcmp.scan import file_digest
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class CacheEntry:
+    """
+    A decoded reference file in the cache. Arrays are memory-mapped on access.
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.path = path
+        self.meta = meta
+
+    def array(self, name: str) -> "np.ndarray":
+        import numpy as np
+
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+
+
+class ReferenceCache:
+    """
+    On-disk cache for decoded reference files (images, segmentations).
+
+    Entries are keyed by the medcmp version, the absolute reference path, its size
+    and modification time (and optionally its content hash). Each entry is a directory with one
+    .npy file per array and a meta.json file. When the cache grows beyond
+    max_bytes, the least recently used entries are removed. The size of the cache
+    is listed once and then tracked per stored entry, so entries are only listed
+    again to evict them.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = 10 * 2**30, content_hash: bool = False
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+
+        # size of all entries in bytes, listed on the first put
+        self.size: Optional[int] = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path: str, kind: str) -> str:
+        st = os.stat(path)
+        parts = [
+            __version__,
+            kind,
+            os.path.abspath(path),
+            str(st.st_size),
+            str(st.st_mtime_ns),
+        ]
+
+        if self.content_hash:
+            parts.append(file_digest(path))
+
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    def get(
+        self, path: str, kind: str, key: Optional[str] = None
+    ) -> Optional[CacheEntry]:
+        entry_path = os.path.join(self.directory, key or self.key(path, kind))
+        meta_path = os.path.join(entry_path, "meta.json")
+
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # mark entry as recently used
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+        return CacheEntry(entry_path, meta)
+
+    def put(
+        self,
+        path: str,
+        kind: str,
+        arrays: Dict[str, "np.ndarray"],
+        meta: Dict[str, Any],
+        key: Optional[str] = None,
+    ) -> CacheEntry:
+        import numpy as np
+
+        entry_path = os.path.join(self.directory, key or self.key(path, kind))
+        meta = {**meta, "arrays": list(arrays)}
+
+        # write into a temporary directory first, so concurrent workers never see
+        # partial entries
+        tmp_path = os.path.join(self.directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        size = sum(
+            os.path.getsize(os.path.join(tmp_path, f)) for f in os.listdir(tmp_path)
+        )
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+
+        try:
+            os.rename(tmp_path, entry_path)
+            self.size += size
+        except OSError:
+            # another worker stored the same entry
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        # entries stored by other workers are counted once this one evicts
+        if self.size > self.max_bytes:
+            self.evict(keep=entry_path)
+
+        return CacheEntry(entry_path, meta)
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """
+        List all entries as (last access, size in bytes, path).
+        """
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+
+            entry_path = os.path.join(self.directory, name)
+            try:
+                atime = os.stat(os.path.join(entry_path, "meta.json")).st_mtime
+                size = sum(
+                    os.path.getsize(os.path.join(entry_path, f))
+                    for f in os.listdir(entry_path)
+                )
+            except OSError:
+                continue
+
+            entries.append((atime, size, entry_path))
+
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Remove least recently used entries until the cache fits into max_bytes.
+        """
+
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total -= size
+
+        self.size = total
+
+    def load(
+        self, path: str, kind: str, decode
+    ) -> Tuple[Dict[str, "np.ndarray"], Dict[str, Any]]:
+        """
+        Return the arrays and meta data of a reference file, decoding and storing
+        it with decode(path) -> (arrays, meta) on a cache miss.
+        """
+
+        # keyed once, the content hash reads the whole file
+        key = self.key(path, kind)
+        entry = self.get(path, kind, key)
+
+        if entry is None:
+            arrays, meta = decode(path)
+            return arrays, self.put(path, kind, arrays, meta, key).meta
+
+        return {name: entry.array(name) for name in entry.meta["arrays"]}, entry.meta
+
+
+def cached_decode(
+    cache: Optional[ReferenceCache], path: str, kind: str, decode
+) -> Tuple[Dict[str, "np.ndarray"], Dict[str, Any]]:
+    """
+    Decode a file with decode(path) -> (arrays, meta), through the cache if given.
+    """
+
+    if cache is None:
+        return decode(path)
+
+    return cache.load(path, kind, decode)
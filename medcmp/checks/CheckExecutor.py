@@ -0,0 +1,112 @@
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional, Any
+
+
+class CheckExecutor(ABC):
+    """
+    Runs check tasks, either inline or on a worker pool.
+
+    Tasks are submitted with the pool they prefer ("thread" or "process"). Executors
+    that do not support a pool kind fall back to the one they have.
+    """
+
+    jobs: int = 1
+
+    @abstractmethod
+    def submit(self, fn: Callable, *args: Any, pool: str = "thread") -> Future:
+        pass
+
+    def shutdown(self):
+        pass
+
+    @property
+    def window(self) -> int:
+        # number of tasks that may be in flight before results are collected
+        return max(1, self.jobs * 4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+class SerialExecutor(CheckExecutor):
+    def __init__(self, jobs: int = 1):
+        self.jobs = 1
+
+    def submit(self, fn: Callable, *args: Any, pool: str = "thread") -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ThreadExecutor(CheckExecutor):
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.threads = ThreadPoolExecutor(max_workers=jobs)
+
+    def submit(self, fn: Callable, *args: Any, pool: str = "thread") -> Future:
+        return self.threads.submit(fn, *args)
+
+    def shutdown(self):
+        self.threads.shutdown()
+
+
+class ProcessExecutor(CheckExecutor):
+    """
+    Runs tasks that ask for the process pool (e.g., checks calling SimpleITK or
+    diffing data files) in worker processes and keeps all other tasks on threads.
+    """
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.threads = ThreadPoolExecutor(max_workers=jobs)
+        self.processes: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, fn: Callable, *args: Any, pool: str = "thread") -> Future:
+        if pool != "process":
+            return self.threads.submit(fn, *args)
+
+        # start worker processes only once the first task needs them
+        if self.processes is None:
+            self.processes = ProcessPoolExecutor(max_workers=self.jobs)
+
+        return self.processes.submit(fn, *args)
+
+    def shutdown(self):
+        self.threads.shutdown()
+        if self.processes is not None:
+            self.processes.shutdown()
+
+
+EXECUTORS = {
+    "serial": SerialExecutor,
+    "thread": ThreadExecutor,
+    "process": ProcessExecutor,
+}
+
+
+def create_executor(name: Optional[str] = None, jobs: int = 1) -> CheckExecutor:
+    """
+    Create an executor by name. Without a name, a single job runs serially and
+    multiple jobs use the process executor.
+    """
+
+    # resolve number of jobs (0 or less uses all cores)
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    # pick default executor
+    if name is None:
+        name = "serial" if jobs == 1 else "process"
+
+    if name not in EXECUTORS:
+        raise ValueError(f"Unknown executor: {name}")
+
+    return EXECUTORS[name](jobs)
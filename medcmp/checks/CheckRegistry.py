@@ -0,0 +1,193 @@
+import fnmatch
+import importlib
+import os
+from typing import Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+
+T = TypeVar("T")
+
+
+def name_suffixes(name: str) -> List[str]:
+    """
+    All suffixes of a file name starting at a dot, longest first (e.g., ".seg.dcm"
+    and ".dcm" for "mask.seg.dcm").
+    """
+
+    return [name[i:] for i, c in enumerate(name) if c == "."]
+
+
+def read_head(path: str, size: int) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read(size)
+    except OSError:
+        return b""
+
+
+class FilePatterns:
+    """
+    The files a check handles: file name suffixes, glob patterns on the file name
+    and magic bytes (at an offset) at the start of the file. A file matches if any
+    of them matches and its name has none of the excluded suffixes. Without
+    suffixes, globs and magic bytes, all files match (except the excluded ones).
+    """
+
+    def __init__(
+        self,
+        suffixes: Sequence[str] = (),
+        globs: Sequence[str] = (),
+        magic: Sequence[Tuple[int, bytes]] = (),
+        exclude: Sequence[str] = (),
+    ):
+        assert all(s.startswith(".") for s in [*suffixes, *exclude])
+        self.suffixes = tuple(suffixes)
+        self.globs = tuple(globs)
+        self.magic = tuple(magic)
+        self.exclude = tuple(exclude)
+
+    @property
+    def any_file(self) -> bool:
+        return not self.suffixes and not self.globs and not self.magic
+
+    @property
+    def head_size(self) -> int:
+        """
+        Number of bytes to read from the start of a file to test the magic bytes.
+        """
+
+        return max((offset + len(m) for offset, m in self.magic), default=0)
+
+    def match_magic(self, head: bytes) -> bool:
+        return any(head[offset : offset + len(m)] == m for offset, m in self.magic)
+
+    def matches(self, path: str) -> bool:
+        name = os.path.basename(path)
+
+        if name.endswith(self.exclude):
+            return False
+        if self.any_file or name.endswith(self.suffixes):
+            return True
+        if any(fnmatch.fnmatchcase(name, glob) for glob in self.globs):
+            return True
+
+        return len(self.magic) > 0 and self.match_magic(read_head(path, self.head_size))
+
+    def __repr__(self) -> str:
+        return (
+            f"FilePatterns(suffixes={self.suffixes!r}, globs={self.globs!r}, "
+            f"magic={self.magic!r}, exclude={self.exclude!r})"
+        )
+
+
+class DispatchIndex(Generic[T]):
+    """
+    Index of the file patterns of registered checks, built once, to find the
+    checks that apply to a file without testing every check. Suffixes are looked
+    up by the dot-suffixes of the file name; globs, magic bytes and catch-all
+    checks are tested per file, the file head is read at most once. Matching
+    checks are returned in registration order.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[T, FilePatterns]]):
+        self.entries = list(entries)
+
+        self.by_suffix: Dict[str, List[int]] = {}
+        self.any_file: List[int] = []
+        self.globs: List[Tuple[int, str]] = []
+        self.magic: List[int] = []
+        self.exclude: Dict[str, List[int]] = {}
+
+        for i, (_, patterns) in enumerate(self.entries):
+            if patterns.any_file:
+                self.any_file.append(i)
+            for suffix in patterns.suffixes:
+                self.by_suffix.setdefault(suffix, []).append(i)
+            for glob in patterns.globs:
+                self.globs.append((i, glob))
+            if len(patterns.magic) > 0:
+                self.magic.append(i)
+            for suffix in patterns.exclude:
+                self.exclude.setdefault(suffix, []).append(i)
+
+        self.head_size = max(
+            (self.entries[i][1].head_size for i in self.magic), default=0
+        )
+
+    def lookup(self, path: str) -> List[T]:
+        name = os.path.basename(path)
+        suffixes = name_suffixes(name)
+
+        matched = set(self.any_file)
+        for suffix in suffixes:
+            matched.update(self.by_suffix.get(suffix, ()))
+        for i, glob in self.globs:
+            if i not in matched and fnmatch.fnmatchcase(name, glob):
+                matched.add(i)
+
+        # only read the file if a check can still match by content
+        magic = [i for i in self.magic if i not in matched]
+        if len(magic) > 0:
+            head = read_head(path, self.head_size)
+            matched.update(i for i in magic if self.entries[i][1].match_magic(head))
+
+        for suffix in suffixes:
+            matched.difference_update(self.exclude.get(suffix, ()))
+
+        return [self.entries[i][0] for i in sorted(matched)]
+
+
+class CheckSpec:
+    """
+    A check registered by name and the files it handles, without importing it. The
+    check module (and the backends it imports, e.g. SimpleITK or pydicom) is
+    imported the first time a matching file is compared.
+    """
+
+    def __init__(self, name: str, module: str, patterns: Optional[FilePatterns] = None):
+        self.name = name
+        self.module = module
+        self.patterns = patterns if patterns is not None else FilePatterns()
+
+    def load(self) -> Type:
+        return getattr(importlib.import_module(self.module), self.name)
+
+    def __repr__(self) -> str:
+        return f"CheckSpec({self.name!r}, {self.module!r}, {self.patterns!r})"
+
+
+def check_name(check: Union[type, CheckSpec]) -> str:
+    return check.name if isinstance(check, CheckSpec) else check.__name__
+
+
+IMAGE_SUFFIXES = (".nii.gz", ".nrrd", ".mha")
+
+# checks run on each file pair, the check classes read their patterns from here
+CHECKS = [
+    CheckSpec(
+        "DataFileCheck",
+        "medcmp.checks.DataFileCheck",
+        FilePatterns(suffixes=(".json", ".yml", ".yaml", ".csv")),
+    ),
+    CheckSpec(
+        "ImageFileCheck",
+        "medcmp.checks.ImageFileCheck",
+        FilePatterns(suffixes=IMAGE_SUFFIXES),
+    ),
+    CheckSpec(
+        "SizeCheck",
+        "medcmp.checks.SizeCheck",
+        FilePatterns(exclude=(".dcm", *IMAGE_SUFFIXES)),
+    ),
+    CheckSpec(
+        "DicomsegContentCheck",
+        "medcmp.checks.DicomsegContentCheck",
+        FilePatterns(suffixes=(".seg.dcm",)),
+    ),
+]
+
+
+def check_patterns(name: str) -> FilePatterns:
+    """
+    The file patterns of a registered check, by name.
+    """
+
+    return next(spec.patterns for spec in CHECKS if spec.name == name)
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+
+class ColumnComparison:
+    """
+    Cell-wise comparison of one column present in source and reference.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rows: np.ndarray,
+        src: pd.Series,
+        ref: pd.Series,
+        tolerance: float = 0.0,
+    ):
+        self.name = name
+        self.rows = rows
+        self.tolerance = tolerance
+
+        src_values, src_numeric, src_na = numeric_view(src)
+        ref_values, ref_numeric, ref_na = numeric_view(ref)
+
+        # numeric cells are compared by value, all other cells as text
+        both_numeric = src_numeric & ref_numeric
+        both_text = ~src_numeric & ~ref_numeric & ~src_na & ~ref_na
+
+        # equal infinities have no difference (inf - inf is nan)
+        numeric_equal = both_numeric & (src_values == ref_values)
+        with np.errstate(invalid="ignore"):
+            self.diff = np.where(
+                both_numeric & ~numeric_equal, src_values - ref_values, 0.0
+            )
+        abs_diff = np.abs(self.diff)
+
+        text_equal = np.zeros(len(rows), dtype=bool)
+        if both_text.any():
+            text_equal[both_text] = (
+                src[both_text].astype(str).to_numpy()
+                == ref[both_text].astype(str).to_numpy()
+            )
+
+        self.exact = (src_na & ref_na) | numeric_equal | text_equal
+        self.close = both_numeric & (abs_diff > 0) & (abs_diff <= tolerance)
+        self.type_mismatch = (src_numeric & ~ref_numeric & ~ref_na) | (
+            ref_numeric & ~src_numeric & ~src_na
+        )
+        self.mismatch = ~self.exact & ~self.close & ~self.type_mismatch
+
+        self.src = src
+        self.ref = ref
+
+    @property
+    def identical(self) -> bool:
+        return bool(self.exact.all())
+
+    def offenders(self, mask: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+        """
+        List the cells selected by mask, largest numeric differences first.
+        """
+
+        idx = np.flatnonzero(mask)
+        order = np.argsort(-np.abs(self.diff[idx]), kind="stable")
+        idx = idx[order[:limit]]
+
+        items = []
+        for i in idx.tolist():
+            item = {
+                "row": to_python(self.rows[i]),
+                "src": to_python(self.src.iloc[i]),
+                "ref": to_python(self.ref.iloc[i]),
+            }
+            if self.diff[i] != 0:
+                item["diff"] = float(self.diff[i])
+            items.append(item)
+
+        return items
+
+    def summary(self, mask: np.ndarray, limit: int) -> Dict[str, Any]:
+        return {
+            "count": int(mask.sum()),
+            "rows": [to_python(r) for r in self.rows[mask][:limit]],
+            "worst": self.offenders(mask, limit),
+        }
+
+
+class CsvComparison:
+    """
+    Column based comparison of two csv files.
+
+    Rows are aligned on the key column if one is given, otherwise on their
+    position in the file.
+    """
+
+    def __init__(
+        self,
+        src_path: Union[str, IO[bytes]],
+        ref_path: Union[str, IO[bytes]],
+        key: Optional[str] = None,
+        tolerances: Optional[Dict[str, float]] = None,
+    ):
+        # cells are kept as written, only empty cells are missing values (pandas
+        # would also read e.g. "NA" or "null" as missing)
+        src = pd.read_csv(src_path, keep_default_na=False)
+        ref = pd.read_csv(ref_path, keep_default_na=False)
+
+        self.src_rows = len(src)
+        self.ref_rows = len(ref)
+
+        # columns
+        self.missing_columns = [c for c in ref.columns if c not in src.columns]
+        self.extra_columns = [c for c in src.columns if c not in ref.columns]
+
+        # rows
+        src, ref, rows, self.missing_rows, self.extra_rows = align_rows(src, ref, key)
+
+        # compare common columns
+        tolerances = tolerances or {}
+        self.columns: List[ColumnComparison] = []
+        for c in src.columns:
+            if c not in ref.columns or c == key:
+                continue
+
+            tolerance = tolerances.get(c, tolerances.get("*", 0.0))
+            self.columns.append(ColumnComparison(c, rows, src[c], ref[c], tolerance))
+
+
+def align_rows(
+    src: pd.DataFrame, ref: pd.DataFrame, key: Optional[str] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray, List[Any], List[Any]]:
+    """
+    Align source and reference rows. Returns both frames restricted to the common
+    rows in source order, the row labels, and the missing and extra row labels.
+    """
+
+    if key is None:
+        n = min(len(src), len(ref))
+        rows = np.arange(n)
+        missing = list(range(n, len(ref)))
+        extra = list(range(n, len(src)))
+        return src.iloc[:n], ref.iloc[:n], rows, missing, extra
+
+    for df, name in [(src, "source"), (ref, "reference")]:
+        if key not in df.columns:
+            raise ValueError(f"Key column '{key}' not found in {name} file")
+        if not df[key].is_unique:
+            raise ValueError(f"Key column '{key}' is not unique in {name} file")
+
+    src = src.set_index(key, drop=False)
+    ref = ref.set_index(key, drop=False)
+
+    in_ref = src.index.isin(ref.index)
+    in_src = ref.index.isin(src.index)
+
+    missing = [to_python(k) for k in ref.index[~in_src]]
+    extra = [to_python(k) for k in src.index[~in_ref]]
+
+    src = src[in_ref]
+    ref = ref.loc[src.index]
+
+    return src, ref, src.index.to_numpy(), missing, extra
+
+
+def numeric_view(col: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the numeric values of a column, which cells are numeric and which cells
+    are empty.
+    """
+
+    na = col.isna().to_numpy()
+    if col.dtype == object:
+        na |= (col == "").to_numpy()
+
+    # booleans are not treated as numbers
+    if pd.api.types.is_bool_dtype(col):
+        values = np.full(len(col), np.nan)
+    elif pd.api.types.is_numeric_dtype(col):
+        values = col.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+
+    numeric = ~np.isnan(values) & ~na
+    return values, numeric, na
+
+
+def to_python(value: Any) -> Any:
+    """
+    Convert numpy / pandas scalars into plain python values for the report.
+    """
+
+    if value is pd.NA:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
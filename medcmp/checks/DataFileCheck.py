@@ -1,12 +1,36 @@
 from .FileCompare import FileCheck
-from typing import Union, Optional, Any
+from .CheckRegistry import check_patterns
+from typing import (
+    TYPE_CHECKING,
+    IO,
+    Union,
+    Optional,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+)
 from enum import Enum
+from functools import lru_cache
 import math
 import sys
+import io
 import yaml
 import json
 import csv
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# numeric items of one type are compared vectorized (with numpy) from this many on
+BATCH_MIN_ITEMS = 64
+
+# reads quoted keys of value paths
+JSON_DECODER = json.JSONDecoder()
+
 
 class ComparisonOutcome(Enum):
     UNDEFINED = "undefined"
@@ -19,34 +43,160 @@ class ComparisonOutcome(Enum):
     VALUE_EXACT = "value_exact"
 
 
+class PathNode:
+    """
+    A container (dict or list) in a data document, as a node of a path trie: each
+    node holds its key (or list index, as int) and its parent, so all paths of a
+    document share their prefixes. The dotted string form (e.g. "cases.[0]") is
+    only built when a path below it is reported, and kept once built.
+    """
+
+    __slots__ = ("_str", "key", "parent")
+
+    def __init__(self, parent: Optional["PathNode"] = None, key: Any = None):
+        self.parent = parent
+        self.key = key
+        self._str: Optional[str] = "" if parent is None else None
+
+    def keys(self) -> Tuple[Any, ...]:
+        """
+        Keys and list indices from the document root to this node.
+        """
+
+        keys = []
+        node: Optional[PathNode] = self
+        while node is not None and node.parent is not None:
+            keys.append(node.key)
+            node = node.parent
+        return tuple(reversed(keys))
+
+    def __str__(self) -> str:
+        if self._str is None:
+            # build from the closest ancestor already converted (without recursion,
+            # documents can be deep)
+            chain = []
+            node: Optional[PathNode] = self
+            while node is not None and node._str is None:
+                chain.append(node)
+                node = node.parent
+
+            prefix = node._str if node is not None else ""
+            for node in reversed(chain):
+                node._str = join_path(prefix, node.key)
+                prefix = node._str
+
+        return self._str  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"PathNode({str(self)!r})"
+
+
+def path_segment(key: Any) -> str:
+    """
+    String form of a key in a value path: list indices in brackets, keys that
+    contain dots or quotes or start with a bracket quoted.
+    """
+
+    if type(key) is int:
+        return f"[{key}]"
+
+    key = key if isinstance(key, str) else str(key)
+    if "." in key or '"' in key or key.startswith("["):
+        return json.dumps(key)
+    return key
+
+
+def join_path(prefix: str, key: Any) -> str:
+    return prefix + "." + path_segment(key) if prefix else path_segment(key)
+
+
 class ComparisonItem:
-    path: str
-    type: Optional[str] = None
-    src_value: Any = None
-    ref_value: Any = None
-    outcome: ComparisonOutcome = ComparisonOutcome.UNDEFINED
-    info: Any = None
-    # precision: tuple = None
+    # one per compared leaf of a data file, slots keep large documents small
+    __slots__ = ("_base", "_path", "info", "outcome", "ref_value", "src_value", "type")
+
+    def __init__(
+        self,
+        path: Any = "",
+        type: Optional[str] = None,
+        src_value: Any = None,
+        ref_value: Any = None,
+        outcome: ComparisonOutcome = ComparisonOutcome.UNDEFINED,
+        info: Any = None,
+        base: Optional[PathNode] = None,
+    ):
+        """
+        With base (the node of the containing dict or list), path is the key of
+        the value in it. The path string is only built when it is read.
+        """
+
+        self._base = base
+        self._path = path
+        self.type = type
+        self.src_value = src_value
+        self.ref_value = ref_value
+        self.outcome = outcome
+        self.info = info
+        # self.precision: tuple = None
+
+    @property
+    def path(self) -> str:
+        if self._base is not None:
+            self._path = join_path(str(self._base), self._path)
+            self._base = None
+        return self._path
+
+    @path.setter
+    def path(self, path: str):
+        self._base = None
+        self._path = path
 
 
-def get_data(file_path: str):
+# safe loader of libyaml if available, it resolves the same implicit types (int,
+# float, bool, null, timestamps) as yaml.FullLoader
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream: Union[IO[str], bytes]):
     """
-    Read a json / yml file and return the data.
+    Load a yml document with the safe loader. Documents with python tags, which
+    only yaml.FullLoader constructs, are loaded again with it.
+    """
+
+    try:
+        return yaml.load(stream, Loader=YamlLoader)
+    except yaml.constructor.ConstructorError:
+        if not isinstance(stream, bytes):
+            stream.seek(0)
+        return yaml.load(stream, Loader=yaml.FullLoader)
+
+
+def get_data(file_path: str, content: Optional[bytes] = None):
+    """
+    Read a json / yml file and return the data. If the file content is already
+    loaded, it is parsed from memory.
     """
 
     # check file type
     if file_path.endswith(".json"):
-        with open(file_path, "r") as f:
-            data = json.load(f)
+        if content is not None:
+            data = json.loads(content)
+        else:
+            with open(file_path, "r") as f:
+                data = json.load(f)
     elif file_path.endswith(".yml") or file_path.endswith(".yaml"):
-        with open(file_path, "r") as f:
-            data = yaml.load(f, Loader=yaml.FullLoader)
+        if content is not None:
+            data = load_yaml(content)
+        else:
+            with open(file_path, "r") as f:
+                data = load_yaml(f)
     elif file_path.endswith(".csv"):
-        with open(file_path, "r") as f:
-            reader = csv.DictReader(f)
+        if content is not None:
+            reader = csv.DictReader(io.StringIO(content.decode()))
             data = [row for row in reader]
-            print("RECEIVED CSV DATA")
-            print(data)
+        else:
+            with open(file_path, "r") as f:
+                reader = csv.DictReader(f)
+                data = [row for row in reader]
     else:
         raise Exception(f"Unknown file type: {file_path}")
 
@@ -59,48 +209,236 @@ def scan_data_paths(d: Union[dict, list], base: str = ""):
     recursively scan a data object and return a list of value paths
     """
 
-    # collect a list of key items
-    items = []
+    root = PathNode()
+    for key in parse_path(base):
+        root = PathNode(root, key)
+
+    # collect a list of key items, walking the data with a stack of iterators
+    items: List[str] = []
+    stack = [(root, data_children(d))]
+    while len(stack) > 0:
+        node, children = stack[-1]
+        for k, v in children:
+            # if dict or list, iterate it first
+            if isinstance(v, (dict, list)):
+                stack.append((PathNode(node, k), data_children(v)))
+                break
+            items.append(join_path(str(node), k))
+        else:
+            stack.pop()
 
-    # recursively iterate keys
-    if isinstance(d, dict):
-        for k, v in d.items():
-            # absolute path to this key
-            p = base + "." + k if base else k
+    # return results
+    return items
 
-            # if dict or list, recursively iterate
-            if isinstance(v, dict) or isinstance(v, list):
-                items += scan_data_paths(v, p)
-            else:
-                items.append(p)
 
-    elif isinstance(d, list):
-        for i, v in enumerate(d):
-            # absolute path to this key
-            p = base + "." + f"[{i}]" if base else f"[{i}]"
+def data_children(d: Union[dict, list]) -> Iterator[Tuple[Any, Any]]:
+    """
+    Iterate over the keys (indices of lists) and values of a dict or list.
+    """
+
+    return iter(d.items()) if isinstance(d, dict) else enumerate(d)
 
-            # if dict or list, recursively iterate
-            if isinstance(v, dict) or isinstance(v, list):
-                items += scan_data_paths(v, p)
-            else:
-                items.append(p)
 
-    # return results
-    return items
+@lru_cache(maxsize=4096)
+def parse_path(path: str) -> Tuple[Any, ...]:
+    """
+    Split a value path into its keys and list indices (as int). Quoted keys may
+    contain dots.
+    """
 
+    keys: List[Any] = []
+    i = 0
+    while i < len(path):
+        if path[i] == '"':
+            key, i = JSON_DECODER.raw_decode(path, i)
+        else:
+            end = path.find(".", i)
+            end = len(path) if end < 0 else end
+            key = path[i:end]
+            if key.startswith("[") and key.endswith("]"):
+                key = int(key[1:-1])
+            i = end
+
+        keys.append(key)
+
+        # skip the separator, a trailing one ends with an empty key
+        if i < len(path):
+            i += 1
+            if i == len(path):
+                keys.append("")
 
-def get_value(d, path):
+    return tuple(keys)
+
+
+def get_value(d, path: Union[str, PathNode]):
     """
     Get a value from a dictionary using a path.
     """
-    keys = path.split(".")
+
+    keys = path.keys() if isinstance(path, PathNode) else parse_path(path)
 
     for k in keys:
-        d = d[int(k[1:-1])] if k.startswith("[") else d[k]
+        d = d[k]
 
     return d
 
 
+def collect_data_items(
+    d: Union[dict, list],
+    base: PathNode,
+    outcome: ComparisonOutcome,
+    items: List[ComparisonItem],
+):
+    """
+    Add an item with the given outcome for every value path under the dict or
+    list d.
+    """
+
+    for k, v in data_children(d):
+        if isinstance(v, (dict, list)):
+            collect_data_items(v, PathNode(base, k), outcome, items)
+        else:
+            items.append(ComparisonItem(k, outcome=outcome, base=base))
+
+
+def collect_value_items(
+    v: Any,
+    base: PathNode,
+    key: Any,
+    outcome: ComparisonOutcome,
+    items: List[ComparisonItem],
+):
+    """
+    Add an item with the given outcome for every value path under the value v at
+    key in base.
+    """
+
+    if isinstance(v, (dict, list)):
+        collect_data_items(v, PathNode(base, key), outcome, items)
+    else:
+        items.append(ComparisonItem(key, outcome=outcome, base=base))
+
+
+def diff_data_value(
+    src: Any, ref: Any, base: PathNode, key: Any, items: List[ComparisonItem]
+) -> List[ComparisonItem]:
+    """
+    Compare the source and reference value at key in base. Compared and extra
+    items are added to items, missing items are returned in reference order.
+    Compared items are left undefined and get their outcome from check_items.
+    """
+
+    src_container = isinstance(src, (dict, list))
+    ref_container = isinstance(ref, (dict, list))
+
+    # both values are leaves, compare them
+    if not src_container and not ref_container:
+        items.append(ComparisonItem(key, src_value=src, ref_value=ref, base=base))
+        return []
+
+    # both values are containers of the same kind, walk them together
+    if (
+        src_container
+        and ref_container
+        and isinstance(src, dict) == isinstance(ref, dict)
+    ):
+        return diff_data_node(src, ref, PathNode(base, key), items)
+
+    # structure differs, all source paths are extra and all reference paths missing
+    missing: List[ComparisonItem] = []
+    collect_value_items(src, base, key, ComparisonOutcome.EXTRA, items)
+    collect_value_items(ref, base, key, ComparisonOutcome.MISSING, missing)
+    return missing
+
+
+def diff_data_node(
+    src: Union[dict, list],
+    ref: Union[dict, list],
+    base: PathNode,
+    items: List[ComparisonItem],
+) -> List[ComparisonItem]:
+    """
+    Walk a source and reference dict (or list) in a single pass.
+    """
+
+    # missing items of shared children, keyed by child
+    child_missing = {}
+    missing: List[ComparisonItem] = []
+
+    if isinstance(src, dict) and isinstance(ref, dict):
+        for k, v in src.items():
+            if k in ref:
+                r = ref[k]
+                # leaves are compared right here, most values are leaves
+                if not isinstance(v, (dict, list)) and not isinstance(r, (dict, list)):
+                    items.append(ComparisonItem(k, src_value=v, ref_value=r, base=base))
+                    continue
+
+                m = diff_data_value(v, r, base, k, items)
+                if len(m) > 0:
+                    child_missing[k] = m
+            else:
+                collect_value_items(v, base, k, ComparisonOutcome.EXTRA, items)
+
+        # report missing paths in reference order
+        for k, v in ref.items():
+            if k not in src:
+                collect_value_items(v, base, k, ComparisonOutcome.MISSING, missing)
+            elif k in child_missing:
+                missing += child_missing[k]
+
+    elif isinstance(src, list) and isinstance(ref, list):
+        for i, v in enumerate(src):
+            if i < len(ref):
+                r = ref[i]
+                if not isinstance(v, (dict, list)) and not isinstance(r, (dict, list)):
+                    items.append(ComparisonItem(i, src_value=v, ref_value=r, base=base))
+                    continue
+
+                m = diff_data_value(v, r, base, i, items)
+                if len(m) > 0:
+                    child_missing[i] = m
+            else:
+                collect_value_items(v, base, i, ComparisonOutcome.EXTRA, items)
+
+        # report missing paths in reference order
+        for i, v in enumerate(ref):
+            if i >= len(src):
+                collect_value_items(v, base, i, ComparisonOutcome.MISSING, missing)
+            elif i in child_missing:
+                missing += child_missing[i]
+
+    return missing
+
+
+def diff_data(src_data: Any, ref_data: Any) -> List[ComparisonItem]:
+    """
+    Compare source and reference data in one pass over both trees.
+
+    Returns one item per value path: compared and extra paths in source order,
+    followed by all missing paths in reference order.
+    """
+
+    items: List[ComparisonItem] = []
+
+    # a document root that is a plain value has no value paths
+    src_root = src_data if isinstance(src_data, (dict, list)) else {}
+    ref_root = ref_data if isinstance(ref_data, (dict, list)) else {}
+
+    root = PathNode()
+    if isinstance(src_root, dict) == isinstance(ref_root, dict):
+        missing = diff_data_node(src_root, ref_root, root, items)
+    else:
+        missing = []
+        collect_data_items(src_root, root, ComparisonOutcome.EXTRA, items)
+        collect_data_items(ref_root, root, ComparisonOutcome.MISSING, missing)
+
+    # compare all values at once
+    check_items([item for item in items if item.outcome == ComparisonOutcome.UNDEFINED])
+
+    return items + missing
+
+
 def round_down(value, decimals):
     # factor = 1 / (10 ** decimals)
     # return (value // factor) * factor
@@ -173,6 +511,161 @@ def compare_numbers(
     return False, matching_scale, matching_precision
 
 
+def compare_numbers_batch(
+    v1: Sequence[Union[int, float]], v2: Sequence[Union[int, float]]
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Vectorized compare_numbers for many pairs of the same numeric type (all int or
+    all float). Returns arrays of (match, scale, precision) with the same values
+    compare_numbers returns for each pair.
+
+    Pairs the vectorized path cannot reproduce exactly (non-positive, non-finite
+    or very large values, float representations in exponent notation, logarithms
+    close to an integer) are passed to compare_numbers one by one.
+    """
+
+    import numpy as np
+
+    n = len(v1)
+    assert len(v2) == n
+
+    match = np.zeros(n, dtype=bool)
+    scale = np.ones(n, dtype=np.int64)
+    precision = np.full(n, -1.0)
+
+    if n == 0:
+        return match, scale, precision
+
+    is_float = isinstance(v1[0], float)
+    a = np.asarray(v1, dtype=np.float64)
+    b = np.asarray(v2, dtype=np.float64)
+
+    # perfect matching
+    match = a == b
+
+    # values the float based path cannot handle exactly
+    fallback = ~match & ~((a > 0) & (b > 0) & np.isfinite(a) & np.isfinite(b))
+    if not is_float:
+        # integers beyond 2**53 are not exactly representable as float64
+        fallback |= (np.abs(a) >= 2**53) | (np.abs(b) >= 2**53)
+
+    active = ~match & ~fallback
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        l1 = np.log10(np.where(active, a, 1.0))
+        l2 = np.log10(np.where(active, b, 1.0))
+
+    # int(log10(x)) is sensitive to the last bit close to integers, leave those
+    # to math.log10 unless x is an exact power of ten
+    for log, x in ((l1, a), (l2, b)):
+        r = np.round(log)
+        near = np.abs(log - r) < 1e-9
+        exact_power = (r >= 0) & (x == np.power(10.0, r))
+        fallback |= active & near & ~exact_power
+    active &= ~fallback
+
+    # abort for scale missmatch
+    e1 = np.trunc(l1)
+    mismatch = active & (e1 != np.trunc(l2))
+    scale[mismatch] = -1
+    active &= ~mismatch
+
+    # scale matching (for int and float), first matching power of ten
+    digits = np.where(active & (l1 >= 0), e1, -1).astype(np.int64)
+    found = np.zeros(n, dtype=bool)
+    for i in range(int(digits.max()) + 1):
+        hit = ~found & (digits >= i) & (np.trunc(a / 10.0**i) == np.trunc(b / 10.0**i))
+        scale[hit] = 10**i
+        found |= hit
+
+    # precision matching (float only), compares the decimal representations
+    if is_float and active.any():
+        idx = np.flatnonzero(active)
+        width = 40
+
+        s1 = np.array([repr(v1[i]) for i in idx], dtype=f"S{width}")
+        s2 = np.array([repr(v2[i]) for i in idx], dtype=f"S{width}")
+        m1 = s1.view(np.uint8).reshape(-1, width)
+        m2 = s2.view(np.uint8).reshape(-1, width)
+
+        # exponent notation is not supported by round_down
+        exponent = (m1 == ord("e")).any(axis=1) | (m2 == ord("e")).any(axis=1)
+        fallback[idx[exponent]] = True
+
+        # integer part must be identical
+        dot1 = np.argmax(m1 == ord("."), axis=1)
+        dot2 = np.argmax(m2 == ord("."), axis=1)
+        integer = np.arange(width)[None, :] < dot1[:, None]
+        same_int = (dot1 == dot2) & np.all((m1 == m2) | ~integer, axis=1)
+
+        # first differing decimal (missing decimals count as zeros)
+        dig = sys.float_info.dig
+        cols1 = np.minimum(dot1[:, None] + 1 + np.arange(dig), width - 1)
+        cols2 = np.minimum(dot2[:, None] + 1 + np.arange(dig), width - 1)
+        f1 = np.take_along_axis(m1, cols1, axis=1)
+        f2 = np.take_along_axis(m2, cols2, axis=1)
+        f1 = np.where(f1 == 0, ord("0"), f1)
+        f2 = np.where(f2 == 0, ord("0"), f2)
+        diff = f1 != f2
+        first = np.where(diff.any(axis=1), diff.argmax(axis=1), dig)
+
+        precision[idx] = np.where(same_int, np.minimum(first, dig - 1), -1)
+
+    # exact matches
+    scale[match] = 1
+    precision[match] = math.inf
+
+    # remaining pairs on the scalar path
+    for i in np.flatnonzero(fallback):
+        match[i], scale[i], precision[i] = compare_numbers(v1[i], v2[i])
+
+    return match, scale, precision
+
+
+def check_items(items: Sequence[ComparisonItem]):
+    """
+    Check many items at once. Numeric items are compared with
+    compare_numbers_batch (if there are enough of one type), all other items with
+    check_item.
+    """
+
+    # group numeric items by type
+    numeric: dict = {int: [], float: []}
+    for item in items:
+        t = type(item.src_value)
+        if t in numeric and type(item.ref_value) is t:
+            numeric[t].append(item)
+        else:
+            check_item(item)
+
+    for t, group in numeric.items():
+        # small groups are not worth importing numpy for
+        if len(group) < BATCH_MIN_ITEMS:
+            for item in group:
+                check_item(item)
+            continue
+
+        match, scale, precision = compare_numbers_batch(
+            [item.src_value for item in group], [item.ref_value for item in group]
+        )
+
+        for item, m, s, p in zip(
+            group, match.tolist(), scale.tolist(), precision.tolist()
+        ):
+            v1 = item.src_value
+            v2 = item.ref_value
+            item.type = t.__name__
+
+            if m:
+                item.outcome = ComparisonOutcome.VALUE_EXACT
+            elif s > 0:
+                item.outcome = ComparisonOutcome.VALUE_SIMILAR
+                item.info = {"scale": s, "precision": int(p), "src": v1, "ref": v2}
+            else:
+                item.outcome = ComparisonOutcome.VALUE_MISMATCH
+                item.info = {"src": v1, "ref": v2}
+
+
 def check_item(item: ComparisonItem):
     v1 = item.src_value
     v2 = item.ref_value
@@ -225,13 +718,26 @@ def check_item(item: ComparisonItem):
 
 
 class DataFileCheck(FileCheck):
-    def can_check(self):
-        return (
-            self.src_path.endswith(".json")
-            or self.src_path.endswith(".yml")
-            or self.src_path.endswith(".yaml")
-            or self.src_path.endswith(".csv")
-        )
+    # the diff of json / yml files is pure python and holds the GIL
+    pool: str = "process"
+    expensive: bool = True
+    patterns = check_patterns("DataFileCheck")
+
+    # column used to align csv rows (rows are aligned by position if not set)
+    csv_key: Optional[str] = None
+
+    # absolute tolerance of numeric csv columns by column name ("*" for all columns)
+    csv_tolerances: Dict[str, float] = {}
+
+    # number of rows and worst offenders listed per csv column finding
+    csv_report_limit: int = 10
+
+    # json / yml files larger than this (either file, in bytes) are compared while
+    # parsing both in lockstep instead of loading them (0 disables streaming)
+    stream_threshold: int = 256 * 2**20
+
+    # same for yml files, which are also compared faster while parsing
+    yaml_stream_threshold: int = 8 * 2**20
 
     def check(self):
         """
@@ -241,68 +747,78 @@ class DataFileCheck(FileCheck):
         - identify extra key paths
         - compare values
         - for not exactly matching values try various precisions and report the best match
-        """
 
-        # read files
-        src_data = get_data(self.src_path)
-        ref_data = get_data(self.ref_path)
+        CSV files are compared column by column, see check_csv. Large files are
+        compared without loading them, see check_stream.
+        """
 
-        # compare data
-        src_paths = scan_data_paths(src_data)
-        ref_paths = scan_data_paths(ref_data)
+        if self.src_path.endswith(".csv"):
+            return self.check_csv()
 
-        # convert to compare items
-        items = []
+        # compare large files while parsing them, if their structure allows it
+        threshold = self.stream_threshold
+        if not self.src_path.endswith(".json"):
+            threshold = self.yaml_stream_threshold
+        if threshold > 0 and (
+            max(self.context.src.size, self.context.ref.size) > threshold
+        ):
+            passed = self.check_stream()
+            if passed is not None:
+                return passed
 
-        for p in src_paths:
-            item = ComparisonItem()
-            items.append(item)
-            item.path = p
+        # read files
+        src_data = self.context.src.data
+        ref_data = self.context.ref.data
 
-            # check if path is in ref or if path is an extra path
-            if p not in ref_paths:
-                item.outcome = ComparisonOutcome.EXTRA
-                continue
+        # compare data
+        items = diff_data(src_data, ref_data)
 
-            # remove ref paths that are already matched
-            ref_paths.remove(p)
+        return self.report_items(items)
 
-            # get values
-            item.src_value = get_value(src_data, p)
-            item.ref_value = get_value(ref_data, p)
+    def check_stream(self) -> Optional[bool]:
+        """
+        Compare two json / yml files while parsing both in lockstep, holding only
+        the current path and a batch of items in memory. Returns None (without
+        findings) if the files must be loaded instead, e.g. if maps list their
+        keys in a different order.
+        """
 
-            # compare values
-            check_item(item)
+        from medcmp.checks.DataStream import StreamFallback, stream_diff_data
+
+        findings, notes = len(self.findings), len(self.notes)
+        try:
+            passed = self.report_items(stream_diff_data(self.src_path, self.ref_path))
+        except (StreamFallback, ValueError, yaml.YAMLError):
+            # invalid documents are reported by the full comparison
+            del self.findings[findings:]
+            del self.notes[notes:]
+            return None
+
+        self.add_note(
+            "Streamed Comparison",
+            "Files were compared while parsing, without loading them.",
+            None,
+        )
+        return passed
 
-        # all remaining ref paths are missing
-        for p in ref_paths:
-            item = ComparisonItem()
-            item.path = p
-            item.outcome = ComparisonOutcome.MISSING
-            items.append(item)
+    def report_items(self, items: Iterable[ComparisonItem]) -> bool:
+        """
+        Add notes and findings for compared items.
+        """
 
         # wheather check passed or failes
         check_passed = True
 
-        # overview (notes)
-        exact_value_paths = [
-            item.path for item in items if item.outcome == ComparisonOutcome.VALUE_EXACT
-        ]
-        exact_value_paths_str = (
-            ",".join(exact_value_paths)
-            if len(exact_value_paths) < 20
-            else ",".join(exact_value_paths[:20])
-            + " (+ "
-            + str(len(exact_value_paths) - 20)
-            + " more)"
-        )
-        if len(exact_value_paths) > 0:
-            self.add_note(
-                "Value Match", "These keys have identical values", exact_value_paths_str
-            )
+        # overview (notes), only the listed paths are converted to strings
+        exact_value_count = 0
+        exact_value_paths: List[str] = []
 
         # conclusion (findings)
         for item in items:
+            if item.outcome == ComparisonOutcome.VALUE_EXACT:
+                exact_value_count += 1
+                if len(exact_value_paths) < 20:
+                    exact_value_paths.append(item.path)
             # add facts to report for each item outcome
             if item.outcome == ComparisonOutcome.MISSING:
                 self.add_finding(
@@ -343,5 +859,107 @@ class DataFileCheck(FileCheck):
             if item.outcome != ComparisonOutcome.VALUE_EXACT:
                 check_passed = False
 
+        exact_value_paths_str = (
+            ",".join(exact_value_paths)
+            if exact_value_count < 20
+            else ",".join(exact_value_paths)
+            + " (+ "
+            + str(exact_value_count - 20)
+            + " more)"
+        )
+        if exact_value_count > 0:
+            self.add_note(
+                "Value Match", "These keys have identical values", exact_value_paths_str
+            )
+
         # return check passed result
         return check_passed
+
+    def check_csv(self) -> bool:
+        """
+        Compare two csv files column by column.
+        - identify missing / extra columns
+        - align rows on the key column (or position) and identify missing / extra rows
+        - compare each common column, numeric cells within the column tolerance
+        - report one finding per column and kind of difference
+        """
+
+        from .CsvCompare import CsvComparison
+
+        cmp = CsvComparison(
+            self.context.src.source,
+            self.context.ref.source,
+            self.csv_key,
+            self.csv_tolerances,
+        )
+        limit = self.csv_report_limit
+
+        self.add_note(
+            "Row Count",
+            "Number of rows in the source and reference file",
+            {"src": cmp.src_rows, "ref": cmp.ref_rows},
+        )
+
+        # columns
+        for c in cmp.missing_columns:
+            self.add_finding(
+                "Missing column", f"Column '{c}' is missing in source file", None, c
+            )
+        for c in cmp.extra_columns:
+            self.add_finding(
+                "Extra column", f"Column '{c}' is extra in source file", None, c
+            )
+
+        # rows
+        if len(cmp.missing_rows) > 0:
+            self.add_finding(
+                "Missing rows",
+                "Rows are missing in source file",
+                {"count": len(cmp.missing_rows), "rows": cmp.missing_rows[:limit]},
+            )
+        if len(cmp.extra_rows) > 0:
+            self.add_finding(
+                "Extra rows",
+                "Rows are extra in source file",
+                {"count": len(cmp.extra_rows), "rows": cmp.extra_rows[:limit]},
+            )
+
+        # values
+        identical_columns = []
+        for col in cmp.columns:
+            if col.identical:
+                identical_columns.append(str(col.name))
+                continue
+
+            if col.type_mismatch.any():
+                self.add_finding(
+                    "Type mismatch",
+                    f"Type of values in column '{col.name}' is different in source file",
+                    col.summary(col.type_mismatch, limit),
+                    subpath=str(col.name),
+                )
+            if col.mismatch.any():
+                self.add_finding(
+                    "Value mismatch",
+                    f"Values in column '{col.name}' are different in source file",
+                    col.summary(col.mismatch, limit),
+                    subpath=str(col.name),
+                )
+            if col.close.any():
+                info = col.summary(col.close, limit)
+                info["tolerance"] = col.tolerance
+                self.add_note(
+                    "Value close",
+                    f"Values in column '{col.name}' are within tolerance",
+                    info,
+                    subpath=str(col.name),
+                )
+
+        if len(identical_columns) > 0:
+            self.add_note(
+                "Value Match",
+                "These columns have identical values",
+                ",".join(identical_columns),
+            )
+
+        return len(self.findings) == 0
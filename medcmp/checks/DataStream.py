@@ -0,0 +1,450 @@
+import re
+import yaml
+from contextlib import closing
+from itertools import chain
+from typing import IO, Any, Generator, Iterator, List, Tuple
+
+from medcmp.checks.DataFileCheck import (
+    JSON_DECODER,
+    ComparisonItem,
+    ComparisonOutcome,
+    PathNode,
+    YamlLoader,
+    check_items,
+)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None  # type: ignore
+
+# size of the chunks read from a file at a time
+STREAM_CHUNK_SIZE = 1 << 20
+
+# compared items are checked and passed on in batches of this size
+STREAM_BATCH_ITEMS = 10_000
+
+# one json token after optional whitespace: a structural character, a string, an
+# integer, any other number or a literal
+JSON_TOKEN = re.compile(
+    r"""[ \t\n\r]*(?:
+        ([{}\[\],:])
+        |"((?:[^"\\]|\\.)*)"
+        |(-?(?:0|[1-9][0-9]*))(?![.eE0-9])
+        |(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)
+        |(true|false|null|NaN|Infinity|-Infinity)
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+
+# text read after a token, longer than any number or literal
+JSON_TOKEN_LOOKAHEAD = 1024
+
+JSON_LITERALS = {
+    "true": ("boolean", True),
+    "false": ("boolean", False),
+    "null": ("null", None),
+    "NaN": ("number", float("nan")),
+    "Infinity": ("number", float("inf")),
+    "-Infinity": ("number", float("-inf")),
+}
+
+# a parse event: (kind, value) with the kinds start_map, map_key, end_map,
+# start_array, end_array and the scalar kinds string, number, boolean and null
+Event = Tuple[str, Any]
+
+STARTS = {"start_map": True, "start_array": False}
+ENDS = ("end_map", "end_array")
+
+# yaml collections with these tags are plain maps and lists
+COLLECTION_TAGS = (None, "!", "tag:yaml.org,2002:map", "tag:yaml.org,2002:seq")
+
+
+class StreamFallback(Exception):
+    """
+    The documents cannot be compared in lockstep (keys in a different order or
+    YAML features that need the full document), they have to be loaded.
+    """
+
+
+def json_tokens(f: IO[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Event]:
+    """
+    Iterate over the tokens of a json document, reading it in chunks.
+    """
+
+    buffer = ""
+    pos = 0
+    eof = False
+
+    while True:
+        match = JSON_TOKEN.match(buffer, pos)
+
+        # a token is complete with enough text after it (numbers and literals
+        # could continue), strings that continue in the next chunk do not match
+        if not eof and (
+            match is None or len(buffer) - match.end() < JSON_TOKEN_LOOKAHEAD
+        ):
+            chunk = f.read(chunk_size)
+            eof = len(chunk) == 0
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        if match is None:
+            if buffer[pos:].strip():
+                raise ValueError(f"Invalid json at '{buffer[pos : pos + 20]}'")
+            return
+
+        pos = match.end()
+        structural, string, integer, number, literal = match.groups()
+        if structural is not None:
+            yield structural, None
+        elif string is not None:
+            if "\\" in string:
+                string = JSON_DECODER.decode('"' + string + '"')
+            yield "string", string
+        elif integer is not None:
+            yield "number", int(integer)
+        elif number is not None:
+            yield "number", float(number)
+        else:
+            yield JSON_LITERALS[literal]
+
+
+def json_events(f: IO[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Event]:
+    """
+    Iterate over the parse events of a json document. Raises ValueError for
+    invalid documents.
+    """
+
+    # containers we are in (True for maps) and what may come next: "value",
+    # "key", "first" (value, key or end of an empty container), "colon", "next"
+    # (comma or end), "done"
+    stack: List[bool] = []
+    state = "value"
+
+    for kind, value in json_tokens(f, chunk_size):
+        if state == "first":
+            state = "key" if stack[-1] else "value"
+            if kind in ("]", "}"):
+                state = "next"
+
+        if kind in ("]", "}") and state == "next":
+            is_map = kind == "}"
+            if not stack or stack[-1] != is_map:
+                raise ValueError(f"Invalid json, unexpected '{kind}'")
+            stack.pop()
+            yield ("end_map" if is_map else "end_array"), None
+            state = "next" if stack else "done"
+        elif state == "value":
+            if kind in ("{", "["):
+                stack.append(kind == "{")
+                yield ("start_map" if kind == "{" else "start_array"), None
+                state = "first"
+            elif kind in ("string", "number", "boolean", "null"):
+                yield kind, value
+                state = "next" if stack else "done"
+            else:
+                raise ValueError(f"Invalid json, unexpected '{kind}'")
+        elif state == "key" and kind == "string":
+            yield "map_key", value
+            state = "colon"
+        elif state == "colon" and kind == ":":
+            state = "value"
+        elif state == "next" and kind == ",":
+            state = "key" if stack[-1] else "value"
+        else:
+            raise ValueError(f"Invalid json, unexpected '{kind}'")
+
+    if state != "done":
+        raise ValueError("Invalid json, unexpected end of document")
+
+
+def yaml_events(f: IO[str], loader: Any = None) -> Iterator[Event]:
+    """
+    Iterate over the parse events of a (single document) yaml file, with scalars
+    resolved and constructed as the loader does. Aliases, merge keys, complex
+    keys and tagged collections need the full document and raise StreamFallback.
+    """
+
+    if loader is None:
+        loader = YamlLoader
+
+    # resolves and constructs scalars, never holds a document
+    resolver = loader("")
+
+    # for each open collection, whether it is a map and the next scalar a key
+    stack: List[List[bool]] = []
+    documents = 0
+
+    for event in yaml.parse(f, Loader=loader):
+        if isinstance(event, yaml.DocumentStartEvent):
+            documents += 1
+            if documents > 1:
+                raise StreamFallback("yaml stream of several documents")
+            continue
+        if isinstance(event, (yaml.StreamStartEvent, yaml.StreamEndEvent)):
+            continue
+        if isinstance(event, yaml.DocumentEndEvent):
+            continue
+        if isinstance(event, yaml.AliasEvent):
+            raise StreamFallback("yaml aliases")
+
+        key = len(stack) > 0 and stack[-1][0] and stack[-1][1]
+
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            if key:
+                raise StreamFallback("yaml complex keys")
+            if event.tag not in COLLECTION_TAGS and not event.implicit:
+                raise StreamFallback(f"yaml tag {event.tag}")
+
+            is_map = isinstance(event, yaml.MappingStartEvent)
+            if len(stack) > 0 and stack[-1][0]:
+                stack[-1][1] = True
+            stack.append([is_map, True])
+            yield ("start_map" if is_map else "start_array"), None
+
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            is_map = stack.pop()[0]
+            yield ("end_map" if is_map else "end_array"), None
+
+        elif isinstance(event, yaml.ScalarEvent):
+            tag = event.tag
+            if tag is None or tag == "!":
+                tag = resolver.resolve(yaml.ScalarNode, event.value, event.implicit)
+            if (
+                tag == "tag:yaml.org,2002:merge"
+                or tag not in resolver.yaml_constructors
+            ):
+                raise StreamFallback(f"yaml tag {tag}")
+
+            node = yaml.ScalarNode(
+                tag, event.value, event.start_mark, event.end_mark, event.style
+            )
+            value = resolver.yaml_constructors[tag](resolver, node)
+
+            if key:
+                stack[-1][1] = False
+                yield "map_key", value
+            else:
+                if len(stack) > 0 and stack[-1][0]:
+                    stack[-1][1] = True
+                yield "scalar", value
+
+
+def document_events(path: str) -> Generator[Event, None, None]:
+    """
+    Parse events of a json / yml file. A document root that is a plain value has
+    no value paths and is passed on as empty map. Json that ijson rejects (e.g.,
+    NaN or Infinity, which json.load accepts) raises StreamFallback.
+    """
+
+    if path.endswith(".json") and ijson is not None:
+        with open(path, "rb") as f:
+            try:
+                yield from root_events(ijson.basic_parse(f, use_float=True))
+            except ijson.JSONError as e:
+                raise StreamFallback(f"ijson: {e}") from e
+    elif path.endswith(".json"):
+        with open(path, "r") as f:
+            yield from root_events(json_events(f))
+    else:
+        with open(path, "r") as f:
+            yield from root_events(yaml_events(f))
+
+
+def root_events(events: Iterator[Event]) -> Iterator[Event]:
+    """
+    Pass on the events of a document, a plain value root as empty map.
+    """
+
+    first = next(events, ("null", None))
+    if first[0] not in STARTS:
+        yield from [("start_map", None), ("end_map", None)]
+        # the rest of the document is still validated
+        for _ in events:
+            pass
+        return
+
+    yield first
+    yield from events
+
+
+def stream_children(
+    events: Iterator[Event],
+    node: PathNode,
+    is_map: bool,
+    outcome: ComparisonOutcome,
+    index: int = 0,
+) -> Iterator[ComparisonItem]:
+    """
+    Yield an item with the given outcome for every value path in the rest of an
+    open container at node (its start event is already read). The rest of a list
+    starts at index.
+    """
+
+    # open containers: node, whether it is a map, next list index
+    stack: List[List[Any]] = [[node, is_map, index]]
+
+    for kind, value in events:
+        frame = stack[-1]
+        if kind in ENDS:
+            stack.pop()
+            if len(stack) == 0:
+                return
+            continue
+
+        if frame[1]:
+            key = value
+            kind, value = next(events)
+        else:
+            key = frame[2]
+            frame[2] += 1
+
+        if kind in STARTS:
+            stack.append([PathNode(frame[0], key), STARTS[kind], 0])
+        else:
+            yield ComparisonItem(key, outcome=outcome, base=frame[0])
+
+
+def stream_value(
+    events: Iterator[Event],
+    event: Event,
+    base: PathNode,
+    key: Any,
+    outcome: ComparisonOutcome,
+) -> Iterator[ComparisonItem]:
+    """
+    Yield an item with the given outcome for every value path of the value at key
+    in base, starting with its first event.
+    """
+
+    if event[0] in STARTS:
+        yield from stream_children(
+            events, PathNode(base, key), STARTS[event[0]], outcome
+        )
+    else:
+        yield ComparisonItem(key, outcome=outcome, base=base)
+
+
+def diff_streams(
+    src: Iterator[Event], ref: Iterator[Event], missing: List[ComparisonItem]
+) -> Iterator[ComparisonItem]:
+    """
+    Walk the parse events of a source and reference document in lockstep. Compared
+    (left undefined) and extra items are yielded in source order, missing items
+    are added to missing in reference order, as diff_data does. Maps must list
+    their shared keys in the same order, otherwise StreamFallback is raised.
+    """
+
+    root = PathNode()
+    src_kind, _ = next(src)
+    ref_kind, _ = next(ref)
+
+    # roots of a different kind, all source paths are extra and all reference
+    # paths missing
+    if src_kind != ref_kind:
+        yield from stream_children(src, root, STARTS[src_kind], ComparisonOutcome.EXTRA)
+        missing.extend(
+            stream_children(ref, root, STARTS[ref_kind], ComparisonOutcome.MISSING)
+        )
+        return
+
+    # open containers of both documents: node, whether it is a map, next list index
+    stack: List[List[Any]] = [[root, STARTS[src_kind], 0]]
+
+    while len(stack) > 0:
+        frame = stack[-1]
+        node, is_map = frame[0], frame[1]
+
+        src_event = next(src)
+        ref_event = next(ref)
+        src_end = src_event[0] in ENDS
+        ref_end = ref_event[0] in ENDS
+
+        if src_end or ref_end:
+            # the remaining children of the other document are extra / missing
+            if not src_end:
+                remaining = chain([src_event], src)
+                yield from stream_children(
+                    remaining, node, is_map, ComparisonOutcome.EXTRA, frame[2]
+                )
+            elif not ref_end:
+                remaining = chain([ref_event], ref)
+                missing.extend(
+                    stream_children(
+                        remaining, node, is_map, ComparisonOutcome.MISSING, frame[2]
+                    )
+                )
+            stack.pop()
+            continue
+
+        if is_map:
+            if src_event[1] != ref_event[1]:
+                raise StreamFallback(
+                    f"keys '{src_event[1]}' and '{ref_event[1]}' at the same position"
+                )
+            key = src_event[1]
+            src_event = next(src)
+            ref_event = next(ref)
+        else:
+            key = frame[2]
+            frame[2] += 1
+
+        src_start = STARTS.get(src_event[0])
+        ref_start = STARTS.get(ref_event[0])
+
+        # both values are leaves, compare them
+        if src_start is None and ref_start is None:
+            yield ComparisonItem(
+                key, src_value=src_event[1], ref_value=ref_event[1], base=node
+            )
+
+        # both values are containers of the same kind, walk them together
+        elif src_start is not None and src_start == ref_start:
+            stack.append([PathNode(node, key), src_start, 0])
+
+        # structure differs, all source paths are extra and all reference paths
+        # missing
+        else:
+            yield from stream_value(src, src_event, node, key, ComparisonOutcome.EXTRA)
+            missing.extend(
+                stream_value(ref, ref_event, node, key, ComparisonOutcome.MISSING)
+            )
+
+
+def stream_diff_data(
+    src_path: str, ref_path: str, batch_size: int = STREAM_BATCH_ITEMS
+) -> Iterator[ComparisonItem]:
+    """
+    Compare two json / yml files while parsing both in lockstep, without loading
+    them. Yields the same items as diff_data on the loaded documents, with their
+    outcome, in batches: memory is bounded by the depth of the documents, the
+    batch size and the missing items.
+
+    Raises StreamFallback if the documents list shared keys in a different order
+    or ijson rejects a json file (and ValueError / yaml.YAMLError for invalid
+    documents), before or after some items were yielded.
+    """
+
+    missing: List[ComparisonItem] = []
+    batch: List[ComparisonItem] = []
+
+    # both files are closed as soon as the comparison ends or falls back
+    src = document_events(src_path)
+    ref = document_events(ref_path)
+    with closing(src), closing(ref):
+        for item in diff_streams(src, ref, missing):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                check_batch(batch)
+                yield from batch
+                batch = []
+
+    check_batch(batch)
+    yield from batch
+    yield from missing
+
+
+def check_batch(batch: List[ComparisonItem]):
+    check_items([item for item in batch if item.outcome == ComparisonOutcome.UNDEFINED])
@@ -1,28 +1,325 @@
 from .FileCompare import FileCheck
+from .CheckRegistry import check_patterns
+from .ImageFileCheck import check_geometry
+from .LabelOverlap import label_overlap
+import numpy as np
 import pydicom
-import pydicom_seg
-import SimpleITK as sitk
+from pydicom_seg import reader_utils
+from typing import Any, Dict, List, Optional, Tuple
 
 
-def compute_overlap(itksegimage1, itksegimage2):
-    # Load segmentation volumes
+def decode_segmentation(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Read the pixel data of a DICOM SEG file in a single pass over its frames.
 
-    # Compute the overlap between the segmentations
-    overlap_filter = sitk.LabelOverlapMeasuresImageFilter()
-    overlap_filter.Execute(itksegimage1, itksegimage2)
+    Binary segments that do not overlap are decoded into one label map holding
+    the segment number of each voxel, all other segmentations into one array per
+    segment, cropped to the bounding box of its foreground (see decode_segments).
+    Returns the arrays and the segment infos and geometry.
+    """
 
-    # Get the overlap measures
-    dice_coefficient = overlap_filter.GetDiceCoefficient()
+    dcm = pydicom.dcmread(path)
 
-    return dice_coefficient
+    # segment infos and geometry
+    segments = reader_utils.get_segment_map(dcm)
+    numbers = sorted(segments)
+    spacing = reader_utils.get_declared_image_spacing(dcm)
+    direction = reader_utils.get_image_direction(dcm)
+    origin, extent = reader_utils.get_image_origin_and_extent(dcm, direction)
+    size = (dcm.Columns, dcm.Rows, int(np.rint(extent / spacing[-1])) + 1)
+
+    meta = {
+        "numbers": numbers,
+        "labels": [str(segments[n].get("SegmentLabel", "")) for n in numbers],
+        "descriptions": [
+            str(segments[n].get("SegmentDescription", "")) for n in numbers
+        ],
+        "origin": [float(x) for x in origin],
+        "spacing": list(spacing),
+        "direction": direction.ravel().tolist(),
+        "size": list(size),
+    }
+
+    # pydicom decodes single-frame pixel data without a frame dimension
+    frames = dcm.pixel_array
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+
+    # segment number and slice index of each frame
+    shared_sis = dcm.SharedFunctionalGroupsSequence[0].get(
+        "SegmentIdentificationSequence"
+    )
+    frame_numbers = []
+    positions = []
+    for pffg in dcm.PerFrameFunctionalGroupsSequence:
+        sis = pffg.get("SegmentIdentificationSequence", shared_sis)
+        frame_numbers.append(int(sis[0].ReferencedSegmentNumber))
+        positions.append(
+            [float(x) for x in pffg.PlanePositionSequence[0].ImagePositionPatient]
+        )
+    offsets = np.linalg.solve(direction, (np.asarray(positions) - np.asarray(origin)).T)
+    slices = np.rint(offsets[2] / spacing[2]).astype(int).tolist()
+
+    fractional = dcm.SegmentationType == "FRACTIONAL"
+    if not fractional and dcm.get("SegmentsOverlap") != "YES":
+        labelmap = decode_labelmap(frames, frame_numbers, slices, size, max(numbers))
+        if labelmap is not None:
+            return {"labelmap": labelmap}, {**meta, "layout": "labelmap"}
+
+    # one cropped array per segment
+    scale = dcm.MaximumFractionalValue if fractional else None
+    arrays, offsets = decode_segments(frames, frame_numbers, slices, numbers, scale)
+
+    return arrays, {**meta, "layout": "segments", "offsets": offsets}
+
+
+def decode_segments(
+    frames: np.ndarray,
+    frame_numbers: List[int],
+    slices: List[int],
+    numbers: List[int],
+    scale: Optional[float] = None,
+) -> Tuple[Dict[str, np.ndarray], List[List[int]]]:
+    """
+    Crop the frames of each segment to the bounding box of its foreground, so the
+    memory held grows with the extent of the segments and not with their number
+    times the volume. Fractional frames are divided by scale. Returns one array
+    per segment ("segment_<number>", z, y, x) and the (z, y, x) offset of each box
+    in the volume, in the order of numbers.
+    """
+
+    dtype = np.float32 if scale is not None else np.uint8
+
+    # frames holding foreground, by segment
+    hits: Dict[int, List[Tuple[int, np.ndarray]]] = {n: [] for n in numbers}
+    for frame, number, z in zip(frames, frame_numbers, slices):
+        if frame.any():
+            hits[number].append((z, frame))
+
+    arrays = {}
+    offsets = []
+    for number in numbers:
+        if len(hits[number]) == 0:
+            arrays[f"segment_{number}"] = np.zeros((0, 0, 0), dtype=dtype)
+            offsets.append([0, 0, 0])
+            continue
+
+        foreground = np.logical_or.reduce([frame != 0 for _, frame in hits[number]])
+        rows = np.flatnonzero(foreground.any(axis=1))
+        cols = np.flatnonzero(foreground.any(axis=0))
+        z0 = min(z for z, _ in hits[number])
+        z1 = max(z for z, _ in hits[number]) + 1
+        y0, y1 = int(rows[0]), int(rows[-1]) + 1
+        x0, x1 = int(cols[0]), int(cols[-1]) + 1
+
+        segment = np.zeros((z1 - z0, y1 - y0, x1 - x0), dtype=dtype)
+        for z, frame in hits[number]:
+            frame = frame[y0:y1, x0:x1]
+            if scale is not None:
+                frame = frame.astype(np.float32) / scale
+            segment[z - z0] = frame
+
+        arrays[f"segment_{number}"] = segment
+        offsets.append([z0, y0, x0])
+
+    return arrays, offsets
+
+
+def decode_labelmap(
+    frames: np.ndarray,
+    frame_numbers: List[int],
+    slices: List[int],
+    size: Tuple[int, int, int],
+    max_number: int,
+) -> Optional[np.ndarray]:
+    """
+    Combine binary segment frames into one label map. Returns None if segments
+    overlap.
+    """
+
+    labelmap = np.zeros(size[::-1], dtype=np.uint8 if max_number < 256 else np.uint16)
+
+    for frame, number, z in zip(frames, frame_numbers, slices):
+        mask = frame > 0
+        target = labelmap[z]
+        if target[mask].any():
+            return None
+        target[mask] = number
+
+    return labelmap
+
+
+def segment_box(
+    arrays: Dict[str, np.ndarray], meta: Dict[str, Any], number: int
+) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """
+    Return the binary mask of a segment from a decoded segmentation, within its
+    bounding box, and the offset of the box in the volume.
+    """
+
+    if meta["layout"] == "labelmap":
+        return arrays["labelmap"] == number, (0, 0, 0)
+
+    offset = meta["offsets"][meta["numbers"].index(number)]
+    return arrays[f"segment_{number}"] > 0, tuple(offset)
+
+
+def segment_mask(
+    arrays: Dict[str, np.ndarray], meta: Dict[str, Any], number: int
+) -> np.ndarray:
+    """
+    Return the binary mask of a segment from a decoded segmentation.
+    """
+
+    mask, offset = segment_box(arrays, meta, number)
+    return place(mask, offset, (0, 0, 0), tuple(meta["size"][::-1]))
+
+
+def place(
+    mask: np.ndarray,
+    offset: Tuple[int, ...],
+    start: Tuple[int, ...],
+    shape: Tuple[int, ...],
+) -> np.ndarray:
+    """
+    Place a mask at its offset into a box of the given start and shape.
+    """
+
+    box = np.zeros(shape, dtype=bool)
+    if mask.size > 0:
+        box[
+            tuple(slice(o - s, o - s + n) for o, s, n in zip(offset, start, mask.shape))
+        ] = mask
+    return box
+
+
+def box_pair(
+    ref: Tuple[np.ndarray, Tuple[int, ...]], src: Tuple[np.ndarray, Tuple[int, ...]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Place two cropped masks into the union of their bounding boxes.
+    """
+
+    boxes = [(offset, mask.shape) for mask, offset in [ref, src] if mask.size > 0]
+    if len(boxes) == 0:
+        return ref[0], src[0]
+
+    start = tuple(min(o[i] for o, _ in boxes) for i in range(3))
+    stop = tuple(max(o[i] + n[i] for o, n in boxes) for i in range(3))
+    shape = tuple(b - a for a, b in zip(start, stop))
+    return place(*ref, start, shape), place(*src, start, shape)
+
+
+def match_segments(
+    src_meta: Dict[str, Any], ref_meta: Dict[str, Any]
+) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """
+    Match source and reference segments. Segments are matched by their label (or
+    description) if it is unique in both files and by their number otherwise.
+
+    Returns the matched (src, ref) segment numbers in reference order and the
+    unmatched reference (missing) and source (extra) segment numbers.
+    """
+
+    def names(meta):
+        # label, or description if the file has no labels
+        names = [
+            label or description
+            for label, description in zip(meta["labels"], meta["descriptions"])
+        ]
+        return {
+            name: number
+            for name, number in zip(names, meta["numbers"])
+            if name and names.count(name) == 1
+        }, dict(zip(meta["numbers"], names))
+
+    src_by_name, src_names = names(src_meta)
+    ref_by_name, ref_names = names(ref_meta)
+
+    matched = {}
+    for number in ref_meta["numbers"]:
+        name = ref_names[number]
+        if name in ref_by_name and name in src_by_name:
+            matched[number] = src_by_name[name]
+
+    # remaining segments are matched by number
+    unmatched_src = set(src_meta["numbers"]) - set(matched.values())
+    for number in ref_meta["numbers"]:
+        if number not in matched and number in unmatched_src:
+            matched[number] = number
+            unmatched_src.discard(number)
+
+    pairs = [(matched[n], n) for n in ref_meta["numbers"] if n in matched]
+    missing = [n for n in ref_meta["numbers"] if n not in matched]
+    extra = [n for n in src_meta["numbers"] if n in unmatched_src]
+
+    return pairs, missing, extra
+
+
+def segment_overlap(
+    src_arrays: Dict[str, np.ndarray],
+    src_meta: Dict[str, Any],
+    ref_arrays: Dict[str, np.ndarray],
+    ref_meta: Dict[str, Any],
+    pairs: List[Tuple[int, int]],
+) -> Dict[int, Dict[str, float]]:
+    """
+    Compute the overlap of matched (src, ref) segments, keyed by the reference
+    segment number.
+    """
+
+    empty = {
+        "dice": 1.0,
+        "jaccard": 1.0,
+        "volume_diff": 0,
+        "ref_voxels": 0,
+        "src_voxels": 0,
+        "intersection": 0,
+    }
+
+    # two label maps are compared in one pass after relabeling the source segments
+    # with the numbers of their reference segments
+    if src_meta["layout"] == "labelmap" and ref_meta["layout"] == "labelmap":
+        lut = np.zeros(max(src_meta["numbers"]) + 1, dtype=np.uint16)
+        for src_number, ref_number in pairs:
+            lut[src_number] = ref_number
+
+        overlap = label_overlap(
+            np.asarray(ref_arrays["labelmap"]),
+            lut[src_arrays["labelmap"]],
+            crop=True,
+        ).result()
+
+        return {ref: overlap.get(ref, empty) for _, ref in pairs}
+
+    # otherwise one segment pair at a time, within the union of their boxes
+    result = {}
+    for src_number, ref_number in pairs:
+        ref, src = box_pair(
+            segment_box(ref_arrays, ref_meta, ref_number),
+            segment_box(src_arrays, src_meta, src_number),
+        )
+        overlap = label_overlap(ref, src, crop=True).result()
+        result[ref_number] = overlap.get(1, empty)
+
+    return result
+
+
+def segment_info(meta: Dict[str, Any], number: int) -> Dict[str, Any]:
+    i = meta["numbers"].index(number)
+    return {
+        "number": number,
+        "label": meta["labels"][i],
+        "description": meta["descriptions"][i],
+    }
 
 
 class DicomsegContentCheck(FileCheck):
+    pool: str = "process"
+    expensive: bool = True
     verbose: bool = True
     dc_thresh: float = 0.99
-
-    def can_check(self) -> bool:
-        return self.src_path.endswith(".seg.dcm")
+    patterns = check_patterns("DicomsegContentCheck")
 
     def check(self) -> bool:
         if self.verbose:
@@ -31,23 +328,22 @@ class DicomsegContentCheck(FileCheck):
             print("Output file:", self.src_path)
             print("Reference file:", self.ref_path)
 
-        dcm = pydicom.dcmread(self.src_path)
-        reader = pydicom_seg.SegmentReader()
-        output_seg = reader.read(dcm)
-
-        dcm = pydicom.dcmread(self.ref_path)
-        reader = pydicom_seg.SegmentReader()
-        reference_seg = reader.read(dcm)
+        output_arrays, output_seg = self.context.src.decode(
+            "segmentation", decode_segmentation
+        )
+        reference_arrays, reference_seg = self.context.ref.decode(
+            "segmentation", decode_segmentation
+        )
 
         # check if the number of segments is the same
-        if len(output_seg.available_segments) != len(reference_seg.available_segments):
+        if len(output_seg["numbers"]) != len(reference_seg["numbers"]):
             # console printout
             print(">>> The DICOM SEG files store a different number of segments")
 
             # add finding
             info = {
-                "src_segments": len(output_seg.available_segments),
-                "ref_segments": len(reference_seg.available_segments),
+                "src_segments": len(output_seg["numbers"]),
+                "ref_segments": len(reference_seg["numbers"]),
             }
 
             self.add_finding(
@@ -56,46 +352,52 @@ class DicomsegContentCheck(FileCheck):
                 info,
             )
 
-            return False
-
         # add note about the number of segments
         self.add_note(
             "Segment Count",
             "The number of segments identified in the inspected dicomseg file.",
-            len(output_seg.available_segments),
+            len(output_seg["numbers"]),
         )
 
+        # match segments by label / description (or number)
+        pairs, missing, extra = match_segments(output_seg, reference_seg)
+
         # fail / pass
-        pass_all_segments = True
+        pass_all_segments = len(missing) == 0 and len(extra) == 0
 
-        # compare each segment
-        for segment_number in output_seg.available_segments:
-            output_segment = output_seg.segment_image(segment_number)
-            reference_segment = reference_seg.segment_image(segment_number)
-
-            try:
-                dc = compute_overlap(output_segment, reference_segment)
-
-                # FIXME: how do we aggregate the DCs for each segment?
-                if dc >= self.dc_thresh:
-                    print(
-                        ">>> DICOM SEG segments #%g are equal (DC threshold: %g)"
-                        % (segment_number, self.dc_thresh)
-                    )
-                elif dc < self.dc_thresh:
-                    print(
-                        ">>> DICOM SEG segments #%g are not equal (DC/DC threshold: %g/%g)"
-                        % (segment_number, dc, self.dc_thresh)
-                    )
-                    self.add_finding(
-                        "Dice Score Difference",
-                        "Dice score between reference and test image",
-                        dc,
-                        subpath="segment #%g" % segment_number,
-                    )
-                    pass_all_segments = False
-
-            except Exception as e:
+        # report segments only present in one of the files
+        for segment_number in missing:
+            print(">>> DICOM SEG segment #%g is missing" % segment_number)
+            self.add_finding(
+                "Missing Segment",
+                "Segment of the reference file not found in the inspected file.",
+                segment_info(reference_seg, segment_number),
+                subpath="segment #%g" % segment_number,
+            )
+        for segment_number in extra:
+            print(">>> DICOM SEG segment #%g is not in the reference" % segment_number)
+            self.add_finding(
+                "Extra Segment",
+                "Segment of the inspected file not found in the reference file.",
+                segment_info(output_seg, segment_number),
+                subpath="segment #%g" % segment_number,
+            )
+
+        # compute the overlap of all matched segments at once, segments are only
+        # compared on the same voxel grid
+        try:
+            geometry_mismatch = check_geometry(output_seg, reference_seg)
+            if geometry_mismatch:
+                raise ValueError(
+                    "Segments do not occupy the same physical space: "
+                    + ", ".join(geometry_mismatch)
+                )
+
+            overlap = segment_overlap(
+                output_arrays, output_seg, reference_arrays, reference_seg, pairs
+            )
+        except Exception as e:
+            for _, segment_number in pairs:
                 print(
                     ">>> DICOM SEG segment #%g could not be compared" % segment_number
                 )
@@ -105,6 +407,32 @@ class DicomsegContentCheck(FileCheck):
                     -1,
                     subpath="segment #%g" % segment_number,
                 )
+            overlap = {}
+
+        # compare each segment
+        for segment_number, stats in overlap.items():
+            dc = stats["dice"]
+
+            # FIXME: how do we aggregate the DCs for each segment?
+            if dc >= self.dc_thresh:
+                print(
+                    ">>> DICOM SEG segments #%g are equal (DC threshold: %g)"
+                    % (segment_number, self.dc_thresh)
+                )
+            elif dc < self.dc_thresh:
+                print(
+                    ">>> DICOM SEG segments #%g are not equal (DC/DC threshold: %g/%g)"
+                    % (segment_number, dc, self.dc_thresh)
+                )
+                # dice, jaccard, volume difference and voxel counts, as reported
+                # per label of image files
+                self.add_finding(
+                    "Dice Score Difference",
+                    "Dice score between reference and test image",
+                    {**stats, "threshold": self.dc_thresh},
+                    subpath="segment #%g" % segment_number,
+                )
+                pass_all_segments = False
 
         # debug statement if all segments pass
         if pass_all_segments:
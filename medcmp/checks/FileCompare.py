@@ -1,42 +1,336 @@
 from abc import ABC, abstractmethod
-from typing import List, Type, Optional, Any
-from medcmp.Report import Report, ReportCheck, ReportCheckFinding, ReportCheckNote
+from collections import deque
+from concurrent.futures import Future
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    Type,
+    Optional,
+    Any,
+    Union,
+)
+from medcmp.Report import (
+    Report,
+    ReportCheck,
+    ReportCheckFinding,
+    ReportCheckNote,
+    read_check,
+)
+from medcmp.cache import ReferenceCache
+from medcmp.manifest import Manifest
+from medcmp.profile import ResourceUsage, span
+from medcmp.checks.CheckExecutor import CheckExecutor, SerialExecutor
+from medcmp.checks.CheckRegistry import (
+    CheckSpec,
+    DispatchIndex,
+    FilePatterns,
+    check_name,
+)
+from medcmp.checks.FileContext import FileContext
+
+
+class FilePair(NamedTuple):
+    src_path: str
+    ref_path: str
+    src_size: Optional[int] = None
+    ref_size: Optional[int] = None
+    src_mtime: Optional[int] = None
+    ref_mtime: Optional[int] = None
+
+
+def run_checks(
+    checks: Sequence[Tuple[Type["FileCheck"], Dict[str, Any]]],
+    pair: FilePair,
+    precheck: bool = True,
+    cache: Optional[ReferenceCache] = None,
+    digests: bool = False,
+    recorded: Optional[Dict[str, Any]] = None,
+    profile: bool = False,
+) -> List[ReportCheck]:
+    """
+    Run a sequence of checks (with their options) on one file pair and collect
+    their report entries.
+
+    All checks share one file context, so each file is loaded at most once. With
+    precheck, byte-identical files skip all expensive checks. With digests, the
+    content hashes of both files are added to the meta data of each entry. With
+    the recorded manifest entry of the pair, its results are returned instead of
+    running the checks if both files still have the recorded content hashes.
+    With profile, the resource usage of each check is added to its meta data.
+    """
+
+    context = FileContext(
+        pair.src_path, pair.ref_path, pair.src_size, pair.ref_size, cache
+    )
+
+    entries: Optional[List[ReportCheck]] = None
+    if recorded is not None:
+        try:
+            if (
+                context.src.digest == recorded["src"]["hash"]
+                and context.ref.digest == recorded["ref"]["hash"]
+            ):
+                entries = [
+                    read_check(pair.src_path, item) for item in recorded["checks"]
+                ]
+        except OSError:
+            pass
+
+    if entries is None:
+        entries = check_pair(checks, pair, context, precheck, profile)
+
+    if digests:
+        for entry in entries:
+            entry.meta["src_digest"] = context.src.digest
+            entry.meta["ref_digest"] = context.ref.digest
+
+    return entries
+
+
+def check_pair(
+    checks: Sequence[Tuple[Type["FileCheck"], Dict[str, Any]]],
+    pair: FilePair,
+    context: FileContext,
+    precheck: bool = True,
+    profile: bool = False,
+) -> List[ReportCheck]:
+    """
+    Run the checks on a file pair in its file context.
+    """
+
+    # identity pre-check, only if it can save an expensive check
+    identical = None
+    if precheck and any(check.expensive for check, _ in checks):
+        try:
+            identical = context.identical()
+        except OSError:
+            identical = None
+
+    entries = []
+    for check, options in checks:
+        # run check and get results
+        entry = check(pair.src_path, pair.ref_path, context, **options).run(
+            identical, profile
+        )
+
+        if entry is not None:
+            entries.append(entry)
+
+    return entries
 
 
 class FileCompare:
     report: Report
-    checks: List[Type["FileCheck"]]
+    checks: List[Union[Type["FileCheck"], CheckSpec]]
+    options: Dict[Union[Type["FileCheck"], CheckSpec], Dict[str, Any]]
+    executor: CheckExecutor
 
-    def __init__(self, report: Report):
+    def __init__(
+        self,
+        report: Report,
+        executor: Optional[CheckExecutor] = None,
+        precheck: bool = True,
+        cache: Optional[ReferenceCache] = None,
+        manifest: Optional[Manifest] = None,
+        profile: bool = False,
+    ):
         self.report = report
         self.checks = []
+        self.options = {}
+        self.index: Optional[DispatchIndex] = None
+        self.executor = executor if executor is not None else SerialExecutor()
+        self.precheck = precheck
+        self.cache = cache
+        self.manifest = manifest
+        self.profile = profile
 
-    def register(self, check: type):
-        assert issubclass(check, FileCheck)
-        assert check not in self.checks
+    def register(self, check: Union[type, CheckSpec], **options: Any):
+        """
+        Register a check, either the class or a CheckSpec naming it. Options
+        override class attributes of the check (e.g., tolerances) for all files
+        compared by this instance. Checks registered by spec are imported (and
+        their options validated) on the first file matching their patterns.
+        """
+
+        assert all(check_name(c) != check_name(check) for c in self.checks)
+        if not isinstance(check, CheckSpec):
+            assert issubclass(check, FileCheck)
+            check.validate_options(options)
         self.checks.append(check)
+        self.options[check] = options
+        self.index = None
+
+    def load(self, spec: CheckSpec) -> Type["FileCheck"]:
+        """
+        Import a check registered by spec and register its class in its place.
+        """
+
+        check = spec.load()
+        assert issubclass(check, FileCheck)
+        check.validate_options(self.options[spec])
+        self.checks[self.checks.index(spec)] = check
+        self.options[check] = self.options.pop(spec)
+        self.index = None
+        return check
+
+    def dispatch(self, src_path: str) -> List[Union[Type["FileCheck"], CheckSpec]]:
+        """
+        Return the registered checks (or specs) whose file patterns match a file,
+        in registration order. The dispatch index is built on first use.
+        """
+
+        if self.index is None:
+            self.index = DispatchIndex([(c, c.patterns) for c in self.checks])
+
+        return self.index.lookup(src_path)
+
+    def applicable(
+        self, src_path: str, ref_path: str
+    ) -> List[Tuple[Type["FileCheck"], Dict[str, Any]]]:
+        checks = []
+        for c in self.dispatch(src_path):
+            if isinstance(c, CheckSpec):
+                c = self.load(c)
+
+            # only checks with their own can_check are created to be asked
+            if c.can_check is not FileCheck.can_check:
+                if not c(src_path, ref_path, **self.options[c]).can_check():
+                    continue
+
+            checks.append((c, self.options[c]))
+        return checks
 
     def compare(self, src_path: str, ref_path: str):
-        # run all registered checks
-        for check in self.checks:
-            # run check and get results
-            entry = check(src_path, ref_path).run()
+        self.compare_all([FilePair(src_path, ref_path)])
 
-            # add results to report
-            if entry is not None:
-                self.report.add(entry)
+    def compare_all(self, pairs: Iterable[Union[FilePair, Tuple[str, str]]]):
+        """
+        Run all registered checks on a sequence of file pairs.
+
+        Each pair is one task on the executor. Results are added to the report in
+        the order the pairs were given, no matter in which order tasks finish.
+        """
+
+        pending: Deque[Tuple[Future, list, FilePair]] = deque()
+
+        for pair in pairs:
+            pair = FilePair(*pair)
+            checks = self.applicable(pair.src_path, pair.ref_path)
+            if len(checks) == 0:
+                continue
+
+            # reuse the results of the previous run for unchanged files, touched
+            # files are compared to their recorded hashes by the worker
+            recorded = None
+            if self.manifest is not None:
+                cached = self.manifest.lookup(*pair)
+                if cached is not None:
+                    future: Future = Future()
+                    future.set_result(cached)
+                    pending.append((future, checks, pair))
+                    continue
+                recorded = self.manifest.lookup_content(*pair)
+
+            # run on the process pool if any of the checks asks for it
+            pool = (
+                "process" if any(c.pool == "process" for c, _ in checks) else "thread"
+            )
+            future = self.executor.submit(
+                run_checks,
+                checks,
+                pair,
+                self.precheck,
+                self.cache,
+                self.manifest is not None and self.manifest.content_hash,
+                recorded,
+                self.profile,
+                pool=pool,
+            )
+            pending.append((future, checks, pair))
+
+            # collect finished results in order to keep memory bounded
+            while len(pending) > self.executor.window:
+                self.collect(*pending.popleft())
+
+        while len(pending) > 0:
+            self.collect(*pending.popleft())
+
+    def collect(self, future: Future, checks: list, pair: FilePair):
+        try:
+            if future.done():
+                entries = future.result()
+            else:
+                # the main thread stalls until the oldest task is finished
+                with span("wait", path=pair.src_path):
+                    entries = future.result()
+        except Exception as e:
+            # the task itself failed (e.g., a worker process died)
+            entries = []
+            for check, _ in checks:
+                entry = ReportCheck(pair.src_path, check.__name__, {})
+                entry.add(
+                    ReportCheckFinding(
+                        "Exception", "An exception occurred during check", str(e)
+                    )
+                )
+                entries.append(entry)
+        else:
+            # record results for the next run (reused results are kept by lookup)
+            if self.manifest is not None and pair.src_path not in self.manifest.files:
+                self.manifest.record(entries, *pair)
+
+        # add results to report
+        for entry in entries:
+            self.report.add(entry)
 
 
 class FileCheck(ABC):
-    def __init__(self, src_path: str, ref_path: str):
+    # executor pool this check prefers to run on ("thread" or "process")
+    pool: str = "thread"
+
+    # expensive checks are skipped for byte-identical files
+    expensive: bool = False
+
+    # files this check handles, checks are dispatched by these patterns
+    patterns: FilePatterns = FilePatterns()
+
+    def __init__(
+        self,
+        src_path: str,
+        ref_path: str,
+        context: Optional[FileContext] = None,
+        **options: Any,
+    ):
         self.src_path = src_path
         self.ref_path = ref_path
+        self.context = (
+            context if context is not None else FileContext(src_path, ref_path)
+        )
         self.findings: List[ReportCheckFinding] = []
         self.notes: List[ReportCheckNote] = []
 
-    @abstractmethod
+        # override class attributes with options
+        self.validate_options(options)
+        for name, value in options.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def validate_options(cls, options: Dict[str, Any]):
+        for name in options:
+            if (
+                name.startswith("_")
+                or not hasattr(cls, name)
+                or callable(getattr(cls, name))
+            ):
+                raise ValueError(f"Unknown option for {cls.__name__}: {name}")
+
     def can_check(self) -> bool:
-        pass
+        return self.patterns.matches(self.src_path)
 
     @abstractmethod
     def check(self) -> bool:
@@ -54,14 +348,31 @@ class FileCheck(ABC):
         entry.notes = self.notes
         return entry
 
-    def run(self) -> Optional[ReportCheck]:
-        if self.can_check():
+    def run(
+        self, identical: Optional[str] = None, profile: bool = False
+    ) -> Optional[ReportCheck]:
+        if not self.can_check():
+            return None
+
+        # time and resources of the check are added to the meta data of its entry
+        usage = ResourceUsage() if profile else None
+
+        # skip expensive checks if the files are known to be identical
+        if identical is not None and self.expensive:
+            self.add_note(
+                "Identical Content",
+                "Source and reference file are byte-identical, check skipped.",
+                identical,
+            )
+        else:
             try:
                 _ = self.check()
             except Exception as e:
                 self.add_finding(
                     "Exception", "An exception occurred during check", str(e)
                 )
-            return self.report()
-        else:
-            return None
+
+        entry = self.report()
+        if usage is not None:
+            entry.meta.update(usage.stop())
+        return entry
@@ -0,0 +1,195 @@
+import io
+import os
+from typing import IO, Any, Callable, Dict, Optional, Tuple, Union
+
+from medcmp.cache import ReferenceCache, cached_decode
+from medcmp.scan import file_digest
+
+
+def image_arrays(img) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Convert a SimpleITK image into a numpy array and its geometry.
+    """
+
+    import SimpleITK as sitk
+
+    arrays = {"image": sitk.GetArrayFromImage(img)}
+    meta = {
+        "origin": list(img.GetOrigin()),
+        "spacing": list(img.GetSpacing()),
+        "direction": list(img.GetDirection()),
+        "size": list(img.GetSize()),
+    }
+
+    return arrays, meta
+
+
+class Artifact:
+    """
+    One file of a compared file pair. All representations of the file (raw bytes,
+    parsed data, SimpleITK image, numpy array, ...) are loaded on first access and
+    kept for all following checks.
+    """
+
+    # files up to this size are read into memory once when they are hashed, so
+    # later parsing does not read them again
+    memory_threshold: int = 16 * 2**20
+
+    def __init__(
+        self,
+        path: str,
+        size: Optional[int] = None,
+        cache: Optional[ReferenceCache] = None,
+    ):
+        self.path = path
+        self.cache = cache
+        self._size = size
+        self._memo: Dict[Any, Any] = {}
+
+    def memo(self, key: Any, load: Callable[[], Any]) -> Any:
+        if key not in self._memo:
+            self._memo[key] = load()
+        return self._memo[key]
+
+    def loaded(self, key: Any) -> bool:
+        return key in self._memo
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = os.path.getsize(self.path)
+        return self._size
+
+    @property
+    def bytes(self) -> bytes:
+        def load():
+            with open(self.path, "rb") as f:
+                return f.read()
+
+        return self.memo("bytes", load)
+
+    @property
+    def source(self) -> Union[str, IO[bytes]]:
+        """
+        The file content as in-memory stream if it is loaded, the path otherwise.
+        """
+
+        if self.loaded("bytes"):
+            return io.BytesIO(self.bytes)
+        return self.path
+
+    @property
+    def digest(self) -> str:
+        def load():
+            # hash from memory if the content is (or should be) loaded anyway
+            if self.loaded("bytes") or self.size <= self.memory_threshold:
+                return file_digest(self.path, content=self.bytes)
+            return file_digest(self.path)
+
+        return self.memo("digest", load)
+
+    @property
+    def data(self) -> Any:
+        """
+        Parsed json / yml / csv data.
+        """
+
+        from medcmp.checks.DataFileCheck import get_data
+
+        content = self.bytes if self.loaded("bytes") else None
+        return self.memo("data", lambda: get_data(self.path, content))
+
+    @property
+    def image(self):
+        """
+        SimpleITK image.
+        """
+
+        import SimpleITK as sitk
+
+        return self.memo("image", lambda: sitk.ReadImage(self.path))
+
+    def decode(
+        self, kind: str, decoder: Callable[[str], Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Decoded arrays and meta data of the file, read through the reference cache
+        if the artifact has one.
+        """
+
+        return self.memo(
+            ("decode", kind),
+            lambda: cached_decode(self.cache, self.path, kind, decoder),
+        )
+
+    def decode_image(self, path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        return image_arrays(self.image)
+
+    @property
+    def array(self):
+        """
+        Image voxels as numpy array (z, y, x).
+        """
+
+        return self.decode("image", self.decode_image)[0]["image"]
+
+    @property
+    def geometry(self) -> Dict[str, Any]:
+        """
+        Image size, origin, spacing and direction.
+        """
+
+        return self.decode("image", self.decode_image)[1]
+
+    @property
+    def volume_header(self):
+        """
+        Header of a 3D MHA / NRRD volume, or None for other files.
+        """
+
+        from medcmp.checks.RawVolume import read_volume_header
+
+        return self.memo("volume_header", lambda: read_volume_header(self.path))
+
+    @property
+    def raw_volume(self):
+        """
+        Header of an uncompressed MHA / NRRD volume, whose voxels can be
+        memory-mapped, or None for other files.
+        """
+
+        from medcmp.checks.RawVolume import raw_volume
+
+        return self.memo("raw_volume", lambda: raw_volume(self.volume_header))
+
+
+class FileContext:
+    """
+    Artifacts of a source and reference file shared by all checks of a file pair,
+    so each file is read and decoded at most once.
+    """
+
+    def __init__(
+        self,
+        src_path: str,
+        ref_path: str,
+        src_size: Optional[int] = None,
+        ref_size: Optional[int] = None,
+        cache: Optional[ReferenceCache] = None,
+    ):
+        self.src = Artifact(src_path, src_size)
+        self.ref = Artifact(ref_path, ref_size, cache)
+
+    def identical(self) -> Optional[str]:
+        """
+        Return the content digest if both files are byte-identical and None
+        otherwise. Files of different size are never hashed.
+        """
+
+        if self.src.size != self.ref.size:
+            return None
+
+        if self.src.digest != self.ref.digest:
+            return None
+
+        return self.src.digest
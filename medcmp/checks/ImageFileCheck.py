@@ -1,49 +1,229 @@
 from .FileCompare import FileCheck
-import pyplastimatch as pypla
+from .CheckRegistry import check_patterns
+from .LabelOverlap import LabelOverlap
+from .RawVolume import RawVolume, iter_slabs, slab_slices
+from .VoxelEquality import identical_voxels
 import numpy as np
-import SimpleITK as sitk
-import subprocess
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
+
+
+def check_geometry(
+    src_meta: Dict[str, Any], ref_meta: Dict[str, Any], tolerance: float = 1e-5
+) -> Dict[str, Any]:
+    """
+    Compare the geometry (size, origin, spacing, direction) of two images and
+    return the differing fields.
+    """
+
+    mismatch = {}
+    for field in ["size", "origin", "spacing", "direction"]:
+        src = np.asarray(src_meta[field], dtype=float)
+        ref = np.asarray(ref_meta[field], dtype=float)
+        if src.shape != ref.shape or not np.allclose(src, ref, rtol=0, atol=tolerance):
+            mismatch[field] = {"src": src_meta[field], "ref": ref_meta[field]}
+
+    return mismatch
+
+
+class DiffStats:
+    """
+    Statistics of the difference image (ref - src), computed like
+    `plastimatch compare`. Arrays can be added in chunks.
+
+      MIN      Minimum value of difference image
+      AVE      Average value of difference image
+      MAX      Maximum value of difference image
+      MAE      Mean average value of difference image
+      MSE      Mean squared difference between images
+      DIF      Number of pixels with different intensities
+      NUM      Total number of voxels in the difference image
+    """
+
+    def __init__(self):
+        self.min = np.inf
+        self.max = -np.inf
+        self.sum = 0.0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.dif = 0
+        self.num = 0
+
+    def update(self, ref: np.ndarray, src: np.ndarray):
+        # both images are compared as float images
+        diff = ref.astype(np.float32) - src.astype(np.float32)
+        if diff.size == 0:
+            return
+
+        self.min = min(self.min, float(diff.min()))
+        self.max = max(self.max, float(diff.max()))
+        self.sum += float(diff.sum(dtype=np.float64))
+        self.abs_sum += float(np.abs(diff).sum(dtype=np.float64))
+        self.sq_sum += float(np.square(diff, dtype=np.float64).sum())
+        self.dif += int(np.count_nonzero(diff))
+        self.num += diff.size
+
+    def result(self) -> Dict[str, float]:
+        num = max(self.num, 1)
+        return {
+            "MIN": self.min if self.num else 0.0,
+            "AVE": self.sum / num,
+            "MAX": self.max if self.num else 0.0,
+            "MAE": self.abs_sum / num,
+            "MSE": self.sq_sum / num,
+            "DIF": float(self.dif),
+            "NUM": float(self.num),
+        }
+
+
+def image_diff_stats(ref: np.ndarray, src: np.ndarray) -> Dict[str, float]:
+    """
+    Compute the statistics of the difference image between two arrays of the same
+    shape (see DiffStats).
+    """
+
+    stats = DiffStats()
+    stats.update(ref, src)
+    return stats.result()
 
 
 class ImageFileCheck(FileCheck):
+    pool: str = "process"
+    expensive: bool = True
     dice_tolerance: float = 0.0001
     value_tolerance: float = 0.001
+    geometry_tolerance: float = 0.00001
+    overlap_crop: bool = True
 
-    def can_check(self) -> bool:
-        return (
-            self.src_path.endswith(".nii.gz")
-            or self.src_path.endswith(".nrrd")
-            or self.src_path.endswith(".mha")
-        )
+    # uncompressed MHA / NRRD volumes larger than this (both files together, in
+    # bytes) are compared slab by slab from memory-mapped files (0 to disable)
+    memory_budget: int = 2 * 2**30
+
+    # compare the decompressed voxel data first and skip all statistics if it is
+    # identical
+    voxel_precheck: bool = True
+
+    patterns = check_patterns("ImageFileCheck")
 
     def check(self) -> bool:
+        # files with the same geometry and voxels need no statistics
+        if self.voxel_precheck:
+            payload_size = identical_voxels(self.context)
+            if payload_size is not None:
+                self.add_note(
+                    "Voxel Identical",
+                    "Geometry and voxel data of source and reference image are "
+                    "identical, statistics skipped.",
+                    payload_size,
+                )
+                return True
+
+        # compare large raw volumes in slabs
+        volumes = self.raw_volumes()
+        if volumes is not None:
+            return self.check_chunked(*volumes)
+
         # load ref image into numpy array
-        ref_img = sitk.ReadImage(self.ref_path)
-        ref_np = sitk.GetArrayFromImage(ref_img)
+        ref_np = self.context.ref.array
 
         # add note for file data type
         self.add_note(
             "Data Type", "Data type of the reference image", str(ref_np.dtype)
         )
 
+        # load src image and compare geometry
+        if not self.check_geometry(
+            self.context.src.geometry, self.context.ref.geometry
+        ):
+            return False
+
         # if type is float run value checks only
         # e.g., probability maps, heatmaps, etc.
         if ref_np.dtype == np.float32 or ref_np.dtype == np.float64:
             # check values
-            return self.check_values()
+            return self.check_values(self.context.src.array, ref_np)
 
         else:
             # check dice
-            return self.check_dice()
+            return self.check_dice(self.context.src.array, ref_np)
+
+    def check_geometry(
+        self, src_meta: Dict[str, Any], ref_meta: Dict[str, Any]
+    ) -> bool:
+        mismatch = check_geometry(src_meta, ref_meta, self.geometry_tolerance)
+
+        # add finding if geometries differ
+        if mismatch:
+            self.add_finding(
+                "Geometry Mismatch",
+                "Geometry of reference and test image differs.",
+                mismatch,
+            )
+
+        return not mismatch
+
+    def raw_volumes(self) -> Optional[Tuple[RawVolume, RawVolume]]:
+        """
+        Headers of both files if they are uncompressed volumes too large to be
+        loaded within the memory budget (and not loaded already).
+        """
+
+        if self.memory_budget <= 0:
+            return None
+        if self.context.src.loaded("image") or self.context.ref.loaded("image"):
+            return None
+
+        src = self.context.src.raw_volume
+        if src is None:
+            return None
+        ref = self.context.ref.raw_volume
+        if ref is None:
+            return None
+
+        if src.nbytes + ref.nbytes <= self.memory_budget:
+            return None
 
-    def check_values(self) -> bool:
-        # calculate the diff image between src and ref
-        diff_img = pypla_compare(
-            path_to_reference_img=self.ref_path,
-            path_to_test_img=self.src_path,
+        return src, ref
+
+    def check_chunked(self, src: RawVolume, ref: RawVolume) -> bool:
+        # add note for file data type
+        self.add_note(
+            "Data Type",
+            "Data type of the reference image",
+            str(ref.dtype.newbyteorder("=")),
+        )
+
+        # compare geometry from the headers
+        if not self.check_geometry(src.geometry, ref.geometry):
+            return False
+
+        slices, slabs = slab_slices(ref, src, self.memory_budget)
+        self.add_note(
+            "Chunked Comparison",
+            "Images were compared slab by slab from memory-mapped files.",
+            {
+                "slabs": slabs,
+                "slab_slices": slices,
+                "memory_budget": self.memory_budget,
+            },
         )
 
+        # same slab loop for value and label comparisons
+        if ref.dtype.kind == "f":
+            stats = DiffStats()
+            for ref_slab, src_slab in iter_slabs(ref, src, self.memory_budget):
+                stats.update(ref_slab, src_slab)
+            return self.check_diff_stats(stats.result())
+
+        overlap = LabelOverlap(crop=self.overlap_crop)
+        for ref_slab, src_slab in iter_slabs(ref, src, self.memory_budget):
+            overlap.update(ref_slab, src_slab)
+        return self.check_overlap(overlap)
+
+    def check_values(self, src_np: np.ndarray, ref_np: np.ndarray) -> bool:
+        # calculate the statistics of the diff image between src and ref
+        return self.check_diff_stats(image_diff_stats(ref_np, src_np))
+
+    def check_diff_stats(self, diff_img: Dict[str, float]) -> bool:
         # return conclusion
         self.add_note(
             "Image Diff Stat",
@@ -70,15 +250,15 @@ class ImageFileCheck(FileCheck):
 
         return check
 
-    def check_dice(self) -> bool:
-        # calculate dice between images
-        dice_summary_dict = pypla.dice(
-            path_to_reference_img=self.ref_path,
-            path_to_test_img=self.src_path,
-        )
+    def check_dice(self, src_np: np.ndarray, ref_np: np.ndarray) -> bool:
+        # calculate the overlap of all labels between images
+        overlap = LabelOverlap(crop=self.overlap_crop)
+        overlap.update(ref_np, src_np)
+        return self.check_overlap(overlap)
 
-        # get dice score
-        dice_score = dice_summary_dict["dc"]
+    def check_overlap(self, overlap: LabelOverlap) -> bool:
+        # get dice score of the foreground
+        dice_score = overlap.dice
 
         # add note
         self.add_note(
@@ -86,7 +266,7 @@ class ImageFileCheck(FileCheck):
         )
 
         # return report entry
-        check = np.isclose(dice_score, 1.0, atol=self.dice_tolerance)
+        check = bool(np.isclose(dice_score, 1.0, atol=self.dice_tolerance))
 
         # add finding if check fails
         if not check:
@@ -96,62 +276,16 @@ class ImageFileCheck(FileCheck):
                 {"dice_score": dice_score, "tolerance": self.dice_tolerance},
             )
 
-        return check
-
-
-## helper until pyplastimatch.compare is available
-def pypla_compare(
-    path_to_reference_img, path_to_test_img, verbose=True
-) -> Dict[str, float]:
-    """
-    The compare command compares two files by subtracting one file from the other, and reporting statistics of the difference image. The two input files must have the same geometry (origin, dimensions, and voxel spacing). The command line usage is given as follows:
-
-    For additional details, see:
-    https://plastimatch.org/plastimatch.html#plastimatch-compare
-
-    Args:
-        path_to_reference_img:
-        path_to_test_img:
-
-    Returns:
-        dictionary:
-          MIN      Minimum value of difference image
-          AVE      Average value of difference image
-          MAX      Maximum value of difference image
-          MAE      Mean average value of difference image
-          MSE      Mean squared difference between images
-          DIF      Number of pixels with different intensities
-          NUM      Total number of voxels in the difference image
-
-    """
-
-    # print
-    if verbose:
-        print("\n Comparing two images with 'plastimatch compare'")
+        # add finding for each label that differs
+        for label, stats in overlap.result().items():
+            if not np.isclose(stats["dice"], 1.0, atol=self.dice_tolerance):
+                self.add_finding(
+                    "Label Dice Score Difference",
+                    "Dice score of a label between reference and test image exceeds "
+                    "tolerance.",
+                    {**stats, "tolerance": self.dice_tolerance},
+                    subpath=f"label {label}",
+                )
+                check = False
 
-    # build command
-    bash_command = []
-    bash_command += ["plastimatch", "compare"]
-    bash_command += [path_to_reference_img, path_to_test_img]
-
-    # run command
-    dice_summary = subprocess.run(bash_command, capture_output=True, check=True)
-
-    # print
-    if verbose:
-        print("... Done.")
-
-    # combine output
-    comparison_raw = dice_summary.stdout.decode("utf-8")
-
-    # flaten output
-    comparison_flat = " ".join(comparison_raw.splitlines()).split()
-    assert len(comparison_flat) == 14, "Unfamiliar output."
-
-    # parse output into dictionary
-    comparison_dict = {}
-    for i in range(0, len(comparison_flat), 2):
-        comparison_dict[comparison_flat[i]] = float(comparison_flat[i + 1])
-
-    # return dictionary
-    return comparison_dict
+        return check
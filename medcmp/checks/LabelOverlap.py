@@ -0,0 +1,181 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+# label ranges up to this size are counted directly, sparse labels spread over a
+# larger range are mapped to a compact index first
+MAX_LABEL_RANGE = 1 << 20
+
+
+class LabelOverlap:
+    """
+    Overlap of all labels between a reference and a source label map.
+
+    Voxels are counted per label with one bincount per array (and one over the
+    voxels both maps agree on), so all labels are measured in a single pass no
+    matter how many there are. Arrays can be added in chunks.
+
+    With crop, counting is restricted to the bounding box of the foreground of
+    both arrays, so small structures in large volumes are cheap.
+    """
+
+    def __init__(self, background: int = 0, crop: bool = False):
+        self.background = background
+        self.crop = crop
+
+        # voxel counts per label
+        self.ref_count: Dict[int, int] = {}
+        self.src_count: Dict[int, int] = {}
+        self.intersection: Dict[int, int] = {}
+
+        # voxel counts of the (binary) foreground
+        self.fg_ref = 0
+        self.fg_src = 0
+        self.fg_intersection = 0
+
+    def update(self, ref: np.ndarray, src: np.ndarray):
+        if ref.shape != src.shape:
+            raise ValueError(
+                f"Label maps differ in shape: {list(ref.shape)} != {list(src.shape)}"
+            )
+
+        total = ref.size
+        if self.crop:
+            ref, src = crop_to_foreground(ref, src, self.background)
+
+        ref = np.asarray(ref).ravel()
+        src = np.asarray(src).ravel()
+
+        # voxels outside the bounding box are background in both arrays
+        outside = total - ref.size
+        if outside > 0:
+            for counts in [self.ref_count, self.src_count, self.intersection]:
+                counts[self.background] = counts.get(self.background, 0) + outside
+
+        if ref.size == 0:
+            return
+
+        # count voxels per label
+        labels, ref_idx, src_idx = index_labels(ref, src)
+        n = len(labels)
+        ref_count = np.bincount(ref_idx, minlength=n)
+        src_count = np.bincount(src_idx, minlength=n)
+        intersection = np.bincount(ref_idx[ref_idx == src_idx], minlength=n)
+
+        for i in np.flatnonzero(ref_count + src_count).tolist():
+            label = int(labels[i])
+            for counts, new in [
+                (self.ref_count, ref_count),
+                (self.src_count, src_count),
+                (self.intersection, intersection),
+            ]:
+                counts[label] = counts.get(label, 0) + int(new[i])
+
+        # binary foreground
+        ref_fg = ref != self.background
+        src_fg = src != self.background
+        self.fg_ref += int(np.count_nonzero(ref_fg))
+        self.fg_src += int(np.count_nonzero(src_fg))
+        self.fg_intersection += int(np.count_nonzero(ref_fg & src_fg))
+
+    @property
+    def labels(self) -> List[int]:
+        return sorted(label for label in self.ref_count if label != self.background)
+
+    @property
+    def dice(self) -> float:
+        """
+        Dice coefficient of the binary foreground (all labels but background). Two
+        empty label maps have a dice of 1.
+        """
+
+        return dice(self.fg_ref, self.fg_src, self.fg_intersection)
+
+    def result(self) -> Dict[int, Dict[str, float]]:
+        """
+        Return dice, jaccard, volume difference (src - ref) and voxel counts of each
+        label present in either label map, background excluded.
+        """
+
+        result = {}
+        for label in self.labels:
+            ref = self.ref_count[label]
+            src = self.src_count[label]
+            intersection = self.intersection[label]
+            union = ref + src - intersection
+
+            result[label] = {
+                "dice": dice(ref, src, intersection),
+                "jaccard": intersection / union if union else 1.0,
+                "volume_diff": src - ref,
+                "ref_voxels": ref,
+                "src_voxels": src,
+                "intersection": intersection,
+            }
+
+        return result
+
+
+def dice(ref: int, src: int, intersection: int) -> float:
+    return 2.0 * intersection / (ref + src) if ref + src else 1.0
+
+
+def label_overlap(
+    ref: np.ndarray, src: np.ndarray, background: int = 0, crop: bool = False
+) -> LabelOverlap:
+    """
+    Compute the overlap of all labels of two label maps of the same shape (see
+    LabelOverlap).
+    """
+
+    overlap = LabelOverlap(background, crop)
+    overlap.update(ref, src)
+    return overlap
+
+
+def index_labels(
+    ref: np.ndarray, src: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Map the labels of two flat arrays to bincount indices. Returns the label of
+    each index and the index arrays.
+    """
+
+    if ref.dtype.kind in "biu" and src.dtype.kind in "biu":
+        lo = min(int(ref.min()), int(src.min()))
+        hi = max(int(ref.max()), int(src.max()))
+
+        # small non-negative labels are their own index, other small label ranges
+        # are shifted to start at zero
+        if lo >= 0 and hi < MAX_LABEL_RANGE:
+            if ref.dtype == np.uint64 or src.dtype == np.uint64:
+                ref, src = ref.astype(np.intp), src.astype(np.intp)
+            return np.arange(hi + 1), ref, src
+        if hi - lo < MAX_LABEL_RANGE:
+            ref = ref.astype(np.intp) - lo
+            src = src.astype(np.intp) - lo
+            return np.arange(lo, hi + 1), ref, src
+
+    labels, inverse = np.unique(np.concatenate([ref, src]), return_inverse=True)
+    return labels, inverse[: ref.size], inverse[ref.size :]
+
+
+def crop_to_foreground(
+    ref: np.ndarray, src: np.ndarray, background: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Crop both arrays to the bounding box of the voxels that are foreground in
+    either of them.
+    """
+
+    foreground = (ref != background) | (src != background)
+
+    bbox = []
+    for axis in range(foreground.ndim):
+        other = tuple(a for a in range(foreground.ndim) if a != axis)
+        hits = np.flatnonzero(foreground.any(axis=other))
+        if hits.size == 0:
+            # no foreground at all
+            return ref[:0], src[:0]
+        bbox.append(slice(int(hits[0]), int(hits[-1]) + 1))
+
+    return ref[tuple(bbox)], src[tuple(bbox)]
@@ -0,0 +1,354 @@
+import os
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# voxel types of MetaImage files (MET_LONG / MET_ULONG depend on the writer)
+MHA_TYPES = {
+    "MET_CHAR": "i1",
+    "MET_UCHAR": "u1",
+    "MET_SHORT": "i2",
+    "MET_USHORT": "u2",
+    "MET_INT": "i4",
+    "MET_UINT": "u4",
+    "MET_LONG_LONG": "i8",
+    "MET_ULONG_LONG": "u8",
+    "MET_FLOAT": "f4",
+    "MET_DOUBLE": "f8",
+}
+
+# voxel types of NRRD files with all their spellings
+NRRD_TYPES = {
+    **dict.fromkeys(["signed char", "int8", "int8_t"], "i1"),
+    **dict.fromkeys(["uchar", "unsigned char", "uint8", "uint8_t"], "u1"),
+    **dict.fromkeys(
+        ["short", "short int", "signed short", "signed short int", "int16", "int16_t"],
+        "i2",
+    ),
+    **dict.fromkeys(
+        ["ushort", "unsigned short", "unsigned short int", "uint16", "uint16_t"], "u2"
+    ),
+    **dict.fromkeys(["int", "signed int", "int32", "int32_t"], "i4"),
+    **dict.fromkeys(["uint", "unsigned int", "uint32", "uint32_t"], "u4"),
+    **dict.fromkeys(
+        [
+            "longlong",
+            "long long",
+            "long long int",
+            "signed long long",
+            "signed long long int",
+            "int64",
+            "int64_t",
+        ],
+        "i8",
+    ),
+    **dict.fromkeys(
+        [
+            "ulonglong",
+            "unsigned long long",
+            "unsigned long long int",
+            "uint64",
+            "uint64_t",
+        ],
+        "u8",
+    ),
+    "float": "f4",
+    "double": "f8",
+}
+
+# headers are small, files with a longer header are not read as raw volumes
+MAX_HEADER_SIZE = 1 << 16
+
+# working memory of a slab comparison per voxel, besides the voxels of both files
+# (float copies, differences and label indices)
+SLAB_BYTES_PER_VOXEL = 32
+
+
+class RawVolume:
+    """
+    A 3D volume of a MetaImage (.mha) or NRRD file: the location, encoding ("raw",
+    "zlib" or "gzip") and type of the voxel data and the image geometry (as
+    SimpleITK reports it).
+    """
+
+    def __init__(
+        self,
+        data_path: str,
+        offset: int,
+        dtype: np.dtype,
+        size: List[int],
+        origin: List[float],
+        spacing: List[float],
+        direction: List[float],
+        encoding: str = "raw",
+    ):
+        self.data_path = data_path
+        self.offset = offset
+        self.dtype = dtype
+        self.size = size  # x, y, z
+        self.origin = origin
+        self.spacing = spacing
+        self.direction = direction
+        self.encoding = encoding
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.size)) * self.dtype.itemsize
+
+    @property
+    def geometry(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "spacing": self.spacing,
+            "direction": self.direction,
+            "size": self.size,
+        }
+
+    def slab(self, start: int, stop: int) -> np.ndarray:
+        """
+        Memory-map the slices start:stop (z). Pages of a slab are released when
+        the returned array is dropped.
+        """
+
+        slice_bytes = self.size[0] * self.size[1] * self.dtype.itemsize
+        return np.memmap(
+            self.data_path,
+            dtype=self.dtype,
+            mode="r",
+            offset=self.offset + start * slice_bytes,
+            shape=(stop - start, self.size[1], self.size[0]),
+        )
+
+
+def read_header_lines(path: str) -> Optional[Tuple[List[str], int]]:
+    """
+    Read the text header of a file up to the first empty line (NRRD) or the
+    ElementDataFile line (MetaImage). Returns the lines and the offset of the data
+    following the header.
+    """
+
+    with open(path, "rb") as f:
+        head = f.read(MAX_HEADER_SIZE)
+
+    lines = []
+    offset = 0
+    while offset < len(head):
+        end = head.find(b"\n", offset)
+        if end < 0:
+            return None
+
+        line = head[offset:end].decode("latin-1").rstrip("\r")
+        offset = end + 1
+
+        if line == "":
+            return lines, offset
+        lines.append(line)
+        if line.startswith("ElementDataFile"):
+            return lines, offset
+
+    return None
+
+
+def read_mha_header(path: str) -> Optional[RawVolume]:
+    header = read_header_lines(path)
+    if header is None:
+        return None
+    lines, offset = header
+
+    fields = {}
+    for line in lines:
+        key, sep, value = line.partition("=")
+        if sep:
+            fields[key.strip()] = value.strip()
+
+    if (
+        fields.get("NDims") != "3"
+        or fields.get("BinaryData", "True") != "True"
+        or fields.get("ElementNumberOfChannels", "1") != "1"
+        or fields.get("HeaderSize", "0") != "0"
+        or fields.get("ElementType") not in MHA_TYPES
+        or "ElementDataFile" not in fields
+    ):
+        return None
+
+    big_endian = fields.get(
+        "BinaryDataByteOrderMSB", fields.get("ElementByteOrderMSB", "False")
+    )
+    dtype = np.dtype(
+        (">" if big_endian == "True" else "<") + MHA_TYPES[fields["ElementType"]]
+    )
+
+    data_path = path
+    if fields["ElementDataFile"] != "LOCAL":
+        data_path = os.path.join(os.path.dirname(path), fields["ElementDataFile"])
+        offset = 0
+
+    # the transform matrix is stored column by column
+    matrix = fields.get("TransformMatrix", "1 0 0 0 1 0 0 0 1")
+    direction = np.array(matrix.split(), dtype=float).reshape(3, 3).T
+
+    return RawVolume(
+        data_path,
+        offset,
+        dtype,
+        [int(x) for x in fields["DimSize"].split()],
+        [float(x) for x in fields.get("Offset", "0 0 0").split()],
+        [float(x) for x in fields.get("ElementSpacing", "1 1 1").split()],
+        direction.ravel().tolist(),
+        "zlib" if fields.get("CompressedData") == "True" else "raw",
+    )
+
+
+def read_nrrd_header(path: str) -> Optional[RawVolume]:
+    header = read_header_lines(path)
+    if header is None or not header[0][0].startswith("NRRD"):
+        return None
+    lines, offset = header
+
+    fields = {}
+    for line in lines[1:]:
+        if line.startswith("#") or ":=" in line:
+            continue
+        key, sep, value = line.partition(": ")
+        if sep:
+            fields[key.strip()] = value.strip()
+
+    if (
+        fields.get("dimension") != "3"
+        or fields.get("encoding") not in ["raw", "gzip", "gz"]
+        or fields.get("type") not in NRRD_TYPES
+        or fields.get("line skip", "0") != "0"
+        or fields.get("byte skip", "0") != "0"
+    ):
+        return None
+
+    dtype = np.dtype(
+        (">" if fields.get("endian") == "big" else "<") + NRRD_TYPES[fields["type"]]
+    )
+
+    data_path = path
+    data_file = fields.get("data file", fields.get("datafile"))
+    if data_file is not None:
+        data_path = os.path.join(os.path.dirname(path), data_file)
+        offset = 0
+
+    if "space directions" in fields:
+        vectors = fields["space directions"].split()
+        if any(v == "none" for v in vectors):
+            return None
+        matrix = np.array(
+            [[float(x) for x in v.strip("()").split(",")] for v in vectors]
+        ).T
+        origin = np.array(
+            [float(x) for x in fields["space origin"].strip("()").split(",")]
+            if "space origin" in fields
+            else [0.0, 0.0, 0.0]
+        )
+    else:
+        spacings = fields.get("spacings", "1 1 1").split()
+        matrix = np.diag([float(x) for x in spacings])
+        origin = np.zeros(3)
+
+    # images are reported in LPS space
+    space = fields.get("space", "left-posterior-superior")
+    if space in ["right-anterior-superior", "RAS"]:
+        flip = np.array([-1.0, -1.0, 1.0])
+        matrix = flip[:, np.newaxis] * matrix
+        origin = flip * origin
+    elif space not in ["left-posterior-superior", "LPS"]:
+        return None
+
+    spacing = np.linalg.norm(matrix, axis=0)
+
+    return RawVolume(
+        data_path,
+        offset,
+        dtype,
+        [int(x) for x in fields["sizes"].split()],
+        # without negative zeros
+        (origin + 0.0).tolist(),
+        spacing.tolist(),
+        (matrix / spacing + 0.0).ravel().tolist(),
+        "raw" if fields["encoding"] == "raw" else "gzip",
+    )
+
+
+def read_volume_header(path: str) -> Optional[RawVolume]:
+    """
+    Parse the header of a 3D MetaImage or NRRD file. Returns None for other files
+    (multi-channel, unsupported types or encodings, ...).
+    """
+
+    try:
+        if path.endswith(".mha"):
+            volume = read_mha_header(path)
+        elif path.endswith(".nrrd"):
+            volume = read_nrrd_header(path)
+        else:
+            return None
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+
+    if volume is None or not os.path.isfile(volume.data_path):
+        return None
+
+    return volume
+
+
+def read_raw_volume(path: str) -> Optional[RawVolume]:
+    """
+    Parse the header of an uncompressed 3D MetaImage or NRRD file, whose voxels
+    can be memory-mapped. Returns None for other files.
+    """
+
+    return raw_volume(read_volume_header(path))
+
+
+def raw_volume(volume: Optional[RawVolume]) -> Optional[RawVolume]:
+    """
+    The parsed header of a volume if its voxels are uncompressed and complete, so
+    they can be memory-mapped, None otherwise.
+    """
+
+    if volume is None or volume.encoding != "raw":
+        return None
+
+    # the data must be complete
+    if os.path.getsize(volume.data_path) < volume.offset + volume.nbytes:
+        return None
+
+    return volume
+
+
+def slab_slices(ref: RawVolume, src: RawVolume, memory_budget: int) -> Tuple[int, int]:
+    """
+    Number of slices per slab so that one slab of both volumes and the working
+    memory of its comparison fit into the memory budget (at least one slice), and
+    the number of slabs.
+    """
+
+    voxels = ref.size[0] * ref.size[1]
+    per_slice = voxels * (
+        ref.dtype.itemsize + src.dtype.itemsize + SLAB_BYTES_PER_VOXEL
+    )
+    slices = max(1, min(ref.size[2], memory_budget // per_slice))
+    return slices, -(-ref.size[2] // slices)
+
+
+def iter_slabs(
+    ref: RawVolume, src: RawVolume, memory_budget: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Iterate over matching slabs (z) of two volumes of the same size, each loaded
+    into memory for its comparison and released afterwards.
+    """
+
+    assert ref.size == src.size
+    slices, _ = slab_slices(ref, src, memory_budget)
+
+    for start in range(0, ref.size[2], slices):
+        stop = min(start + slices, ref.size[2])
+        # copied in native byte order, the mapping is released right away
+        yield (
+            ref.slab(start, stop).astype(ref.dtype.newbyteorder("=")),
+            src.slab(start, stop).astype(src.dtype.newbyteorder("=")),
+        )
@@ -1,20 +1,14 @@
 from .FileCompare import FileCheck
-import os
+from .CheckRegistry import check_patterns
 
 
 class SizeCheck(FileCheck):
-    def can_check(self) -> bool:
-        return (
-            not self.src_path.endswith(".dcm")
-            and not self.src_path.endswith(".nii.gz")
-            and not self.src_path.endswith(".nrrd")
-            and not self.src_path.endswith(".mha")
-        )
+    patterns = check_patterns("SizeCheck")
 
     def check(self) -> bool:
         # load file size
-        src_size = os.path.getsize(self.src_path)
-        ref_size = os.path.getsize(self.ref_path)
+        src_size = self.context.src.size
+        ref_size = self.context.ref.size
         diff_size = src_size - ref_size
 
         # compile finding info data
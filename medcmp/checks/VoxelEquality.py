@@ -0,0 +1,172 @@
+import gzip
+import struct
+import zlib
+from typing import IO, TYPE_CHECKING, Any, Iterator, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from medcmp.checks.FileContext import Artifact, FileContext
+
+# size of the chunks read and decompressed at a time
+PAYLOAD_CHUNK_SIZE = 1 << 20
+
+# header fields of NIfTI-1 / NIfTI-2 files that define the geometry and voxel
+# values (dim, datatype, pixdim, vox_offset, scaling, units, qform and sform), as
+# byte ranges
+NIFTI1_FIELDS = [(40, 124), (252, 328)]
+NIFTI2_FIELDS = [(12, 192), (344, 504)]
+
+ZLIB_WBITS = {"raw": None, "zlib": zlib.MAX_WBITS, "gzip": 16 + zlib.MAX_WBITS}
+
+
+def decompressed_chunks(
+    source: Union[str, IO[bytes]],
+    offset: int = 0,
+    encoding: str = "raw",
+    skip: int = 0,
+    chunk_size: int = PAYLOAD_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Iterate over the (decompressed) content of a file (path or binary stream) from
+    offset on in chunks of at most chunk_size bytes, leaving out the first skip
+    bytes of the content. Concatenated gzip members are read one after another.
+    """
+
+    wbits = ZLIB_WBITS[encoding]
+
+    with open(source, "rb") if isinstance(source, str) else source as f:
+        f.seek(offset)
+
+        decompressor = zlib.decompressobj(wbits) if wbits is not None else None
+        data = f.read(chunk_size)
+        while data:
+            if decompressor is None:
+                out = data
+                data = f.read(chunk_size)
+            else:
+                out = decompressor.decompress(data, chunk_size)
+                data = decompressor.unconsumed_tail
+                if decompressor.eof:
+                    # next gzip member, if any
+                    data = decompressor.unused_data or f.read(chunk_size)
+                    if encoding != "gzip":
+                        data = b""
+                    decompressor = zlib.decompressobj(wbits)
+                elif not data:
+                    data = f.read(chunk_size)
+
+            if skip > 0:
+                out, skip = out[skip:], max(0, skip - len(out))
+            if out:
+                yield out
+
+
+def chunks_equal(a: Iterator[bytes], b: Iterator[bytes]) -> Optional[int]:
+    """
+    Compare two byte streams chunk by chunk (the chunks may differ in size) and
+    stop at the first difference. Returns the number of bytes if both streams are
+    equal and None otherwise.
+    """
+
+    chunk_a = chunk_b = b""
+    pos_a = pos_b = 0
+    total = 0
+
+    while True:
+        if pos_a == len(chunk_a):
+            chunk_a, pos_a = next(a, b""), 0
+        if pos_b == len(chunk_b):
+            chunk_b, pos_b = next(b, b""), 0
+
+        if len(chunk_a) == 0 or len(chunk_b) == 0:
+            return total if len(chunk_a) == len(chunk_b) else None
+
+        # whole chunks of the same size are compared without copies
+        n = min(len(chunk_a) - pos_a, len(chunk_b) - pos_b)
+        if chunk_a[pos_a : pos_a + n] != chunk_b[pos_b : pos_b + n]:
+            return None
+
+        pos_a += n
+        pos_b += n
+        total += n
+
+
+def nifti_payload(artifact: "Artifact") -> Optional[Tuple[Any, Iterator[bytes]]]:
+    """
+    Geometry header fields and voxel data of a gzipped NIfTI file.
+    """
+
+    with gzip.open(artifact.source, "rb") as f:
+        header = f.read(540)
+
+    for order in "<>":
+        if len(header) >= 348 and struct.unpack(order + "i", header[:4])[0] == 348:
+            fields = NIFTI1_FIELDS
+            vox_offset = int(struct.unpack(order + "f", header[108:112])[0])
+            break
+        if len(header) >= 540 and struct.unpack(order + "i", header[:4])[0] == 540:
+            fields = NIFTI2_FIELDS
+            vox_offset = struct.unpack(order + "q", header[168:176])[0]
+            break
+    else:
+        return None
+
+    # single-file NIfTI has the voxels right after the header (and extensions)
+    vox_offset = max(vox_offset, 352 if fields is NIFTI1_FIELDS else 544)
+
+    key = b"".join(header[start:stop] for start, stop in fields)
+    return key, decompressed_chunks(artifact.source, encoding="gzip", skip=vox_offset)
+
+
+def volume_payload(artifact: "Artifact") -> Optional[Tuple[Any, Iterator[bytes]]]:
+    """
+    Geometry and voxel data of a MetaImage or NRRD file.
+    """
+
+    volume = artifact.volume_header
+    if volume is None:
+        return None
+
+    key = (
+        volume.dtype.str,
+        volume.size,
+        volume.origin,
+        volume.spacing,
+        volume.direction,
+    )
+
+    # detached headers have their voxels in another file
+    source = artifact.source if volume.data_path == artifact.path else volume.data_path
+    return key, decompressed_chunks(source, volume.offset, volume.encoding)
+
+
+def identical_voxels(context: "FileContext") -> Optional[int]:
+    """
+    Compare the geometry and the decompressed voxel data of two image files
+    (gzipped NIfTI, MetaImage or NRRD), stopping at the first differing chunk.
+    Files that differ only in compression, gzip headers or meta data are voxel
+    identical. Returns the size of the voxel data if the images are identical and
+    None otherwise (or for unsupported files).
+
+    Files are read through the artifacts of the file context: content already in
+    memory (e.g., hashed by the identity pre-check) is not read again, and parsed
+    MetaImage / NRRD headers are shared with the other checks.
+    """
+
+    src_path, ref_path = context.src.path, context.ref.path
+
+    if src_path.endswith(".nii.gz") and ref_path.endswith(".nii.gz"):
+        read_payload = nifti_payload
+    elif src_path.endswith((".mha", ".nrrd")) and ref_path.endswith((".mha", ".nrrd")):
+        read_payload = volume_payload
+    else:
+        return None
+
+    try:
+        src = read_payload(context.src)
+        ref = read_payload(context.ref)
+        if src is None or ref is None or src[0] != ref[0]:
+            return None
+
+        return chunks_equal(src[1], ref[1])
+    except (OSError, EOFError, zlib.error, struct.error):
+        return None
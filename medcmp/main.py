@@ -1,59 +1,278 @@
-import sys
-import os
+import argparse
 
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from medcmp.Report import Report, ReportConsolePrint, ReportYamlExport
-from medcmp.scan import compare_tree_structures
-from medcmp.checks.FileCompare import FileCompare
-from medcmp.checks.DataFileCheck import DataFileCheck
-from medcmp.checks.ImageFileCheck import ImageFileCheck
-from medcmp.checks.SizeCheck import SizeCheck
-from medcmp.checks.DicomsegContentCheck import DicomsegContentCheck
+from medcmp.Report import Report, ReportConsolePrint, report_export
+from medcmp.ReportStream import ReportStream, finalize_stream
+from medcmp.scan import Item, match_tree_structures, stream_tree_structures
+from medcmp.cache import ReferenceCache
+from medcmp.manifest import Manifest
+from medcmp.profile import Tracer, current_tracer, span, tracing
+from medcmp.checks.CheckExecutor import EXECUTORS, create_executor
+from medcmp.checks.FileCompare import FileCompare, FilePair
+from medcmp.checks.CheckRegistry import CHECKS
 
 
-def compare(src: str, ref: str, report: Optional[Report] = None, verbose: bool = False):
+def compare(
+    src: str,
+    ref: str,
+    report: Optional[Report] = None,
+    verbose: bool = False,
+    jobs: int = 1,
+    executor: Optional[str] = None,
+    options: Optional[Dict[str, Dict[str, Any]]] = None,
+    precheck: bool = True,
+    cache: Optional[ReferenceCache] = None,
+    manifest: Optional[Manifest] = None,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    streaming_scan: bool = False,
+):
     """
     Compare two directories.
+
+    Options are passed to the checks by check name, e.g.
+    {"DataFileCheck": {"csv_key": "id"}}. Without precheck, expensive checks also
+    run on byte-identical files. Decoded reference files are stored in and read
+    from the cache, if given. With the manifest of a previous run, only changed
+    file pairs are checked again; the manifest is updated with this run. Include
+    and exclude glob patterns restrict which files are scanned. With
+    streaming_scan, checks start on the first matched files while both trees are
+    still being scanned; the report is sorted into scan order at the end.
     """
 
+    options = options or {}
+
     # create report if not provided
     if report is None:
         report = Report()
 
     # compare tree structures
-    comparable_files = compare_tree_structures(src, ref, report)
+    if streaming_scan:
+        order: Dict[str, int] = {}
+
+        def pairs():
+            for index, src_item, ref_item in stream_tree_structures(
+                src, ref, report, include, exclude
+            ):
+                order[src_item.path] = index
+                yield src_item, ref_item
+
+        comparable_files: Iterable[Tuple[Item, Item]] = pairs()
+    else:
+        with span("scan"):
+            comparable_files = match_tree_structures(src, ref, report, include, exclude)
 
-    # compare files
-    file_checker = FileCompare(report)
-    file_checker.register(DataFileCheck)
-    file_checker.register(ImageFileCheck)
-    file_checker.register(SizeCheck)
-    file_checker.register(DicomsegContentCheck)
+    with span("compare"), create_executor(executor, jobs) as check_executor:
+        # compare files
+        # resource usage is only measured if it is reported or traced
+        file_checker = FileCompare(
+            report,
+            check_executor,
+            precheck,
+            cache,
+            manifest,
+            profile=report.profile or current_tracer() is not None,
+        )
+        for check in CHECKS:
+            file_checker.register(check, **options.get(check.name, {}))
 
-    for relpath in comparable_files:
-        src_path = os.path.join(src, relpath)
-        ref_path = os.path.join(ref, relpath)
+        file_checker.compare_all(
+            FilePair(
+                src_item.path,
+                ref_item.path,
+                src_item.size,
+                ref_item.size,
+                src_item.mtime,
+                ref_item.mtime,
+            )
+            for src_item, ref_item in comparable_files
+        )
 
-        file_checker.compare(src_path, ref_path)
+    # files are checked in the order they were found, report them in scan order
+    if streaming_scan:
+        report.checks.sort(key=lambda check: order.get(check.path, -1))
 
     # return report
     return report
 
 
+def explain(
+    src: str,
+    ref: str,
+    options: Optional[Dict[str, Dict[str, Any]]] = None,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> List[Tuple[str, List[str]]]:
+    """
+    List the checks that would run on each file found in both directories,
+    without running them.
+    """
+
+    options = options or {}
+
+    file_checker = FileCompare(Report())
+    for check in CHECKS:
+        file_checker.register(check, **options.get(check.name, {}))
+
+    return [
+        (
+            src_item.path,
+            [
+                c.__name__
+                for c, _ in file_checker.applicable(src_item.path, ref_item.path)
+            ],
+        )
+        for src_item, ref_item in match_tree_structures(
+            src, ref, Report(), include, exclude
+        )
+    ]
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        prog="medcmp",
+        description="Compare generated output of medical imaging models against a reference.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="src_path ref_path report_path [report_name]",
+        help="the report format is chosen by extension (.yml, .json, .msgpack); "
+        "without all three paths the container paths are used",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of parallel workers (0 uses all cores)",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=list(EXECUTORS),
+        default=None,
+        help="how checks are executed (default: serial for one job, process otherwise)",
+    )
+    parser.add_argument(
+        "--csv-key",
+        default=None,
+        help="column used to align rows of csv files (default: row position)",
+    )
+    parser.add_argument(
+        "--csv-tolerance",
+        type=float,
+        default=None,
+        help="absolute tolerance for numeric csv values",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        help="uncompressed mha / nrrd images larger than this (both files, in GB) "
+        "are compared slab by slab within this memory (default: 2, 0 disables)",
+    )
+    parser.add_argument(
+        "--full-checks",
+        action="store_true",
+        help="run all checks, also on byte-identical files",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="directory to cache decoded reference files in between runs",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=10.0,
+        help="maximum size of the reference cache in GB (default: 10)",
+    )
+    parser.add_argument(
+        "--cache-hash",
+        action="store_true",
+        help="include the content hash of reference files in the cache key",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=None,
+        metavar="GLOB",
+        help="only compare files matching this pattern (path or name, repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=None,
+        metavar="GLOB",
+        help="skip files and directories matching this pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--streaming-scan",
+        action="store_true",
+        help="start checking files while the trees are still being scanned",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="manifest file of the previous run, only changed files are checked "
+        "again (created if missing)",
+    )
+    parser.add_argument(
+        "--stream",
+        default=None,
+        help="write check results to this JSON Lines file as they are produced "
+        "instead of keeping them in memory",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="add wall time, cpu time, peak memory growth and bytes read of each "
+        "check to the report, and a summary per checker",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="write a timeline of the run (scan, checks, export) to this Chrome "
+        "trace / Perfetto JSON file",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="list the checks that would run on each file and exit",
+    )
+    args = parser.parse_args()
+
     # use arg1, arg2 and arg3 for src, ref and report path
-    if len(sys.argv) >= 4:
-        src_path = sys.argv[1]
-        ref_path = sys.argv[2]
-        report_path = sys.argv[3]
-        report_name = sys.argv[4] if len(sys.argv) > 4 else None
+    if len(args.paths) >= 3:
+        src_path = args.paths[0]
+        ref_path = args.paths[1]
+        report_path = args.paths[2]
+        report_name = args.paths[3] if len(args.paths) > 3 else None
     else:
         src_path = "/app/test/src"
         ref_path = "/app/test/ref"
         report_path = "/app/output/report.yml"
         report_name = None
 
+    # collect check options
+    options: Dict[str, Dict[str, Any]] = {"DataFileCheck": {}}
+    if args.csv_key is not None:
+        options["DataFileCheck"]["csv_key"] = args.csv_key
+    if args.csv_tolerance is not None:
+        options["DataFileCheck"]["csv_tolerances"] = {"*": args.csv_tolerance}
+    if args.memory_budget is not None:
+        options["ImageFileCheck"] = {"memory_budget": int(args.memory_budget * 2**30)}
+
+    # list checks per file only
+    if args.explain:
+        for path, checks in explain(
+            src_path, ref_path, options, args.include, args.exclude
+        ):
+            print(f"{path}: {', '.join(checks) or '-'}")
+        return
+
     # print paths
     print("RUNNING MEDCMP ON")
     print("src_path:", src_path)
@@ -61,21 +280,75 @@ def main():
     print("report_path:", report_path)
     print("report_name:", report_name)
 
-    # create report
-    report = Report(report_name)
+    # create reference cache
+    cache = None
+    if args.cache is not None:
+        cache = ReferenceCache(
+            args.cache, int(args.cache_size * 2**30), content_hash=args.cache_hash
+        )
+
+    # load results of the previous run
+    manifest = None
+    if args.manifest is not None:
+        config = {
+            "checks": [check.name for check in CHECKS],
+            "options": options,
+            "precheck": not args.full_checks,
+        }
+        manifest = Manifest.load(args.manifest, config)
+
+    # create report, streamed reports do not keep checks in memory
+    report = Report(report_name, retain=args.stream is None, profile=args.profile)
+    stream = ReportStream(report, args.stream) if args.stream is not None else None
+
+    # record checks on the timeline
+    tracer = Tracer() if args.trace is not None else None
+    if tracer is not None:
+        report.sinks.append(tracer)
 
     # print
     print("report_id:", report.id)
     print("------------------")
 
-    # compare
-    compare(src_path, ref_path, report=report)
+    with tracing(tracer):
+        # compare
+        try:
+            compare(
+                src_path,
+                ref_path,
+                report=report,
+                jobs=args.jobs,
+                executor=args.executor,
+                options=options,
+                precheck=not args.full_checks,
+                cache=cache,
+                manifest=manifest,
+                include=args.include,
+                exclude=args.exclude,
+                streaming_scan=args.streaming_scan,
+            )
+        finally:
+            if stream is not None:
+                stream.close()
+
+        # store results for the next run
+        if manifest is not None:
+            with span("save manifest"):
+                manifest.save(args.manifest)
+
+        # print report
+        ReportConsolePrint(report).print()
 
-    # print report
-    ReportConsolePrint(report).print()
+        # export report
+        with span("export report"):
+            if args.stream is not None:
+                finalize_stream(args.stream, report_path)
+            else:
+                report_export(report, report_path).export(report_path)
 
-    # export report
-    ReportYamlExport(report).export(report_path)
+    # write timeline
+    if tracer is not None:
+        tracer.export(args.trace)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+import os
+import json
+import uuid
+
+from medcmp import __version__
+from medcmp.Report import ReportCheck, ReportYamlExport, plain_value, read_check
+from medcmp.scan import file_digest
+
+from typing import Any, Dict, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+
+def file_state(
+    path: str, size: Optional[int] = None, mtime: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Size and modification time (ns) of a file, stat'ed only if not known.
+    """
+
+    if size is None or mtime is None:
+        st = os.stat(path)
+        size, mtime = st.st_size, st.st_mtime_ns
+
+    return {"size": size, "mtime": mtime}
+
+
+class Manifest:
+    """
+    Record of a previous comparison: the state (size, modification time and
+    content hash) of each compared source and reference file, and the results of
+    their checks.
+
+    A file pair is unchanged if both files have the same size and modification
+    time as recorded, or the same size and content hash. Check results of
+    unchanged pairs are reused instead of running the checks again. Content
+    hashes are compared by the check worker (see run_checks), which hashes the
+    files anyway. Recorded results are only valid for the same medcmp version and
+    check configuration, and results of failed checks are not recorded.
+    """
+
+    def __init__(self, config: Any = None, content_hash: bool = True):
+        # normalized the way it is stored (e.g., tuples become lists)
+        self.config = json.loads(json.dumps(config, default=plain_value))
+        self.content_hash = content_hash
+
+        # previous run
+        self.previous: Dict[str, Dict[str, Any]] = {}
+
+        # current run
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str, config: Any = None, content_hash: bool = True):
+        """
+        Load the manifest of a previous run. Without a manifest file (or for a
+        different manifest or medcmp version or check configuration), nothing is
+        reused.
+        """
+
+        manifest = cls(config, content_hash)
+
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        if (
+            data.get("version") == MANIFEST_VERSION
+            and data.get("medcmp") == __version__
+            and data.get("config") == manifest.config
+        ):
+            manifest.previous = data["files"]
+
+        return manifest
+
+    def save(self, path: str):
+        data = {
+            "version": MANIFEST_VERSION,
+            "medcmp": __version__,
+            "config": self.config,
+            "files": self.files,
+        }
+
+        # write atomically, so an interrupted run keeps the previous manifest
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, default=plain_value)
+        os.replace(tmp_path, path)
+
+    def states(
+        self,
+        src_path: str,
+        ref_path: str,
+        src_size: Optional[int] = None,
+        ref_size: Optional[int] = None,
+        src_mtime: Optional[int] = None,
+        ref_mtime: Optional[int] = None,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+        """
+        Return the recorded entry of a file pair and the current states of both
+        files, if the pair was recorded and neither file changed its size.
+        """
+
+        recorded = self.previous.get(src_path)
+        if recorded is None or recorded["ref_path"] != ref_path:
+            return None
+
+        try:
+            src = file_state(src_path, src_size, src_mtime)
+            ref = file_state(ref_path, ref_size, ref_mtime)
+        except OSError:
+            return None
+
+        if src["size"] != recorded["src"]["size"]:
+            return None
+        if ref["size"] != recorded["ref"]["size"]:
+            return None
+
+        return recorded, src, ref
+
+    def lookup(self, *pair: Any) -> Optional[List[ReportCheck]]:
+        """
+        Return the recorded check results of a file pair (src_path, ref_path and
+        optionally their sizes and modification times) if neither file changed
+        since the previous run, None otherwise.
+        """
+
+        states = self.states(*pair)
+        if states is None:
+            return None
+
+        recorded, src, ref = states
+        if src["mtime"] != recorded["src"]["mtime"]:
+            return None
+        if ref["mtime"] != recorded["ref"]["mtime"]:
+            return None
+
+        # keep the pair for the next run
+        self.files[pair[0]] = {
+            **recorded,
+            "src": {"hash": recorded["src"].get("hash"), **src},
+            "ref": {"hash": recorded["ref"].get("hash"), **ref},
+        }
+
+        return [read_check(pair[0], item) for item in recorded["checks"]]
+
+    def lookup_content(self, *pair: Any) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded entry of a file pair that was touched but kept its
+        size, if content hashes were recorded. Its results still apply if both
+        files have the recorded hashes.
+        """
+
+        states = self.states(*pair)
+        if states is None or not self.content_hash:
+            return None
+
+        recorded = states[0]
+        if recorded["src"].get("hash") is None or recorded["ref"].get("hash") is None:
+            return None
+
+        return recorded
+
+    def record(
+        self,
+        entries: List[ReportCheck],
+        src_path: str,
+        ref_path: str,
+        src_size: Optional[int] = None,
+        ref_size: Optional[int] = None,
+        src_mtime: Optional[int] = None,
+        ref_mtime: Optional[int] = None,
+    ):
+        """
+        Record the state of a file pair and the results of its checks. Pairs with
+        a failed check are checked again in the next run.
+        """
+
+        if any(f.label == "Exception" for entry in entries for f in entry.findings):
+            return
+
+        try:
+            src = file_state(src_path, src_size, src_mtime)
+            ref = file_state(ref_path, ref_size, ref_mtime)
+            if self.content_hash:
+                # digests are usually computed by the check worker already
+                meta = entries[0].meta if len(entries) > 0 else {}
+                src["hash"] = meta.get("src_digest") or file_digest(src_path)
+                ref["hash"] = meta.get("ref_digest") or file_digest(ref_path)
+        except OSError:
+            return
+
+        self.files[src_path] = {
+            "ref_path": ref_path,
+            "src": src,
+            "ref": ref,
+            "checks": [ReportYamlExport.check_item(entry) for entry in entries],
+        }
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from medcmp.Report import ReportCheck
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore
+
+# per-thread I/O counters (Linux)
+THREAD_IO_PATH = "/proc/thread-self/io"
+
+# resource usage of a check that is exported with it (not its start and thread)
+PROFILE_KEYS = ("wall_time", "cpu_time", "rss_peak_delta", "bytes_read")
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Peak resident set size of the process so far, in bytes.
+    """
+
+    if resource is None:
+        return None
+
+    # kilobytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def bytes_read() -> Optional[int]:
+    """
+    Number of bytes read by the calling thread so far (all read calls, also
+    served from the page cache).
+    """
+
+    # read without a file object, this runs twice per check
+    try:
+        fd = os.open(THREAD_IO_PATH, os.O_RDONLY)
+        try:
+            content = os.read(fd, 4096)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+
+    for line in content.splitlines():
+        if line.startswith(b"rchar:"):
+            return int(line.split()[1])
+    return None
+
+
+class ResourceUsage:
+    """
+    Measures wall time, CPU time (of the calling thread), the growth of the peak
+    RSS of the process and the bytes read by the calling thread from creation
+    until stop is called.
+
+    RSS is measured for the whole process: with checks running on threads, the
+    peak may also grow because of another check.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.rss = peak_rss()
+        self.read = bytes_read()
+
+    def stop(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+
+        rss = peak_rss()
+        read = bytes_read()
+
+        return {
+            "started": self.started,
+            "wall_time": wall,
+            "cpu_time": cpu,
+            "rss_peak_delta": (
+                rss - self.rss if rss is not None and self.rss is not None else None
+            ),
+            "bytes_read": (
+                read - self.read if read is not None and self.read is not None else None
+            ),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+
+
+class Tracer:
+    """
+    Collects a timeline of a run in the Chrome trace event format (viewable in
+    chrome://tracing or Perfetto): spans of the main steps (scanning, waiting for
+    results, export, ...) and one span per check, on the process and thread it ran
+    on. Checks are added as a report sink, from the resource usage in their meta
+    data.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    def event(
+        self, name: str, category: str, started: float, duration: float, **args: Any
+    ):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": started * 1e6,
+            "dur": duration * 1e6,
+            "pid": args.pop("pid", os.getpid()),
+            "tid": args.pop("tid", threading.get_ident()),
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.event(name, "run", started, time.perf_counter() - start, **args)
+
+    def add_missing(self, path: str):
+        pass
+
+    def add_extra(self, path: str):
+        pass
+
+    def add(self, entry: "ReportCheck"):
+        meta = entry.meta
+        if "started" not in meta:
+            # results reused from a previous run
+            return
+
+        self.event(
+            entry.checker,
+            "check",
+            meta["started"],
+            meta["wall_time"],
+            pid=meta["pid"],
+            tid=meta["tid"],
+            path=entry.path,
+            cpu_time=meta["cpu_time"],
+            bytes_read=meta["bytes_read"],
+        )
+
+    def export(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+# tracer of the current run, if any
+_tracer: Optional[Tracer] = None
+
+
+@contextmanager
+def tracing(tracer: Optional[Tracer]) -> Iterator[Optional[Tracer]]:
+    """
+    Make a tracer the tracer of the current run, spans are recorded with it.
+    """
+
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+
+
+def current_tracer() -> Optional[Tracer]:
+    """
+    The tracer of the current run, None if not tracing.
+    """
+
+    return _tracer
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """
+    Record a span with the tracer of the current run (if tracing).
+    """
+
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+
+    with tracer.span(name, **args):
+        yield
@@ -1,9 +1,24 @@
 import os
+import queue
+import fnmatch
+import threading
 import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from medcmp.Report import Report
 
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # type: ignore
+
+# read size for streaming file hashes
+HASH_CHUNK_SIZE = 1 << 20
+
+# number of threads listing directories of one tree in parallel
+SCAN_JOBS = 8
 
 
 class FileType(Enum):
@@ -13,16 +28,37 @@ class FileType(Enum):
 
 
 class Item:
-    base: Optional[str] = None
-    path: Optional[str] = None
-    name: Optional[str] = None
-    size: Optional[int] = None
-    type: Optional[FileType] = None
+    # one per scanned file, slots keep large trees small
+    __slots__ = ("_relpath", "base", "mtime", "name", "path", "size", "type")
+
+    def __init__(
+        self,
+        base: Optional[str] = None,
+        path: Optional[str] = None,
+        name: Optional[str] = None,
+        size: Optional[int] = None,
+        mtime: Optional[int] = None,
+        type: Optional[FileType] = None,
+    ):
+        self.base = base
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime  # modification time in ns
+        self.type = type
+        self._relpath: Optional[str] = None
 
     @property
     def relpath(self) -> str:
-        assert self.path is not None
-        return os.path.relpath(self.path, self.base)
+        # computed once, unless set by the scanner
+        if self._relpath is None:
+            assert self.path is not None
+            self._relpath = os.path.relpath(self.path, self.base)
+        return self._relpath
+
+    @relpath.setter
+    def relpath(self, relpath: str):
+        self._relpath = relpath
 
     @property
     def hash(self) -> str:
@@ -30,32 +66,184 @@ class Item:
         return hashlib.md5(hstr.encode()).hexdigest()
 
 
-def scan_tree(base: str):
+def file_digest(
+    path: str, chunk_size: int = HASH_CHUNK_SIZE, content: Optional[bytes] = None
+) -> str:
     """
-    Scan a directory into a list of files and extract file metadata.
+    Hash the content of a file in chunks. Uses xxhash if it is installed and
+    blake2b otherwise. If the content is already in memory, it is hashed directly.
     """
 
-    # collect a list of file items
-    items = {}
+    h = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+
+    if content is not None:
+        h.update(content)
+        return h.hexdigest()
+
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def identical_content(
+    src_path: str,
+    ref_path: str,
+    src_size: Optional[int] = None,
+    ref_size: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Return the content digest if both files are byte-identical and None otherwise.
+    Files of different size are never hashed.
+    """
+
+    # compare sizes first
+    if src_size is None:
+        src_size = os.path.getsize(src_path)
+    if ref_size is None:
+        ref_size = os.path.getsize(ref_path)
+    if src_size != ref_size:
+        return None
+
+    # compare content
+    src_digest = file_digest(src_path)
+    if src_digest != file_digest(ref_path):
+        return None
+
+    return src_digest
+
+
+def matches(relpath: str, name: str, patterns: Sequence[str]) -> bool:
+    """
+    Check a path against glob patterns. Patterns match the path relative to the
+    scanned directory (using "/" as separator) or the file / directory name.
+    """
+
+    relpath = relpath.replace(os.sep, "/")
+    return any(
+        fnmatch.fnmatchcase(relpath, p) or fnmatch.fnmatchcase(name, p)
+        for p in patterns
+    )
+
+
+def scan_dir(
+    base: str,
+    path: str,
+    relpath: str,
+    include: Optional[Sequence[str]],
+    exclude: Optional[Sequence[str]],
+    submit,
+) -> Tuple[List[Item], List[Future]]:
+    """
+    List one directory. Returns the items of its files and the futures of its
+    subdirectories (submitted in listing order).
+    """
+
+    items = []
+    subdirs = []
+
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        # unreadable directories are skipped (like os.walk does)
+        return items, subdirs
+
+    for entry in entries:
+        entry_relpath = os.path.join(relpath, entry.name) if relpath else entry.name
+
+        # skip excluded files and directories (without walking them)
+        if exclude and matches(entry_relpath, entry.name, exclude):
+            continue
+
+        # descend into directories (but not symlinks to directories)
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            if not entry.is_symlink():
+                subdirs.append(
+                    submit(base, entry.path, entry_relpath, include, exclude, submit)
+                )
+            continue
+
+        if include and not matches(entry_relpath, entry.name, include):
+            continue
+
+        # reuse the stat data of the directory entry
+        st = entry.stat()
 
-    # recursively iterate folder under path
-    for root, _, files in os.walk(base):
-        for name in files:
-            # get full path
-            path = os.path.join(root, name)
+        # create a new item
+        item = Item()
+        item.base = base
+        item.path = entry.path
+        item.name = entry.name
+        item.size = st.st_size
+        item.mtime = st.st_mtime_ns
+        item.relpath = entry_relpath
 
-            # get file size
-            size = os.path.getsize(path)
+        items.append(item)
 
-            # create a new item
-            item = Item()
-            item.base = base
-            item.path = path
-            item.name = name
-            item.size = size
+    return items, subdirs
 
-            # add to list
-            items[item.relpath] = item
+
+def iter_tree(
+    base: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    jobs: int = SCAN_JOBS,
+) -> Iterator[Item]:
+    """
+    Iterate over the files of a directory while it is scanned (see scan_tree).
+    """
+
+    def run_inline(*args) -> Future:
+        future: Future = Future()
+        future.set_result(scan_dir(*args))
+        return future
+
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    def submit(*args) -> Future:
+        if pool is None:
+            return run_inline(*args)
+        return pool.submit(scan_dir, *args)
+
+    # assemble directories depth-first, in listing order
+    try:
+        stack = [submit(base, base, "", include, exclude, submit)]
+        while stack:
+            files, subdirs = stack.pop().result()
+            yield from files
+            stack.extend(reversed(subdirs))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def scan_tree(
+    base: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    jobs: int = SCAN_JOBS,
+) -> Dict[str, Item]:
+    """
+    Scan a directory into a list of files and extract file metadata.
+
+    Directories are listed in parallel, files are returned in the order os.walk
+    would yield them. With include patterns, only matching files are listed.
+    Files and directories matching an exclude pattern are skipped.
+    """
+
+    # collect a list of file items
+    items = {}
+    for item in iter_tree(base, include, exclude, jobs):
+        items[item.relpath] = item
 
     # return results
     return items
@@ -66,9 +254,27 @@ def compare_tree_structures(src: str, ref: str, report: Report):
     Compare two directories.
     """
 
-    # scan directories
-    src_items = scan_tree(src)
-    ref_items = scan_tree(ref)
+    return [src_item.relpath for src_item, _ in match_tree_structures(src, ref, report)]
+
+
+def match_tree_structures(
+    src: str,
+    ref: str,
+    report: Report,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> List[Tuple[Item, Item]]:
+    """
+    Compare two directories and return the source and reference item of all
+    files present in both.
+    """
+
+    # scan both directories at the same time
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        src_scan = pool.submit(scan_tree, src, include, exclude)
+        ref_scan = pool.submit(scan_tree, ref, include, exclude)
+        src_items = src_scan.result()
+        ref_items = ref_scan.result()
 
     # collect items that are in src and ref and will be compared on a content level
     comparable_files = []
@@ -77,17 +283,101 @@ def compare_tree_structures(src: str, ref: str, report: Report):
     for relpath, src_item in src_items.items():
         # note extra files
         if relpath not in ref_items:
-            report.files_extra.append(relpath)
+            report.add_extra(relpath)
             continue
 
         # files are present in src and ref and can be noted for content check
-        comparable_files.append(relpath)
+        comparable_files.append((src_item, ref_items[relpath]))
 
     # check for extra files
     for relpath in ref_items:
         # note missing files
         if relpath not in src_items:
-            report.files_missing.append(relpath)
+            report.add_missing(relpath)
 
     # return report
     return comparable_files
+
+
+def stream_tree_structures(
+    src: str,
+    ref: str,
+    report: Report,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    queue_size: int = 1024,
+) -> Iterator[Tuple[int, Item, Item]]:
+    """
+    Compare two directories while they are scanned and yield the source and
+    reference item of each file present in both as soon as both scans found it,
+    together with the position of the source file in scan order.
+
+    Both trees are scanned in background threads feeding a bounded queue. Missing
+    and extra files are added to the report once both scans are done, in the same
+    order as by match_tree_structures.
+    """
+
+    items: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(message):
+        # wait for space in the queue, unless the consumer stopped
+        while not stop.is_set():
+            try:
+                items.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce(side: str, base: str):
+        try:
+            for item in iter_tree(base, include, exclude):
+                put((side, item))
+                if stop.is_set():
+                    return
+            put((side, None))
+        except Exception as e:
+            put((side, e))
+
+    threads = [
+        threading.Thread(target=produce, args=(side, base), daemon=True)
+        for side, base in [("src", src), ("ref", ref)]
+    ]
+    for thread in threads:
+        thread.start()
+
+    # unmatched items of each side, in scan order
+    pending: Dict[str, Dict[str, Tuple[int, Item]]] = {"src": {}, "ref": {}}
+    counts = {"src": 0, "ref": 0}
+    running = 2
+
+    try:
+        while running > 0:
+            side, item = items.get()
+
+            if item is None:
+                running -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+
+            index = counts[side]
+            counts[side] += 1
+
+            other = pending["ref" if side == "src" else "src"]
+            match = other.pop(item.relpath, None)
+
+            if match is None:
+                pending[side][item.relpath] = (index, item)
+            elif side == "src":
+                yield index, item, match[1]
+            else:
+                yield match[0], match[1], item
+    finally:
+        stop.set()
+
+    # files missing on one side
+    for relpath in pending["src"]:
+        report.add_extra(relpath)
+    for relpath in pending["ref"]:
+        report.add_missing(relpath)
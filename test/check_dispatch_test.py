@@ -0,0 +1,114 @@
+import unittest
+import os
+import shutil
+
+from medcmp.main import explain
+from medcmp.Report import Report
+from medcmp.checks.CheckRegistry import CHECKS, DispatchIndex, FilePatterns
+from medcmp.checks.FileCompare import FileCheck, FileCompare
+
+TEMP_DIR = "tmp"
+
+NAMES = [
+    "a.json",
+    "a.yml",
+    "a.yaml",
+    "table.csv",
+    "ct.nii.gz",
+    "ct.nii",
+    "ct.nrrd",
+    "ct.mha",
+    "mask.seg.dcm",
+    "slice.dcm",
+    "notes.txt",
+    "README",
+    ".json",
+    "a.json.bak",
+]
+
+
+class DicomCheck(FileCheck):
+    patterns = FilePatterns(suffixes=[".dcm"], magic=[(128, b"DICM")])
+
+    def check(self) -> bool:
+        return True
+
+
+class OddCheck(FileCheck):
+    patterns = FilePatterns(globs=["case_*"])
+
+    def can_check(self) -> bool:
+        return self.src_path.endswith("1")
+
+    def check(self) -> bool:
+        return True
+
+
+class CheckDispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            os.makedirs(os.path.join(self.base, tree), exist_ok=True)
+            for name in NAMES:
+                with open(os.path.join(self.base, tree, name), "w") as f:
+                    f.write("{}")
+
+            # dicom file without extension
+            with open(os.path.join(self.base, tree, "IM0001"), "wb") as f:
+                f.write(b"\0" * 128 + b"DICM")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def test_builtin_patterns(self):
+        # dispatch by index and by spec patterns agrees with the check classes
+        index = DispatchIndex([(spec.name, spec.patterns) for spec in CHECKS])
+        classes = [spec.load() for spec in CHECKS]
+        for spec, c in zip(CHECKS, classes):
+            self.assertIs(c.patterns, spec.patterns, spec.name)
+
+        for name in NAMES:
+            path = os.path.join(self.base, "src", name)
+            expected = [c.__name__ for c in classes if c(path, path).can_check()]
+            self.assertListEqual(index.lookup(path), expected, name)
+            self.assertListEqual(
+                [s.name for s in CHECKS if s.patterns.matches(path)], expected, name
+            )
+
+        self.assertListEqual(index.lookup("mask.seg.dcm"), ["DicomsegContentCheck"])
+        self.assertListEqual(index.lookup("ct.nii.gz"), ["ImageFileCheck"])
+        self.assertListEqual(index.lookup("a.json"), ["DataFileCheck", "SizeCheck"])
+
+    def test_magic_and_can_check(self):
+        compare = FileCompare(Report())
+        compare.register(DicomCheck)
+        compare.register(OddCheck)
+
+        def applicable(name):
+            path = os.path.join(self.base, "src", name)
+            return [c for c, _ in compare.applicable(path, path)]
+
+        self.assertListEqual(applicable("slice.dcm"), [DicomCheck])
+        self.assertListEqual(applicable("IM0001"), [DicomCheck])
+        self.assertListEqual(applicable("README"), [])
+
+        # globs select the candidates, can_check has the final say
+        self.assertListEqual(compare.dispatch("case_1"), [OddCheck])
+        self.assertListEqual(
+            [c for c, _ in compare.applicable("case_1", "case_1")], [OddCheck]
+        )
+        self.assertListEqual(compare.applicable("case_2", "case_2"), [])
+
+    def test_explain(self):
+        checks = {
+            os.path.basename(path): names
+            for path, names in explain(
+                os.path.join(self.base, "src"), os.path.join(self.base, "ref")
+            )
+        }
+
+        self.assertListEqual(checks["a.json"], ["DataFileCheck", "SizeCheck"])
+        self.assertListEqual(checks["ct.nrrd"], ["ImageFileCheck"])
+        self.assertListEqual(checks["slice.dcm"], [])
+        self.assertListEqual(checks["IM0001"], ["SizeCheck"])
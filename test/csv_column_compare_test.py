@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import pandas as pd
+
+from medcmp.checks.DataFileCheck import DataFileCheck
+
+TEMP_DIR = "tmp"
+
+
+class CsvColumnCompareTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        self.src_path = os.path.join(self.base, "src.csv")
+        self.ref_path = os.path.join(self.base, "ref.csv")
+
+        # source rows are shuffled, one row is missing and one is extra
+        pd.DataFrame(
+            {
+                "id": ["c", "a", "b", "x"],
+                "volume": [3.0, 1.0, 2.0005, 9.0],
+                "label": ["liver", "spleen", "kidney", "lung"],
+            }
+        ).to_csv(self.src_path, index=False)
+        pd.DataFrame(
+            {
+                "id": ["a", "b", "c", "d"],
+                "volume": [1.0, 2.0, 3.5, 4.0],
+                "label": ["spleen", "kidney", "liver", "heart"],
+            }
+        ).to_csv(self.ref_path, index=False)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def findings(self, **options) -> dict:
+        entry = DataFileCheck(self.src_path, self.ref_path, **options).run()
+        assert entry is not None
+        return {(f.label, f.subpath): f.info for f in entry.findings}
+
+    def test_key_alignment(self):
+        findings = self.findings(csv_key="id", csv_tolerances={"volume": 0.001})
+
+        self.assertDictEqual(
+            findings[("Missing rows", "")], {"count": 1, "rows": ["d"]}
+        )
+        self.assertDictEqual(findings[("Extra rows", "")], {"count": 1, "rows": ["x"]})
+
+        # 2.0005 is within tolerance, 3.0 is not
+        mismatch = findings[("Value mismatch", "volume")]
+        self.assertEqual(mismatch["count"], 1)
+        self.assertListEqual(mismatch["rows"], ["c"])
+        self.assertEqual(mismatch["worst"][0]["diff"], -0.5)
+
+        self.assertNotIn(("Value mismatch", "label"), findings)
+
+    def test_position_alignment(self):
+        findings = self.findings()
+
+        self.assertNotIn(("Missing rows", ""), findings)
+        self.assertEqual(findings[("Value mismatch", "id")]["count"], 4)
+        self.assertEqual(findings[("Value mismatch", "volume")]["count"], 4)
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            DataFileCheck(self.src_path, self.ref_path, csv_keys="id")
+
+    def test_special_values(self):
+        text = "a,b,c,d\n1,inf,NA,\n2,x,null,-inf\n3,-inf,,nan\n"
+        for path in [self.src_path, self.ref_path]:
+            with open(path, "w") as f:
+                f.write(text)
+
+        # infinities, missing value markers and empty cells match themselves
+        self.assertDictEqual(self.findings(), {})
+
+        # missing value markers are compared as written
+        with open(self.src_path, "w") as f:
+            f.write(text.replace("NA", "null").replace("-inf\n3", "inf\n3"))
+        findings = self.findings()
+        self.assertListEqual(findings[("Value mismatch", "c")]["rows"], [0])
+        self.assertListEqual(findings[("Value mismatch", "d")]["rows"], [1])
+        self.assertEqual(len(findings), 2)
@@ -0,0 +1,88 @@
+import unittest
+
+from medcmp.checks.DataFileCheck import (
+    ComparisonOutcome,
+    diff_data,
+    get_value,
+    parse_path,
+    scan_data_paths,
+)
+
+
+def outcomes(src, ref):
+    return [(item.path, item.outcome) for item in diff_data(src, ref)]
+
+
+class DataDiffTest(unittest.TestCase):
+    def test_identical(self):
+        data = {"a": 1, "b": {"c": [1.5, "x", True]}}
+        self.assertTrue(
+            all(o == ComparisonOutcome.VALUE_EXACT for _, o in outcomes(data, data))
+        )
+
+    def test_missing_and_extra_keys(self):
+        self.assertListEqual(
+            outcomes({"a": 1, "d": {"b": 2}}, {"c": 3, "a": 1, "d": {"x": 4, "b": 2}}),
+            [
+                ("a", ComparisonOutcome.VALUE_EXACT),
+                ("d.b", ComparisonOutcome.VALUE_EXACT),
+                ("c", ComparisonOutcome.MISSING),
+                ("d.x", ComparisonOutcome.MISSING),
+            ],
+        )
+
+    def test_list_length(self):
+        self.assertListEqual(
+            outcomes({"l": [1, 2, 3]}, {"l": [1, 2]}),
+            [
+                ("l.[0]", ComparisonOutcome.VALUE_EXACT),
+                ("l.[1]", ComparisonOutcome.VALUE_EXACT),
+                ("l.[2]", ComparisonOutcome.EXTRA),
+            ],
+        )
+
+    def test_type_mismatch(self):
+        self.assertListEqual(
+            outcomes({"a": 1}, {"a": "1"}), [("a", ComparisonOutcome.TYPE_MISMATCH)]
+        )
+
+    def test_structure_mismatch(self):
+        self.assertListEqual(
+            outcomes({"a": 1, "b": {"c": 2}}, {"a": {"x": 1}, "b": 3}),
+            [
+                ("a", ComparisonOutcome.EXTRA),
+                ("b.c", ComparisonOutcome.EXTRA),
+                ("a.x", ComparisonOutcome.MISSING),
+                ("b", ComparisonOutcome.MISSING),
+            ],
+        )
+
+    def test_dotted_keys(self):
+        data = {"a.b": {"c": 1}, "a": {"b": {"c": 2}}, "[0]": [{'k"': 3}]}
+        self.assertListEqual(
+            outcomes(data, data),
+            [
+                ('"a.b".c', ComparisonOutcome.VALUE_EXACT),
+                ("a.b.c", ComparisonOutcome.VALUE_EXACT),
+                ('"[0]".[0]."k\\""', ComparisonOutcome.VALUE_EXACT),
+            ],
+        )
+
+        # paths resolve to their values again
+        paths = scan_data_paths(data)
+        self.assertListEqual(paths, [path for path, _ in outcomes(data, data)])
+        self.assertListEqual([get_value(data, path) for path in paths], [1, 2, 3])
+        self.assertTupleEqual(parse_path('"[0]".[0]."k\\""'), ("[0]", 0, 'k"'))
+
+    def test_deep_document(self):
+        data = value = {}
+        for i in range(300):
+            value["k"] = {}
+            value = value["k"]
+        value["x"] = [1]
+
+        path = ".".join(["k"] * 300) + ".x.[0]"
+        self.assertListEqual(
+            outcomes(data, data), [(path, ComparisonOutcome.VALUE_EXACT)]
+        )
+        self.assertListEqual(scan_data_paths(data), [path])
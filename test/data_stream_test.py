@@ -0,0 +1,230 @@
+import unittest
+import io
+import os
+import json
+import yaml
+import shutil
+from types import SimpleNamespace
+from unittest import mock
+
+from medcmp.checks.DataFileCheck import DataFileCheck, diff_data, get_data
+from medcmp.checks import DataStream
+from medcmp.checks.DataStream import (
+    StreamFallback,
+    json_events,
+    stream_diff_data,
+    yaml_events,
+)
+
+TEMP_DIR = "tmp"
+
+
+def build(events):
+    # rebuild a document from its parse events
+    stack, key, root = [], None, None
+    for kind, value in events:
+        if kind == "map_key":
+            key = value
+            continue
+        if kind in ("end_map", "end_array"):
+            value = stack.pop()
+        elif kind in ("start_map", "start_array"):
+            value = {} if kind == "start_map" else []
+        if len(stack) == 0:
+            root = value
+        elif kind not in ("end_map", "end_array"):
+            if isinstance(stack[-1], dict):
+                stack[-1][key] = value
+            else:
+                stack[-1].append(value)
+        if kind in ("start_map", "start_array"):
+            stack.append(value)
+    return root
+
+
+def result(items):
+    return [(item.path, item.outcome, item.info) for item in items]
+
+
+class DataStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        self.ref = {
+            "meta": {"model": "m", "version": 2, "tags": ["a", "b"]},
+            "cases": [
+                {"id": i, "volume": 10.5 * i, "center": [1, 2.5, -3e-5], "ok": None}
+                for i in range(50)
+            ],
+            "text": 'quote " and \\ and é',
+            "empty": {"list": [], "map": {}},
+        }
+        self.src = json.loads(json.dumps(self.ref))
+        self.src["meta"]["version"] = "2"
+        self.src["meta"]["tags"].append("c")
+        self.src["cases"][3]["volume"] *= 1.001
+        self.src["cases"][4]["center"] = {"x": 1}
+        del self.src["cases"][5]["ok"]
+        self.src["cases"] = self.src["cases"][:40]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def write(self, name, data):
+        path = os.path.join(self.base, name)
+        with open(path, "w") as f:
+            if name.endswith(".json"):
+                json.dump(data, f, indent=1)
+            else:
+                yaml.dump(data, f, sort_keys=False)
+        return path
+
+    def test_json_events(self):
+        text = json.dumps(self.ref)
+        for chunk_size in [1, 7, 1 << 20]:
+            events = json_events(io.StringIO(text), chunk_size)
+            self.assertEqual(build(events), self.ref)
+
+        # numbers are of the same type as json.load parses them
+        values = build(
+            json_events(io.StringIO("[1, 1.0, -0, 1e3, 12345678901234567890]"))
+        )
+        self.assertListEqual(
+            values, json.loads("[1, 1.0, -0, 1e3, 12345678901234567890]")
+        )
+        self.assertListEqual([type(v) for v in values], [int, float, int, float, int])
+
+        for invalid in ['{"a" 1}', "[1,]", "[1", '{"a": 1}}', "[1] 2", "{,}"]:
+            with self.assertRaises(ValueError):
+                list(json_events(io.StringIO(invalid)))
+
+    def test_yaml_events(self):
+        text = yaml.dump(self.ref)
+        self.assertEqual(
+            build(yaml_events(io.StringIO(text))), yaml.load(text, yaml.FullLoader)
+        )
+
+        for fallback in ["a: &x 1\nb: *x\n", "? [1, 2]\n: 3\n", "a: 1\n---\nb: 2\n"]:
+            with self.assertRaises(StreamFallback):
+                list(yaml_events(io.StringIO(fallback)))
+
+    def test_same_items_as_diff_data(self):
+        for ext in ["json", "yml"]:
+            src_path = self.write(f"src.{ext}", self.src)
+            ref_path = self.write(f"ref.{ext}", self.ref)
+
+            self.assertListEqual(
+                result(stream_diff_data(src_path, ref_path, batch_size=16)),
+                result(diff_data(self.src, self.ref)),
+            )
+
+        # roots of a different kind
+        src_path = self.write("list.json", [1, 2])
+        self.assertListEqual(
+            result(stream_diff_data(src_path, ref_path)),
+            result(diff_data([1, 2], self.ref)),
+        )
+
+    def test_key_order(self):
+        src = {"text": self.ref["text"], **self.ref}
+        with self.assertRaises(StreamFallback):
+            list(
+                stream_diff_data(
+                    self.write("src.json", src), self.write("ref.json", self.ref)
+                )
+            )
+
+    def test_check(self):
+        src_path = self.write("src.json", self.src)
+        ref_path = self.write("ref.json", self.ref)
+        full = DataFileCheck(src_path, ref_path, stream_threshold=0).run()
+        streamed = DataFileCheck(src_path, ref_path, stream_threshold=1).run()
+        assert full is not None and streamed is not None
+
+        notes = [(n.label, n.info) for n in streamed.notes]
+        self.assertEqual(notes.pop()[0], "Streamed Comparison")
+        self.assertListEqual(notes, [(n.label, n.info) for n in full.notes])
+        self.assertListEqual(
+            [(f.label, f.subpath, f.info) for f in streamed.findings],
+            [(f.label, f.subpath, f.info) for f in full.findings],
+        )
+
+        # keys in a different order are compared after loading both files
+        src_path = self.write("src.json", {"text": self.ref["text"], **self.ref})
+        entry = DataFileCheck(src_path, ref_path, stream_threshold=1).run()
+        assert entry is not None
+        self.assertListEqual(entry.findings, [])
+        self.assertListEqual([n.label for n in entry.notes], ["Value Match"])
+
+    def test_yaml_loader(self):
+        text = (
+            "int: 1\nfloat: 1.0\nexp: 1e3\nsigned: -2.5e-3\nhex: 0x1f\nnan: .nan\n"
+            "bool: yes\nnull: ~\ndate: 2024-01-02\nstring: '1'\nlist: [1, 2.0]\n"
+        )
+        path = os.path.join(self.base, "data.yml")
+        with open(path, "w") as f:
+            f.write(text)
+
+        # same values of the same types as yaml.FullLoader loads
+        expected = yaml.load(text, Loader=yaml.FullLoader)
+        for data in [get_data(path), get_data(path, text.encode())]:
+            self.assertEqual(repr(data), repr(expected))
+
+        # python tags are loaded as before
+        with open(path, "w") as f:
+            f.write("center: !!python/tuple [1, 2]\n")
+        for data in [get_data(path), get_data(path, b"center: !!python/tuple [1, 2]")]:
+            self.assertEqual(data, {"center": (1, 2)})
+
+    def test_yaml_threshold(self):
+        for ext in ["json", "yml"]:
+            src_path = self.write(f"src.{ext}", self.src)
+            ref_path = self.write(f"ref.{ext}", self.ref)
+            size = os.path.getsize(ref_path)
+
+            # yml files are streamed from their own threshold on
+            entry = DataFileCheck(
+                src_path, ref_path, stream_threshold=0, yaml_stream_threshold=size - 1
+            ).run()
+            assert entry is not None
+            self.assertEqual(
+                entry.notes[-1].label == "Streamed Comparison", ext == "yml"
+            )
+
+    def check_nan(self):
+        # json.dump writes NaN, which json.load reads but ijson rejects (the
+        # reference holds a string, so that the values are not compared as numbers)
+        src = {**self.src, "nan": float("nan")}
+        ref = {**self.ref, "nan": "nan"}
+        src_path = self.write("src.json", src)
+        ref_path = self.write("ref.json", ref)
+
+        full = DataFileCheck(src_path, ref_path, stream_threshold=0).run()
+        streamed = DataFileCheck(src_path, ref_path, stream_threshold=1).run()
+        assert full is not None and streamed is not None
+        self.assertListEqual(
+            [(f.label, f.subpath, f.info) for f in streamed.findings],
+            [(f.label, f.subpath, f.info) for f in full.findings],
+        )
+        self.assertNotIn("Exception", [f.label for f in streamed.findings])
+        return streamed
+
+    @unittest.skipIf(DataStream.ijson is None, "ijson is not installed")
+    def test_ijson_fallback(self):
+        # compared after loading both files
+        streamed = self.check_nan()
+        self.assertNotIn("Streamed Comparison", [n.label for n in streamed.notes])
+
+    def test_ijson_errors(self):
+        class JSONError(Exception):
+            pass
+
+        def basic_parse(f, use_float):
+            yield "start_map", None
+            raise JSONError("Unexpected symbol 'N'")
+
+        ijson = SimpleNamespace(JSONError=JSONError, basic_parse=basic_parse)
+        with mock.patch.object(DataStream, "ijson", ijson):
+            streamed = self.check_nan()
+        self.assertNotIn("Streamed Comparison", [n.label for n in streamed.notes])
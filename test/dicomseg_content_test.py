@@ -0,0 +1,212 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pydicom
+import pydicom_seg
+import SimpleITK as sitk
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+from medcmp.checks.DicomsegContentCheck import (
+    DicomsegContentCheck,
+    decode_segmentation,
+    decode_segments,
+    segment_mask,
+    segment_overlap,
+)
+
+TEMP_DIR = "tmp"
+
+
+def ct_series(shape):
+    """
+    Create the datasets of an empty CT series the segmentations refer to.
+    """
+
+    study_uid, series_uid, for_uid = generate_uid(), generate_uid(), generate_uid()
+
+    datasets = []
+    for k in range(shape[0]):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = FileDataset(None, {}, file_meta=meta, preamble=b"\0" * 128)
+        ds.SOPClassUID = meta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.FrameOfReferenceUID = for_uid
+        ds.Modality = "CT"
+        ds.PatientID = "P"
+        ds.PatientName = "Test"
+        ds.StudyID = "1"
+        ds.SeriesNumber = 1
+        ds.InstanceNumber = k + 1
+        ds.ImagePositionPatient = [0.0, 0.0, float(k)]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = [1.0, 1.0]
+        ds.SliceThickness = 1.0
+        ds.Rows, ds.Columns = shape[1], shape[2]
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.BitsAllocated = ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 1
+        ds.PixelData = np.zeros(shape[1:], np.int16).tobytes()
+        datasets.append(ds)
+
+    return datasets
+
+
+def write_seg(path, labelmap, names, source):
+    code = {"CodeValue": "1", "CodingSchemeDesignator": "99T", "CodeMeaning": "x"}
+    segments = [
+        {
+            "labelID": number,
+            "SegmentLabel": name,
+            "SegmentDescription": name,
+            "SegmentAlgorithmType": "AUTOMATIC",
+            "SegmentAlgorithmName": "test",
+            "SegmentedPropertyCategoryCodeSequence": code,
+            "SegmentedPropertyTypeCodeSequence": code,
+        }
+        for number, name in names
+    ]
+    template = pydicom_seg.template.from_dcmqi_metainfo(
+        {"SeriesDescription": "seg", "segmentAttributes": [segments]}
+    )
+
+    writer = pydicom_seg.MultiClassWriter(
+        template=template, inplane_cropping=False, skip_empty_slices=True
+    )
+    writer.write(sitk.GetImageFromArray(labelmap.astype(np.uint16)), source).save_as(
+        path
+    )
+
+
+class DicomsegContentTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        shape = (8, 16, 16)
+        self.source = ct_series(shape)
+        self.labelmap = np.zeros(shape, np.uint8)
+        self.labelmap[1:4, 2:6, 2:6] = 1
+        self.labelmap[4:7, 8:14, 8:14] = 2
+        self.labelmap[2:3, 10:15, 1:4] = 3
+        self.names = [(1, "liver"), (2, "spleen"), (3, "kidney")]
+
+        self.ref_path = os.path.join(self.base, "ref.seg.dcm")
+        write_seg(self.ref_path, self.labelmap, self.names, self.source)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def run_entry(self, labelmap, names):
+        src_path = os.path.join(self.base, "src.seg.dcm")
+        write_seg(src_path, labelmap, names, self.source)
+
+        entry = DicomsegContentCheck(src_path, self.ref_path, verbose=False).run()
+        assert entry is not None
+        return entry
+
+    def run_check(self, labelmap, names):
+        entry = self.run_entry(labelmap, names)
+        return {(f.label, f.subpath) for f in entry.findings}
+
+    def test_decode(self):
+        arrays, meta = decode_segmentation(self.ref_path)
+        seg = pydicom_seg.SegmentReader().read(pydicom.dcmread(self.ref_path))
+
+        self.assertEqual(meta["layout"], "labelmap")
+        self.assertListEqual(meta["labels"], ["liver", "spleen", "kidney"])
+        self.assertListEqual(meta["size"], list(seg.size))
+        for number in meta["numbers"]:
+            np.testing.assert_array_equal(
+                segment_mask(arrays, meta, number), seg.segment_data(number) > 0
+            )
+
+    def test_identical(self):
+        self.assertSetEqual(self.run_check(self.labelmap, self.names), set())
+
+    def test_match_by_label(self):
+        # same segments stored under different numbers
+        renumbered = np.choose(self.labelmap, [0, 3, 1, 2]).astype(np.uint8)
+        names = [(1, "spleen"), (2, "kidney"), (3, "liver")]
+        self.assertSetEqual(self.run_check(renumbered, names), set())
+
+    def test_segment_sets(self):
+        labelmap = self.labelmap.copy()
+        labelmap[labelmap == 3] = 4
+        labelmap[4:7, 8:14, 8:11] = 0
+        names = [(1, "liver"), (2, "spleen"), (4, "lung")]
+
+        self.assertSetEqual(
+            self.run_check(labelmap, names),
+            {
+                ("Missing Segment", "segment #3"),
+                ("Extra Segment", "segment #4"),
+                ("Dice Score Difference", "segment #2"),
+            },
+        )
+
+    def test_segment_metrics(self):
+        labelmap = self.labelmap.copy()
+        labelmap[4:7, 8:14, 8:11] = 0
+
+        # the same metrics as the per-label findings of image files
+        entry = self.run_entry(labelmap, self.names)
+        (finding,) = entry.findings
+        self.assertEqual(finding.subpath, "segment #2")
+        self.assertDictEqual(
+            finding.info,
+            {
+                "dice": 2 * 54 / (108 + 54),
+                "jaccard": 0.5,
+                "volume_diff": -54,
+                "ref_voxels": 108,
+                "src_voxels": 54,
+                "intersection": 54,
+                "threshold": 0.99,
+            },
+        )
+
+    def test_cropped_segments(self):
+        arrays, meta = decode_segmentation(self.ref_path)
+        numbers = meta["numbers"]
+
+        # one frame per segment and slice, as stored for overlapping segments
+        frames, frame_numbers, slices = [], [], []
+        for number in numbers:
+            for z, frame in enumerate(segment_mask(arrays, meta, number)):
+                frames.append(frame.astype(np.uint8))
+                frame_numbers.append(number)
+                slices.append(z)
+        segments, offsets = decode_segments(
+            np.stack(frames), frame_numbers, slices, numbers
+        )
+        cropped = (segments, {**meta, "layout": "segments", "offsets": offsets})
+
+        # each segment is held within its bounding box
+        self.assertEqual(segments["segment_1"].shape, (3, 4, 4))
+        self.assertListEqual(offsets, [[0, 2, 2], [3, 8, 8], [1, 10, 1]])
+        for number in numbers:
+            np.testing.assert_array_equal(
+                segment_mask(*cropped, number), segment_mask(arrays, meta, number)
+            )
+
+        pairs = [(1, 1), (2, 2), (3, 3)]
+        self.assertDictEqual(
+            segment_overlap(*cropped, arrays, meta, pairs),
+            segment_overlap(arrays, meta, arrays, meta, pairs),
+        )
+
+        # segments in different boxes are compared within the union of both
+        shifted = ({**segments}, {**cropped[1], "offsets": [[1, 2, 2], *offsets[1:]]})
+        overlap = segment_overlap(*shifted, *cropped, [(1, 1)])
+        self.assertEqual(overlap[1]["intersection"], 2 * 16)
+        self.assertEqual(overlap[1]["volume_diff"], 0)
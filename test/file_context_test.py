@@ -0,0 +1,73 @@
+import unittest
+import os
+import json
+import shutil
+import numpy as np
+import SimpleITK as sitk
+from unittest import mock
+
+from medcmp.checks.FileContext import FileContext
+from medcmp.checks.FileCompare import FilePair, run_checks
+from medcmp.checks.DataFileCheck import DataFileCheck
+from medcmp.checks.ImageFileCheck import ImageFileCheck
+from medcmp.checks.SizeCheck import SizeCheck
+
+TEMP_DIR = "tmp"
+
+
+class FileContextTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def write_json(self, name: str, data: dict) -> str:
+        path = os.path.join(self.base, name)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def write_image(self, name: str, array: np.ndarray) -> str:
+        path = os.path.join(self.base, name)
+        sitk.WriteImage(sitk.GetImageFromArray(array), path)
+        return path
+
+    def test_data_read_once(self):
+        src = self.write_json("src.json", {"a": 1.0})
+        ref = self.write_json("ref.json", {"a": 1.0})
+        checks = [(DataFileCheck, {}), (SizeCheck, {})]
+
+        # hashing, parsing and the size check share one read per file
+        with mock.patch("builtins.open", wraps=open) as opened:
+            entries = run_checks(checks, FilePair(src, ref), precheck=False)
+            entries += run_checks(checks, FilePair(src, ref), precheck=True)
+
+        self.assertEqual(opened.call_count, 4)
+        self.assertListEqual([n.label for n in entries[0].notes], ["Value Match"])
+        self.assertListEqual([n.label for n in entries[2].notes], ["Identical Content"])
+
+    def test_identical(self):
+        src = self.write_json("src.json", {"a": 1.0})
+        ref = self.write_json("ref.json", {"a": 1.0})
+        other = self.write_json("other.json", {"a": 2.0})
+
+        self.assertIsNotNone(FileContext(src, ref).identical())
+        self.assertIsNone(FileContext(src, other).identical())
+
+    def test_image_decoded_once(self):
+        array = np.random.default_rng(0).random((4, 8, 8), dtype=np.float32)
+        src = self.write_image("src.nii.gz", array)
+        ref = self.write_image("ref.nii.gz", array)
+
+        context = FileContext(src, ref)
+        with mock.patch("SimpleITK.ReadImage", wraps=sitk.ReadImage) as read:
+            for _ in range(2):
+                entry = ImageFileCheck(src, ref, context, voxel_precheck=False).run()
+                assert entry is not None
+                self.assertEqual(len(entry.findings), 0)
+
+        self.assertEqual(read.call_count, 2)
+        np.testing.assert_array_equal(context.src.array, array)
+        self.assertListEqual(context.ref.geometry["size"], [8, 8, 4])
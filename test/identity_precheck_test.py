@@ -0,0 +1,50 @@
+import unittest
+import os
+import json
+import shutil
+
+from medcmp.main import compare
+from medcmp.scan import identical_content
+
+TEMP_DIR = "tmp"
+
+
+class IdentityPrecheckTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree, value in [("src", 1.0), ("ref", 1.0)]:
+            os.makedirs(os.path.join(self.base, tree), exist_ok=True)
+            with open(os.path.join(self.base, tree, "same.json"), "w") as f:
+                json.dump({"a": value}, f)
+            with open(os.path.join(self.base, tree, "diff.json"), "w") as f:
+                json.dump({"a": value if tree == "src" else 2.0}, f)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def notes(self, **kwargs) -> dict:
+        report = compare(
+            os.path.join(self.base, "src"), os.path.join(self.base, "ref"), **kwargs
+        )
+        return {
+            os.path.basename(c.path): [n.label for n in c.notes]
+            for c in report.checks
+            if c.checker == "DataFileCheck"
+        }
+
+    def test_identical_content(self):
+        same = os.path.join(self.base, "src", "same.json")
+        diff = os.path.join(self.base, "src", "diff.json")
+
+        self.assertIsNotNone(identical_content(same, same))
+        self.assertIsNone(identical_content(same, diff.replace("src", "ref")))
+
+    def test_skip_identical(self):
+        notes = self.notes()
+        self.assertListEqual(notes["same.json"], ["Identical Content"])
+        self.assertNotIn("Identical Content", notes["diff.json"])
+
+    def test_full_checks(self):
+        notes = self.notes(precheck=False)
+        self.assertListEqual(notes["same.json"], ["Value Match"])
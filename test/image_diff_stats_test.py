@@ -0,0 +1,69 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import SimpleITK as sitk
+
+from medcmp.checks.ImageFileCheck import ImageFileCheck, image_diff_stats
+
+TEMP_DIR = "tmp"
+
+
+def write_image(path: str, array: np.ndarray, spacing=(1.0, 1.0, 1.0)):
+    img = sitk.GetImageFromArray(array)
+    img.SetSpacing(spacing)
+    sitk.WriteImage(img, path)
+
+
+class ImageDiffStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        rng = np.random.default_rng(42)
+        self.ref = rng.random((4, 8, 8), dtype=np.float32)
+        self.ref_path = os.path.join(self.base, "ref.nii.gz")
+        write_image(self.ref_path, self.ref)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def run_check(self, src: np.ndarray, spacing=(1.0, 1.0, 1.0)):
+        src_path = os.path.join(self.base, "src.nii.gz")
+        write_image(src_path, src, spacing)
+
+        entry = ImageFileCheck(src_path, self.ref_path, voxel_precheck=False).run()
+        assert entry is not None
+        return entry
+
+    def test_stats(self):
+        src = self.ref.copy()
+        src[0, 0, :2] += [0.5, -0.25]
+
+        stats = image_diff_stats(self.ref, src)
+        self.assertEqual(stats["MIN"], -0.5)
+        self.assertEqual(stats["MAX"], 0.25)
+        self.assertEqual(stats["DIF"], 2)
+        self.assertEqual(stats["NUM"], self.ref.size)
+        self.assertAlmostEqual(stats["AVE"], -0.25 / self.ref.size)
+        self.assertAlmostEqual(stats["MAE"], 0.75 / self.ref.size)
+        self.assertAlmostEqual(stats["MSE"], 0.3125 / self.ref.size)
+
+    def test_identical(self):
+        entry = self.run_check(self.ref)
+
+        self.assertListEqual(entry.findings, [])
+        stats = [n.info for n in entry.notes if n.label == "Image Diff Stat"][0]
+        self.assertListEqual(
+            list(stats), ["MIN", "AVE", "MAX", "MAE", "MSE", "DIF", "NUM"]
+        )
+        self.assertEqual(stats["DIF"], 0)
+
+    def test_difference(self):
+        entry = self.run_check(self.ref + 0.01)
+        self.assertListEqual([f.label for f in entry.findings], ["Image Diff Stat"])
+
+    def test_geometry(self):
+        entry = self.run_check(self.ref, spacing=(1.0, 1.0, 2.0))
+        self.assertListEqual([f.label for f in entry.findings], ["Geometry Mismatch"])
+        self.assertIn("spacing", entry.findings[0].info)
@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import SimpleITK as sitk
+
+from medcmp.checks.ImageFileCheck import ImageFileCheck
+from medcmp.checks.LabelOverlap import LabelOverlap, label_overlap
+
+TEMP_DIR = "tmp"
+
+
+class LabelOverlapTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        rng = np.random.default_rng(7)
+        self.ref = rng.integers(0, 5, (6, 16, 16)).astype(np.uint8)
+        self.src = self.ref.copy()
+        self.src[rng.random(self.ref.shape) < 0.1] = 3
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def test_against_simpleitk(self):
+        f = sitk.LabelOverlapMeasuresImageFilter()
+        f.Execute(sitk.GetImageFromArray(self.src), sitk.GetImageFromArray(self.ref))
+
+        result = label_overlap(self.ref, self.src).result()
+        self.assertListEqual(list(result), [1, 2, 3, 4])
+        for label, stats in result.items():
+            self.assertAlmostEqual(stats["dice"], f.GetDiceCoefficient(label))
+            self.assertAlmostEqual(stats["jaccard"], f.GetJaccardCoefficient(label))
+            self.assertEqual(
+                stats["volume_diff"],
+                int((self.src == label).sum()) - int((self.ref == label).sum()),
+            )
+
+    def test_crop_and_chunks(self):
+        ref = np.zeros((40, 64, 64), dtype=np.int16)
+        ref[10:12, 20:30, 30:40] = 2
+        src = ref.copy()
+        src[10, 20:25, 30] = 5
+
+        full = label_overlap(ref, src)
+        cropped = label_overlap(ref, src, crop=True)
+        chunked = LabelOverlap(crop=True)
+        for z in range(0, 40, 7):
+            chunked.update(ref[z : z + 7], src[z : z + 7])
+
+        for overlap in [cropped, chunked]:
+            self.assertDictEqual(overlap.result(), full.result())
+            self.assertEqual(overlap.dice, full.dice)
+            self.assertDictEqual(overlap.ref_count, full.ref_count)
+
+    def test_sparse_labels(self):
+        ref = np.array([-5, 0, 0, 1 << 40, 1 << 40], dtype=np.int64)
+        src = np.array([-5, 0, 1 << 40, 1 << 40, 0], dtype=np.int64)
+
+        result = label_overlap(ref, src).result()
+        self.assertListEqual(list(result), [-5, 1 << 40])
+        self.assertEqual(result[-5]["dice"], 1.0)
+        self.assertEqual(result[1 << 40]["dice"], 0.5)
+
+    def test_empty(self):
+        empty = np.zeros((4, 4), dtype=np.uint8)
+        overlap = label_overlap(empty, empty, crop=True)
+        self.assertEqual(overlap.dice, 1.0)
+        self.assertDictEqual(overlap.result(), {})
+
+    def test_label_findings(self):
+        paths = []
+        for name, array in [("src", self.src), ("ref", self.ref)]:
+            paths.append(os.path.join(self.base, f"{name}.nii.gz"))
+            sitk.WriteImage(sitk.GetImageFromArray(array), paths[-1])
+
+        entry = ImageFileCheck(*paths).run()
+        assert entry is not None
+
+        self.assertIn("Dice Score", [n.label for n in entry.notes])
+        self.assertListEqual(
+            [f.subpath for f in entry.findings if f.label != "Dice Score Difference"],
+            ["label 1", "label 2", "label 3", "label 4"],
+        )
@@ -0,0 +1,102 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+from medcmp.Report import Report
+from medcmp.checks.CheckRegistry import CheckSpec, FilePatterns
+from medcmp.checks.FileCompare import FileCompare
+from medcmp.checks.SizeCheck import SizeCheck
+
+TEMP_DIR = "tmp"
+
+HEAVY_MODULES = ["numpy", "pandas", "SimpleITK", "pydicom", "pydicom_seg"]
+
+
+def imported_modules(code: str) -> list:
+    """
+    Run code in a fresh interpreter and return the heavy modules it imported.
+    """
+
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys\nHEAVY_MODULES = {HEAVY_MODULES!r}\n{code}\n"
+            "print('imported:' + ','.join(m for m in HEAVY_MODULES if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    line = out.strip().splitlines()[-1]
+    return [m for m in line[len("imported:") :].split(",") if m]
+
+
+class LazyImportTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            os.makedirs(os.path.join(self.base, tree), exist_ok=True)
+            with open(os.path.join(self.base, tree, "result.json"), "w") as f:
+                json.dump({"a": 1.0, "b": [1, 2, 3] if tree == "src" else [1, 2]}, f)
+            with open(os.path.join(self.base, tree, "notes.txt"), "w") as f:
+                f.write(tree)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def test_startup(self):
+        self.assertListEqual(imported_modules("import medcmp.main"), [])
+
+    def test_json_only_tree(self):
+        code = (
+            "from medcmp.main import compare\n"
+            f"report = compare({self.base + '/src'!r}, {self.base + '/ref'!r})\n"
+            "assert len(report.checks) == 3"
+        )
+        self.assertListEqual(imported_modules(code), [])
+
+    def test_load_on_match(self):
+        spec = CheckSpec(
+            "DataFileCheck",
+            "medcmp.checks.DataFileCheck",
+            FilePatterns(suffixes=[".json"]),
+        )
+
+        compare = FileCompare(Report())
+        compare.register(spec, csv_key="id")
+        compare.register(SizeCheck)
+
+        # not loaded for files that do not match
+        txt = os.path.join(self.base, "src", "notes.txt")
+        checks = compare.applicable(txt, txt.replace("src", "ref"))
+        self.assertListEqual([c for c, _ in checks], [SizeCheck])
+        self.assertIs(compare.checks[0], spec)
+
+        # replaced by its class on the first match
+        path = os.path.join(self.base, "src", "result.json")
+        checks = compare.applicable(path, path.replace("src", "ref"))
+        self.assertListEqual(
+            [c.__name__ for c, _ in checks], ["DataFileCheck", "SizeCheck"]
+        )
+        self.assertIs(compare.checks[0], checks[0][0])
+        self.assertDictEqual(checks[0][1], {"csv_key": "id"})
+
+    def test_unknown_option(self):
+        compare = FileCompare(Report())
+        compare.register(
+            CheckSpec(
+                "DataFileCheck",
+                "medcmp.checks.DataFileCheck",
+                FilePatterns(suffixes=[".json"]),
+            ),
+            no_such_option=1,
+        )
+
+        path = os.path.join(self.base, "src", "result.json")
+        with self.assertRaises(ValueError):
+            compare.applicable(path, path.replace("src", "ref"))
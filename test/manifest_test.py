@@ -0,0 +1,105 @@
+import unittest
+import os
+import json
+import time
+import shutil
+from unittest import mock
+
+from medcmp import manifest as manifest_module
+from medcmp.main import compare
+from medcmp.manifest import Manifest
+from medcmp.Report import ReportYamlExport
+from medcmp.checks import FileCompare
+from medcmp.checks.DataFileCheck import DataFileCheck
+
+TEMP_DIR = "tmp"
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        self.manifest_path = os.path.join(self.base, "manifest.json")
+
+        for tree in ["src", "ref"]:
+            for i in range(6):
+                os.makedirs(os.path.join(self.base, tree), exist_ok=True)
+                self.write(tree, f"data{i}.json", {"a": i, "b": 1.5})
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def write(self, tree: str, name: str, data: dict):
+        with open(os.path.join(self.base, tree, name), "w") as f:
+            json.dump(data, f)
+
+    def run_compare(self, config=None, **kwargs):
+        """
+        Compare with the manifest, return the number of file pairs checked and
+        the generated report.
+        """
+
+        manifest = Manifest.load(self.manifest_path, config)
+        with mock.patch.object(
+            FileCompare, "check_pair", wraps=FileCompare.check_pair
+        ) as run:
+            report = compare(
+                os.path.join(self.base, "src"),
+                os.path.join(self.base, "ref"),
+                manifest=manifest,
+                **kwargs,
+            )
+        manifest.save(self.manifest_path)
+
+        data = ReportYamlExport(report).generate()
+        del data["id"], data["date"]
+        return run.call_count, data
+
+    def test_incremental(self):
+        checked, first = self.run_compare()
+        self.assertEqual(checked, 6)
+
+        # nothing changed
+        checked, second = self.run_compare()
+        self.assertEqual(checked, 0)
+        self.assertEqual(second, first)
+
+        # one source file changed
+        time.sleep(0.01)
+        self.write("src", "data2.json", {"a": 2, "b": 2.5})
+        checked, third = self.run_compare()
+        self.assertEqual(checked, 1)
+        self.assertFalse(third["conclusion"])
+
+        # touched without content change
+        path = os.path.join(self.base, "ref", "data3.json")
+        os.utime(path, ns=(0, 0))
+        checked, fourth = self.run_compare()
+        self.assertEqual(checked, 0)
+        self.assertEqual(fourth, third)
+
+    def test_config_change(self):
+        self.run_compare({"precheck": True})
+        checked, _ = self.run_compare({"precheck": False})
+        self.assertEqual(checked, 6)
+
+    def test_version_change(self):
+        self.run_compare()
+        with mock.patch.object(manifest_module, "__version__", "0.0.0"):
+            checked, _ = self.run_compare()
+        self.assertEqual(checked, 6)
+
+    def test_failed_checks(self):
+        def exceptions(data):
+            return data["summary"]["checks"]["DataFileCheck"].get("findings", {})
+
+        # a failing check is not recorded and runs again in the next run
+        with mock.patch.object(
+            DataFileCheck, "check", side_effect=RuntimeError("failed")
+        ):
+            checked, first = self.run_compare(precheck=False)
+        self.assertEqual(checked, 6)
+        self.assertEqual(exceptions(first), {"Exception": 6})
+
+        checked, second = self.run_compare(precheck=False)
+        self.assertEqual(checked, 6)
+        self.assertEqual(exceptions(second), {})
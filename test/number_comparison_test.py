@@ -5,24 +5,31 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
-from medcmp.checks.DataFileCheck import compare_numbers
+from medcmp.checks.DataFileCheck import compare_numbers, compare_numbers_batch
 
 
 class NumberComparisonTest(unittest.TestCase):
     def setUp(self):
         random.seed(823468228)
 
+    def compare_numbers(self, v1, v2, verbose=False):
+        return compare_numbers(v1, v2, verbose=verbose)
+
     def test_equal_integer(self):
-        self.assertTupleEqual(compare_numbers(1, 1), (True, 1, math.inf))
+        self.assertTupleEqual(self.compare_numbers(1, 1), (True, 1, math.inf))
 
     def test_equal_float(self):
-        self.assertTupleEqual(compare_numbers(1.0, 1.0), (True, 1.0, math.inf))
+        self.assertTupleEqual(self.compare_numbers(1.0, 1.0), (True, 1.0, math.inf))
 
     def test_integer_precision_10(self):
-        self.assertTupleEqual(compare_numbers(123456789, 123456788), (False, 10, -1))
+        self.assertTupleEqual(
+            self.compare_numbers(123456789, 123456788), (False, 10, -1)
+        )
 
     def test_integer_precision_100(self):
-        self.assertTupleEqual(compare_numbers(123456789, 123456798), (False, 100, -1))
+        self.assertTupleEqual(
+            self.compare_numbers(123456789, 123456798), (False, 100, -1)
+        )
 
     def test_integer_precision_dynamic(self):
         # NOTE: 17 is the maximum precision supported for integers
@@ -48,40 +55,84 @@ class NumberComparisonTest(unittest.TestCase):
                 # compare numbers
                 #  the expected result is 10**(error + 1) because if the error is eg. in the 10th, the 100th is the most accurate digit
                 self.assertTupleEqual(
-                    compare_numbers(a, b), (False, 10 ** (error + 1), -1)
+                    self.compare_numbers(a, b), (False, 10 ** (error + 1), -1)
                 )
 
     def test_special(self):
         a = 69809588409
         b = 69869588409
 
-        self.assertTupleEqual(compare_numbers(a, b), (False, 100000000, -1))
+        self.assertTupleEqual(self.compare_numbers(a, b), (False, 100000000, -1))
 
     def test_float_precision_p1(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.23456788), (False, 1, 7))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.23456788), (False, 1, 7)
+        )
 
     def test_float_precision_p2(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.23456798), (False, 1, 6))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.23456798), (False, 1, 6)
+        )
 
     def test_float_precision_p3(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.23456889), (False, 1, 5))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.23456889), (False, 1, 5)
+        )
 
     def test_float_precision_p4(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.23457789), (False, 1, 4))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.23457789), (False, 1, 4)
+        )
 
     def test_float_precision_p5(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.23466789), (False, 1, 3))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.23466789), (False, 1, 3)
+        )
 
     def test_float_precision_p6(self):
         self.assertTupleEqual(
-            compare_numbers(1.23456789, 1.23556789, verbose=True), (False, 1, 2)
+            self.compare_numbers(1.23456789, 1.23556789, verbose=True), (False, 1, 2)
         )
 
     def test_float_precision_p7(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.24556789), (False, 1, 1))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.24556789), (False, 1, 1)
+        )
 
     def test_float_precision_p8(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 1.34556789), (False, 1, 0))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 1.34556789), (False, 1, 0)
+        )
 
     def test_scale_missmatch(self):
-        self.assertTupleEqual(compare_numbers(1.23456789, 12.3456789), (False, -1, -1))
+        self.assertTupleEqual(
+            self.compare_numbers(1.23456789, 12.3456789), (False, -1, -1)
+        )
+
+
+class BatchNumberComparisonTest(NumberComparisonTest):
+    """
+    Runs all scalar cases through the vectorized path.
+    """
+
+    def compare_numbers(self, v1, v2, verbose=False):
+        match, scale, precision = compare_numbers_batch([v1], [v2])
+        return bool(match[0]), int(scale[0]), float(precision[0])
+
+    def test_parity(self):
+        values = [random.uniform(0.001, 1000.0) for _ in range(1000)]
+        pairs = [(v, v * (1 + random.choice([0, 1e-9, 1e-6, 1e-3, 1]))) for v in values]
+        pairs += [
+            (random.randint(1, 10**12), random.randint(1, 10**12)) for _ in range(1000)
+        ]
+
+        for t in [float, int]:
+            v1 = [a for a, _ in pairs if isinstance(a, t)]
+            v2 = [b for a, b in pairs if isinstance(a, t)]
+            match, scale, precision = compare_numbers_batch(v1, v2)
+
+            for i in range(len(v1)):
+                self.assertTupleEqual(
+                    (bool(match[i]), int(scale[i]), float(precision[i])),
+                    compare_numbers(v1[i], v2[i]),
+                )
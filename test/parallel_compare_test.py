@@ -0,0 +1,63 @@
+import unittest
+import os
+import json
+import yaml
+import shutil
+
+from medcmp.main import compare
+from medcmp.Report import ReportYamlExport
+
+TEMP_DIR = "tmp"
+
+
+def write_tree(base: str, files: dict):
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(base, path)), exist_ok=True)
+        with open(os.path.join(base, path), "w") as f:
+            if path.endswith(".json"):
+                json.dump(content, f, indent=2)
+            elif path.endswith(".yml"):
+                yaml.dump(content, f, indent=2)
+            else:
+                f.write(content)
+
+
+class ParallelCompareTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        src_files = {}
+        ref_files = {}
+        for i in range(40):
+            src_files[f"case{i}/data.json"] = {"a": i, "b": [1.5, 2.5 + i % 3]}
+            ref_files[f"case{i}/data.json"] = {"a": i, "b": [1.5, 2.5]}
+            src_files[f"case{i}/meta.yml"] = {"id": f"case{i}", "ok": True}
+            ref_files[f"case{i}/meta.yml"] = {"id": f"case{i}", "ok": i % 5 != 0}
+            src_files[f"case{i}/log.txt"] = "x" * (i % 4)
+            ref_files[f"case{i}/log.txt"] = "x"
+
+        write_tree(os.path.join(self.base, "src"), src_files)
+        write_tree(os.path.join(self.base, "ref"), ref_files)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def generate(self, **kwargs) -> dict:
+        src_path = os.path.join(self.base, "src")
+        ref_path = os.path.join(self.base, "ref")
+
+        data = ReportYamlExport(compare(src_path, ref_path, **kwargs)).generate()
+        del data["id"]
+        del data["date"]
+        return data
+
+    def test_parallel_matches_serial(self):
+        serial = self.generate()
+
+        for executor in ["thread", "process"]:
+            with self.subTest(executor=executor):
+                parallel = self.generate(jobs=4, executor=executor)
+                self.assertEqual(
+                    yaml.dump(serial, sort_keys=False, indent=2),
+                    yaml.dump(parallel, sort_keys=False, indent=2),
+                )
@@ -0,0 +1,117 @@
+import unittest
+import os
+import json
+import shutil
+
+from medcmp.main import compare
+from medcmp.Report import Report, load_report, report_export
+from medcmp.ReportStream import ReportStream, finalize_stream
+from medcmp.profile import PROFILE_KEYS, ResourceUsage, Tracer, span, tracing
+
+TEMP_DIR = "tmp"
+
+
+class ProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            for i in range(4):
+                path = os.path.join(self.base, tree, f"case{i}")
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, "data.json"), "w") as f:
+                    json.dump({"a": i, "b": "x" * 5000 * (1 + (tree == "src"))}, f)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def compare(self, report: Report, **kwargs):
+        return compare(
+            os.path.join(self.base, "src"),
+            os.path.join(self.base, "ref"),
+            report,
+            **kwargs,
+        )
+
+    def test_resource_usage(self):
+        usage = ResourceUsage()
+        with open(os.path.join(self.base, "src", "case0", "data.json"), "rb") as f:
+            size = len(f.read())
+        stats = usage.stop()
+
+        self.assertGreaterEqual(stats["wall_time"], 0.0)
+        self.assertGreaterEqual(stats["cpu_time"], 0.0)
+        if stats["bytes_read"] is not None:
+            self.assertGreaterEqual(stats["bytes_read"], size)
+
+    def test_check_meta(self):
+        report = self.compare(Report(profile=True))
+        for entry in report.checks:
+            for key in PROFILE_KEYS:
+                self.assertIn(key, entry.meta)
+
+        # without profiling (or tracing), nothing is measured and the report is
+        # exported as before
+        report = self.compare(Report())
+        for entry in report.checks:
+            self.assertDictEqual(entry.meta, {})
+        self.assertNotIn("profile", report.summarize())
+
+    def test_profile_summary(self):
+        report = self.compare(Report(profile=True), jobs=2, executor="thread")
+
+        profile = report.summarize()["profile"]
+        self.assertSetEqual(set(profile), {c.checker for c in report.checks})
+        for checker, data in profile.items():
+            entries = [c for c in report.checks if c.checker == checker]
+            self.assertEqual(data["files"], len(entries))
+            self.assertAlmostEqual(
+                data["wall_time"], sum(c.meta["wall_time"] for c in entries)
+            )
+            self.assertLessEqual(data["wall_time_max"], data["wall_time"])
+
+        # exported and loaded again with the profile of each check
+        for ext in ["yml", "json"]:
+            path = os.path.join(self.base, f"report.{ext}")
+            report_export(report, path).export(path)
+            self.assertEqual(load_report(path).summarize(), report.summarize())
+
+    def test_profile_stream(self):
+        report = Report(retain=False, profile=True)
+        stream_path = os.path.join(self.base, "report.jsonl")
+        with ReportStream(report, stream_path):
+            self.compare(report)
+
+        final = finalize_stream(stream_path, os.path.join(self.base, "report.yml"))
+        self.assertEqual(final.summarize(), report.summarize())
+
+    def test_trace(self):
+        report = Report()
+        tracer = Tracer()
+        report.sinks.append(tracer)
+
+        with tracing(tracer):
+            self.compare(report, jobs=2, executor="thread")
+            with span("export"):
+                pass
+
+        # spans outside of a traced run are not recorded
+        with span("ignored"):
+            pass
+
+        path = os.path.join(self.base, "trace.json")
+        tracer.export(path)
+        with open(path, "r") as f:
+            events = json.load(f)["traceEvents"]
+
+        names = [event["name"] for event in events]
+        self.assertIn("scan", names)
+        self.assertIn("compare", names)
+        self.assertIn("export", names)
+        self.assertNotIn("ignored", names)
+
+        checks = [event for event in events if event["cat"] == "check"]
+        self.assertEqual(len(checks), len(report.checks))
+        for event in events:
+            self.assertEqual(event["ph"], "X")
+            self.assertGreaterEqual(event["dur"], 0)
@@ -0,0 +1,81 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import SimpleITK as sitk
+
+from medcmp.checks.ImageFileCheck import ImageFileCheck
+from medcmp.checks.RawVolume import iter_slabs, read_raw_volume
+
+TEMP_DIR = "tmp"
+
+
+class RawVolumeTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        rng = np.random.default_rng(3)
+        self.labels = rng.integers(0, 4, (12, 20, 24)).astype(np.uint8)
+        self.values = rng.random((12, 20, 24)).astype(np.float32)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def write(self, name, array, **kwargs):
+        img = sitk.GetImageFromArray(array)
+        img.SetOrigin([1.5, -2.0, 3.0])
+        img.SetSpacing([0.5, 0.7, 2.0])
+        img.SetDirection([0, 1, 0, -1, 0, 0, 0, 0, 1])
+
+        path = os.path.join(self.base, name)
+        sitk.WriteImage(img, path, **kwargs)
+        return path
+
+    def test_header(self):
+        for ext in ["mha", "nrrd"]:
+            for array in [self.labels, self.values, self.labels.astype(np.int64)]:
+                path = self.write(f"image.{ext}", array)
+                img = sitk.ReadImage(path)
+
+                volume = read_raw_volume(path)
+                assert volume is not None
+                self.assertEqual(volume.dtype, array.dtype)
+                self.assertListEqual(volume.size, list(img.GetSize()))
+                np.testing.assert_allclose(volume.origin, img.GetOrigin())
+                np.testing.assert_allclose(volume.spacing, img.GetSpacing())
+                np.testing.assert_allclose(volume.direction, img.GetDirection())
+
+                # slabs cover the whole volume
+                slabs = [ref for ref, _ in iter_slabs(volume, volume, 1 << 16)]
+                self.assertGreater(len(slabs), 1)
+                np.testing.assert_array_equal(np.concatenate(slabs), array)
+
+    def test_unsupported(self):
+        compressed = self.write("image.mha", self.labels, useCompression=True)
+        nifti = self.write("image.nii.gz", self.labels)
+
+        self.assertIsNone(read_raw_volume(compressed))
+        self.assertIsNone(read_raw_volume(nifti))
+
+    def test_chunked_check(self):
+        for name, ref in [("labels", self.labels), ("values", self.values)]:
+            src = ref.copy()
+            src[3:5, 4:9, 2:6] = 2
+
+            paths = [
+                self.write(f"src.{name}.nrrd", src),
+                self.write(f"ref.{name}.nrrd", ref),
+            ]
+
+            full = ImageFileCheck(*paths, memory_budget=0).run()
+            chunked = ImageFileCheck(*paths, memory_budget=4096).run()
+            assert full is not None and chunked is not None
+
+            notes = [(n.label, n.info) for n in chunked.notes]
+            self.assertEqual(notes.pop(1)[0], "Chunked Comparison")
+            self.assertListEqual(notes, [(n.label, n.info) for n in full.notes])
+            self.assertListEqual(
+                [(f.label, f.subpath, f.info) for f in chunked.findings],
+                [(f.label, f.subpath, f.info) for f in full.findings],
+            )
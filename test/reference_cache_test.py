@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import numpy as np
+from unittest import mock
+
+from medcmp import cache as cache_module
+from medcmp.cache import ReferenceCache
+
+TEMP_DIR = "tmp"
+
+
+class ReferenceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        self.decoded = 0
+        self.files = []
+        for i in range(3):
+            path = os.path.join(self.base, f"ref{i}.raw")
+            with open(path, "wb") as f:
+                f.write(bytes([i]) * 1000)
+            self.files.append(path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def decode(self, path: str):
+        self.decoded += 1
+        with open(path, "rb") as f:
+            data = np.frombuffer(f.read(), dtype=np.uint8)
+        return {"image": data.reshape(10, 100)}, {"spacing": [1.0, 1.0]}
+
+    def test_load(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"))
+
+        for _ in range(3):
+            arrays, meta = cache.load(self.files[0], "image", self.decode)
+            self.assertEqual(arrays["image"].shape, (10, 100))
+            self.assertListEqual(meta["spacing"], [1.0, 1.0])
+
+        # decoded once, later reads are memory-mapped
+        self.assertEqual(self.decoded, 1)
+        self.assertIsInstance(arrays["image"], np.memmap)
+
+    def test_invalidate(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"))
+        cache.load(self.files[0], "image", self.decode)
+
+        # a changed reference file is decoded again
+        with open(self.files[0], "wb") as f:
+            f.write(b"\x07" * 1000)
+        os.utime(self.files[0], ns=(0, 10**9))
+
+        arrays, _ = cache.load(self.files[0], "image", self.decode)
+        self.assertEqual(self.decoded, 2)
+        self.assertEqual(arrays["image"][0, 0], 7)
+
+    def test_version_change(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"))
+        cache.load(self.files[0], "image", self.decode)
+
+        # entries of another medcmp version are decoded again
+        with mock.patch.object(cache_module, "__version__", "0.0.0"):
+            cache.load(self.files[0], "image", self.decode)
+        self.assertEqual(self.decoded, 2)
+
+    def test_content_hash(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"), content_hash=True)
+
+        # the file is hashed once per load, also on a miss
+        with mock.patch.object(
+            cache_module, "file_digest", wraps=cache_module.file_digest
+        ) as digest:
+            cache.load(self.files[0], "image", self.decode)
+            self.assertEqual(digest.call_count, 1)
+            cache.load(self.files[0], "image", self.decode)
+            self.assertEqual(digest.call_count, 2)
+        self.assertEqual(self.decoded, 1)
+
+    def test_evict(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"), max_bytes=2500)
+
+        for i, path in enumerate(self.files):
+            cache.load(path, "image", self.decode)
+            os.utime(
+                os.path.join(cache.directory, cache.key(path, "image"), "meta.json"),
+                (i, i),
+            )
+
+        # the least recently used entry was removed to stay within max_bytes
+        self.assertEqual(len(cache.entries()), 2)
+        self.assertIsNone(cache.get(self.files[0], "image"))
+
+    def test_evict_on_budget(self):
+        cache = ReferenceCache(os.path.join(self.base, "cache"), max_bytes=2500)
+
+        # entries are listed once, and again only when the budget is exceeded
+        with mock.patch.object(cache, "entries", wraps=cache.entries) as entries:
+            cache.load(self.files[0], "image", self.decode)
+            cache.load(self.files[1], "image", self.decode)
+            self.assertEqual(entries.call_count, 1)
+
+            cache.load(self.files[2], "image", self.decode)
+            self.assertEqual(entries.call_count, 2)
+        self.assertEqual(len(cache.entries()), 2)
+        self.assertEqual(cache.size, sum(size for _, size, _ in cache.entries()))
@@ -0,0 +1,71 @@
+import unittest
+import os
+import json
+import shutil
+
+from medcmp.main import compare
+from medcmp.Report import Report, load_report, report_export, msgpack
+from medcmp.ReportStream import ReportStream, finalize_stream
+
+TEMP_DIR = "tmp"
+
+
+class ReportFormatsTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            for i in range(5):
+                path = os.path.join(self.base, tree, f"case{i}")
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, "data.json"), "w") as f:
+                    json.dump({"a": i, "b": [1.5, 2.5 + (tree == "src") * i]}, f)
+
+            with open(os.path.join(self.base, tree, f"only_{tree}.txt"), "w") as f:
+                f.write(tree)
+
+        self.report = self.compare(Report("formats"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def compare(self, report: Report) -> Report:
+        return compare(
+            os.path.join(self.base, "src"), os.path.join(self.base, "ref"), report
+        )
+
+    def round_trip(self, ext: str):
+        path = os.path.join(self.base, "report" + ext)
+        report_export(self.report, path).export(path)
+
+        loaded = load_report(path)
+        self.assertEqual(
+            report_export(loaded, path).generate(),
+            report_export(self.report, path).generate(),
+        )
+        self.assertEqual(loaded.summarize(), self.report.summarize())
+        self.assertEqual(loaded.conclude(), self.report.conclude())
+
+    def test_yaml(self):
+        self.round_trip(".yml")
+
+    def test_json(self):
+        self.round_trip(".json")
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        self.round_trip(".msgpack")
+
+    def test_finalize_json(self):
+        streamed = Report("formats", retain=False)
+        streamed.id, streamed.datetime = self.report.id, self.report.datetime
+        stream_path = os.path.join(self.base, "report.jsonl")
+        with ReportStream(streamed, stream_path):
+            self.compare(streamed)
+
+        path = os.path.join(self.base, "stream.json")
+        finalize_stream(stream_path, path)
+
+        with open(path, "r") as f:
+            data = json.load(f)
+        self.assertEqual(data, report_export(self.report, path).generate())
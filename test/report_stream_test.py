@@ -0,0 +1,144 @@
+import unittest
+import os
+import json
+import shutil
+
+from medcmp.main import compare
+from medcmp.Report import (
+    Report,
+    ReportCheck,
+    ReportCheckFinding,
+    ReportYamlExport,
+    load_report,
+    msgpack,
+)
+from medcmp.ReportStream import ReportStream, finalize_stream
+
+TEMP_DIR = "tmp"
+
+
+class ReportStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            for i in range(12):
+                path = os.path.join(self.base, tree, f"case{i}")
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, "data.json"), "w") as f:
+                    json.dump({"a": i, "b": [1.5, 2.5 + (tree == "src") * (i % 3)]}, f)
+                with open(os.path.join(path, "log.txt"), "w") as f:
+                    f.write("x" * (1 + (tree == "src") * (i % 2)))
+
+            with open(os.path.join(self.base, tree, f"only_{tree}.txt"), "w") as f:
+                f.write(tree)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def compare(self, report: Report):
+        return compare(
+            os.path.join(self.base, "src"), os.path.join(self.base, "ref"), report
+        )
+
+    def read(self, path: str) -> str:
+        with open(path, "r") as f:
+            return f.read()
+
+    def test_finalize_matches_export(self):
+        # in-memory report
+        report = self.compare(Report("test"))
+        ReportYamlExport(report).export(os.path.join(self.base, "memory.yml"))
+
+        # streamed report of the same comparison
+        streamed = Report("test", retain=False)
+        streamed.id, streamed.datetime = report.id, report.datetime
+        stream_path = os.path.join(self.base, "report.jsonl")
+        with ReportStream(streamed, stream_path, summary_interval=5):
+            self.compare(streamed)
+
+        self.assertListEqual(streamed.checks, [])
+        self.assertEqual(streamed.summarize(), report.summarize())
+        self.assertEqual(streamed.conclude(), report.conclude())
+
+        final = finalize_stream(stream_path, os.path.join(self.base, "stream.yml"))
+        self.assertEqual(final.summarize(), report.summarize())
+        self.assertEqual(
+            self.read(os.path.join(self.base, "stream.yml")),
+            self.read(os.path.join(self.base, "memory.yml")),
+        )
+
+    def test_interrupted_stream(self):
+        report = Report(retain=False)
+        stream_path = os.path.join(self.base, "report.jsonl")
+        with ReportStream(report, stream_path, summary_interval=5):
+            self.compare(report)
+
+        # cut the stream in the middle of a check line
+        with open(stream_path, "r") as f:
+            lines = f.readlines()
+        checks = [i for i, line in enumerate(lines) if '"type": "check"' in line]
+        with open(stream_path, "w") as f:
+            f.writelines(lines[: checks[10]])
+            f.write(lines[checks[10]][:20])
+
+        final = finalize_stream(stream_path, os.path.join(self.base, "report.yml"))
+        summary = final.summarize()
+        self.assertEqual(sum(c["files"] for c in summary["checks"].values()), 10)
+        self.assertEqual(summary["files_missing"], 1)
+        self.assertEqual(summary["files_extra"], 1)
+
+    def test_finalize_keeps_info_types(self):
+        def entry():
+            check = ReportCheck("case0/seg.nii.gz", "ImageFileCheck")
+            check.add(
+                ReportCheckFinding(
+                    "Label mismatch", "x", {1: {"dice": 0.5}, "spacing": (1.0, 2.0)}
+                )
+            )
+            return check
+
+        report = Report("test")
+        report.add(entry())
+        ReportYamlExport(report).export(os.path.join(self.base, "memory.yml"))
+
+        streamed = Report("test", retain=False)
+        streamed.id, streamed.datetime = report.id, report.datetime
+        stream_path = os.path.join(self.base, "report.jsonl")
+        with ReportStream(streamed, stream_path):
+            streamed.add(entry())
+
+        # lines hold the check item only, no rendered yaml
+        with open(stream_path, "r") as f:
+            checks = [line for line in map(json.loads, f) if line["type"] == "check"]
+        self.assertListEqual(
+            [sorted(line) for line in checks], [["checker", "findings", "path", "type"]]
+        )
+
+        # int keys and tuples are written as in the in-memory export
+        finalize_stream(stream_path, os.path.join(self.base, "stream.yml"))
+        self.assertEqual(
+            self.read(os.path.join(self.base, "stream.yml")),
+            self.read(os.path.join(self.base, "memory.yml")),
+        )
+
+        if msgpack is not None:
+            path = os.path.join(self.base, "stream.msgpack")
+            finalize_stream(stream_path, path)
+            (check,) = load_report(path).checks
+            self.assertEqual(
+                check.findings[0].info, {1: {"dice": 0.5}, "spacing": [1.0, 2.0]}
+            )
+
+    def test_summary_of_appended_checks(self):
+        report = self.compare(Report())
+        summary = report.summarize()
+
+        # checks added to the list directly are counted, removed ones are not
+        report.checks.append(ReportCheck("case0/extra.txt", "SizeCheck"))
+        self.assertEqual(
+            report.summarize()["checks"]["SizeCheck"]["files"],
+            summary["checks"]["SizeCheck"]["files"] + 1,
+        )
+        report.checks[:] = report.checks[:-1]
+        self.assertEqual(report.summarize(), summary)
@@ -0,0 +1,79 @@
+import unittest
+import os
+import shutil
+
+from medcmp.Report import Report
+from medcmp.scan import match_tree_structures, scan_tree
+
+TEMP_DIR = "tmp"
+
+
+class ScanTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for path in [
+            "a.json",
+            "case1/image.nii.gz",
+            "case1/meta/info.yml",
+            "case2/image.nii.gz",
+            "case2/cache/x.bin",
+            "z/deep/er/file.txt",
+        ]:
+            path = os.path.join(self.base, "src", path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def test_walk_order(self):
+        base = os.path.join(self.base, "src")
+
+        expected = []
+        for root, _, files in os.walk(base):
+            for name in files:
+                path = os.path.join(root, name)
+                expected.append(
+                    (os.path.relpath(path, base), path, os.path.getsize(path))
+                )
+
+        for jobs in [1, 4]:
+            items = scan_tree(base, jobs=jobs)
+            self.assertListEqual(
+                [(k, i.path, i.size) for k, i in items.items()], expected
+            )
+            self.assertTrue(all(i.relpath == k for k, i in items.items()))
+
+    def test_filters(self):
+        base = os.path.join(self.base, "src")
+
+        items = scan_tree(base, include=["*.nii.gz", "*.yml"], exclude=["case2/*"])
+        self.assertListEqual(
+            sorted(items),
+            [
+                os.path.join("case1", "image.nii.gz"),
+                os.path.join("case1", "meta", "info.yml"),
+            ],
+        )
+
+        # directory names exclude whole subtrees
+        items = scan_tree(base, exclude=["cache", "deep"])
+        self.assertNotIn(os.path.join("case2", "cache", "x.bin"), items)
+        self.assertNotIn(os.path.join("z", "deep", "er", "file.txt"), items)
+        self.assertEqual(len(items), 4)
+
+    def test_match_filtered(self):
+        shutil.copytree(os.path.join(self.base, "src"), os.path.join(self.base, "ref"))
+        os.remove(os.path.join(self.base, "ref", "a.json"))
+
+        report = Report()
+        pairs = match_tree_structures(
+            os.path.join(self.base, "src"),
+            os.path.join(self.base, "ref"),
+            report,
+            exclude=["*.json"],
+        )
+        self.assertEqual(len(pairs), 5)
+        self.assertListEqual(report.files_missing + report.files_extra, [])
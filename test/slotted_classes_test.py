@@ -0,0 +1,50 @@
+import copy
+import unittest
+
+import yaml
+
+from medcmp.Report import (
+    ReportCheck,
+    ReportCheckFinding,
+    ReportCheckNote,
+    ReportYamlExport,
+)
+from medcmp.scan import FileType, Item
+from medcmp.checks.CheckExecutor import ProcessExecutor
+from medcmp.checks.DataFileCheck import ComparisonItem, ComparisonOutcome, PathNode
+
+
+class SlottedClassesTest(unittest.TestCase):
+    def test_process_pool(self):
+        # the slotted classes cross the process pool (pickled both ways)
+        item = Item("src", "src/case0/data.json", "data.json", 12, 34, FileType.DATA)
+        node = PathNode(PathNode(PathNode(), "cases"), 0)
+        comparison = ComparisonItem(
+            "volume", "float", 1.5, 2.5, ComparisonOutcome.VALUE_MISMATCH, 1.0, node
+        )
+        entry = ReportCheck("case0/data.json", "DataFileCheck", {"seconds": 0.5})
+        entry.add(ReportCheckFinding("Value Difference", "differs", 1.0, "cases.[0]"))
+        entry.add(ReportCheckNote("Row Count", "rows", {"src": 1, "ref": 1}))
+
+        with ProcessExecutor(2) as executor:
+            future = executor.submit(
+                copy.copy, [item, node, comparison, entry], pool="process"
+            )
+            item_copy, node_copy, comparison_copy, entry_copy = future.result()
+
+        self.assertEqual(
+            [getattr(item_copy, name) for name in Item.__slots__],
+            [getattr(item, name) for name in Item.__slots__],
+        )
+        self.assertEqual(item_copy.relpath, item.relpath)
+        self.assertEqual(node_copy.keys(), ("cases", 0))
+        self.assertEqual(
+            [getattr(comparison_copy, name) for name in ["path", "type", "info"]],
+            ["cases.[0].volume", "float", 1.0],
+        )
+        self.assertEqual(comparison_copy.outcome, ComparisonOutcome.VALUE_MISMATCH)
+        for profile in [False, True]:
+            self.assertEqual(
+                yaml.dump(ReportYamlExport.check_item(entry_copy, profile)),
+                yaml.dump(ReportYamlExport.check_item(entry, profile)),
+            )
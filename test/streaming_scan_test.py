@@ -0,0 +1,61 @@
+import unittest
+import os
+import json
+import shutil
+
+from medcmp.main import compare
+from medcmp.Report import Report, ReportYamlExport
+from medcmp.scan import match_tree_structures, stream_tree_structures
+
+TEMP_DIR = "tmp"
+
+
+class StreamingScanTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+
+        for tree in ["src", "ref"]:
+            for i in range(30):
+                # some files only exist in one of the trees
+                if (tree == "src" and i % 11 == 3) or (tree == "ref" and i % 7 == 5):
+                    continue
+
+                path = os.path.join(self.base, tree, f"group{i % 4}", f"case{i}")
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, "data.json"), "w") as f:
+                    json.dump({"a": i, "b": [1.5, 2.5 + (tree == "src") * (i % 3)]}, f)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def test_stream_matches(self):
+        src = os.path.join(self.base, "src")
+        ref = os.path.join(self.base, "ref")
+
+        expected_report = Report()
+        expected = match_tree_structures(src, ref, expected_report)
+
+        report = Report()
+        streamed = sorted(stream_tree_structures(src, ref, report, queue_size=2))
+
+        self.assertListEqual(
+            [(s.path, r.path) for _, s, r in streamed],
+            [(s.path, r.path) for s, r in expected],
+        )
+        self.assertListEqual(report.files_missing, expected_report.files_missing)
+        self.assertListEqual(report.files_extra, expected_report.files_extra)
+
+    def test_report(self):
+        def generate(**kwargs):
+            report = compare(
+                os.path.join(self.base, "src"), os.path.join(self.base, "ref"), **kwargs
+            )
+            data = ReportYamlExport(report).generate()
+            del data["id"], data["date"]
+            return data
+
+        expected = generate()
+        self.assertEqual(generate(streaming_scan=True), expected)
+        self.assertEqual(
+            generate(streaming_scan=True, jobs=4, executor="thread"), expected
+        )
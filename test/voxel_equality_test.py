@@ -0,0 +1,119 @@
+import unittest
+import os
+import gzip
+import shutil
+import numpy as np
+from unittest import mock
+import SimpleITK as sitk
+
+from medcmp.checks.ImageFileCheck import ImageFileCheck
+from medcmp.checks.FileContext import FileContext
+from medcmp.checks.VoxelEquality import chunks_equal, identical_voxels
+
+TEMP_DIR = "tmp"
+
+
+class VoxelEqualityTest(unittest.TestCase):
+    def setUp(self):
+        self.base = os.path.join(TEMP_DIR, self.__class__.__name__)
+        os.makedirs(self.base, exist_ok=True)
+
+        self.array = np.random.default_rng(5).integers(0, 3, (6, 32, 32))
+        self.array = self.array.astype(np.uint8)
+        self.ref_path = self.write("ref.nii.gz", self.array)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base)
+
+    def write(self, name, array, spacing=(1.0, 1.0, 1.0), **kwargs):
+        img = sitk.GetImageFromArray(array)
+        img.SetSpacing(spacing)
+
+        path = os.path.join(self.base, name)
+        sitk.WriteImage(img, path, **kwargs)
+        return path
+
+    def regzip(self, path, name, **kwargs):
+        # same content, different gzip header and compression
+        with gzip.open(path, "rb") as f:
+            content = f.read()
+
+        out = os.path.join(self.base, name)
+        with open(out, "wb") as f:
+            f.write(gzip.compress(content, **kwargs))
+        return out
+
+    def identical(self, src_path: str, ref_path: str):
+        return identical_voxels(FileContext(src_path, ref_path))
+
+    def test_chunks_equal(self):
+        self.assertEqual(chunks_equal(iter([b"ab", b"cde"]), iter([b"abcd", b"e"])), 5)
+        self.assertIsNone(chunks_equal(iter([b"ab", b"cd"]), iter([b"abc"])))
+        self.assertEqual(chunks_equal(iter([]), iter([])), 0)
+
+        # stops at the first differing chunk
+        rest = iter([b"x", b"y"])
+        self.assertIsNone(chunks_equal(iter([b"a", b"x", b"y"]), rest))
+        self.assertListEqual(list(rest), [b"y"])
+
+    def test_nifti(self):
+        regzipped = self.regzip(self.ref_path, "src.nii.gz", compresslevel=1, mtime=1)
+        self.assertNotEqual(os.path.getsize(regzipped), os.path.getsize(self.ref_path))
+        self.assertEqual(self.identical(regzipped, self.ref_path), self.array.size)
+
+        # gzip members written one after another
+        with gzip.open(self.ref_path, "rb") as f:
+            content = f.read()
+        members = os.path.join(self.base, "members.nii.gz")
+        with open(members, "wb") as f:
+            f.write(gzip.compress(content[:1000]) + gzip.compress(content[1000:]))
+        self.assertEqual(self.identical(members, self.ref_path), self.array.size)
+
+        changed = self.array.copy()
+        changed[-1, -1, -1] += 1
+        self.assertIsNone(
+            self.identical(self.write("changed.nii.gz", changed), self.ref_path)
+        )
+        self.assertIsNone(
+            self.identical(
+                self.write("spacing.nii.gz", self.array, (1.0, 1.0, 2.0)),
+                self.ref_path,
+            )
+        )
+
+    def test_mha_nrrd(self):
+        raw = self.write("image.nrrd", self.array)
+        compressed = self.write("image.mha", self.array, useCompression=True)
+        self.assertEqual(self.identical(compressed, raw), self.array.size)
+
+        other = self.write("other.mha", self.array.astype(np.int16))
+        self.assertIsNone(self.identical(other, raw))
+
+    def test_check(self):
+        src_path = self.regzip(self.ref_path, "src.nii.gz", mtime=1)
+
+        entry = ImageFileCheck(src_path, self.ref_path).run()
+        assert entry is not None
+        self.assertListEqual([n.label for n in entry.notes], ["Voxel Identical"])
+        self.assertListEqual(entry.findings, [])
+
+        entry = ImageFileCheck(src_path, self.ref_path, voxel_precheck=False).run()
+        assert entry is not None
+        self.assertIn("Dice Score", [n.label for n in entry.notes])
+
+    def test_shared_artifacts(self):
+        src_path = self.regzip(self.ref_path, "src.nii.gz", mtime=1)
+        context = FileContext(src_path, self.ref_path)
+        self.assertIsNone(context.identical())
+
+        # content hashed by the identity pre-check is not read again
+        with mock.patch("builtins.open", wraps=open) as opened:
+            self.assertEqual(identical_voxels(context), self.array.size)
+        self.assertEqual(opened.call_count, 0)
+
+        # headers parsed by the pre-check are shared with the other checks
+        raw = self.write("image.nrrd", self.array)
+        context = FileContext(self.write("image.mha", self.array), raw)
+        self.assertEqual(identical_voxels(context), self.array.size)
+        self.assertTrue(context.ref.loaded("volume_header"))
+        self.assertIsNotNone(context.ref.raw_volume)